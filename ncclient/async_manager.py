@@ -0,0 +1,172 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module is a thin layer of abstraction around the library, for use
+from :mod:`asyncio` code (Python 3.5+). It exposes all core functionality
+as coroutines."""
+
+import asyncio
+import functools
+
+from ncclient import manager
+from ncclient.manager import OPERATIONS, VENDOR_OPERATIONS, Manager
+from ncclient.operations.errors import TimeoutExpiredError
+from ncclient.transport.async_ssh import AsyncSSHSession
+
+
+async def connect(*args, **kwds):
+    """
+    Initialize an :class:`AsyncManager` over the SSH transport, driven by the
+    running event loop. Takes the same arguments as
+    :func:`~ncclient.manager.connect_ssh`, including `manager_params` and
+    `device_params`.
+    """
+    device_params = manager._extract_device_params(kwds)
+    manager_params = manager._extract_manager_params(kwds)
+
+    device_handler = manager.make_device_handler(device_params)
+    device_handler.add_additional_ssh_connect_params(kwds)
+    VENDOR_OPERATIONS.update(device_handler.add_additional_operations())
+    session = AsyncSSHSession(device_handler)
+    if "hostkey_verify" not in kwds or kwds["hostkey_verify"]:
+        session.load_known_hosts()
+
+    try:
+        await session.connect(*args, **kwds)
+    except Exception:
+        if session.transport:
+            await session.aclose()
+        raise
+    return AsyncManager(session, device_handler, **manager_params)
+
+
+class AsyncManager(object):
+
+    """
+    A :class:`~ncclient.manager.Manager` whose operations are coroutines, so
+    that any number of sessions can be used from one event loop, e.g.::
+
+        async with await async_manager.connect(host="host") as m:
+            reply = await m.get_config("running")
+
+    All operations of :class:`~ncclient.manager.Manager`, including vendor
+    operations, can be awaited. Each resolves to what the operation returns,
+    or raises what it raises, when called on a synchronous manager;
+    :attr:`timeout` applies while it is awaited. Requests are pipelined, as
+    in :attr:`~ncclient.manager.Manager.async_mode`.
+
+    Other attributes, such as :attr:`server_capabilities` or
+    :attr:`rpcs_in_flight`, are those of the underlying manager.
+
+    .. note::
+        The event loop cannot block on a full in-flight window, so with
+        :attr:`~ncclient.manager.Manager.max_rpcs_in_flight` set, a request
+        beyond it fails with :exc:`~ncclient.operations.PipelineFullError`.
+    """
+
+    def __init__(self, session, device_handler, **manager_params):
+        self._manager = Manager(session, device_handler, **manager_params)
+        self._manager.async_mode = True
+        # waiting for room would block the loop that delivers the replies
+        self._manager._listener().block_when_full = False
+        self._session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close_session()
+        return False
+
+    async def execute(self, cls, *args, **kwds):
+        future = self._manager.execute(cls, *args, **kwds)
+        try:
+            # cancelling this cancels the RPC as well
+            return await asyncio.wait_for(asyncio.wrap_future(future),
+                                          self._manager.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutExpiredError('ncclient timed out while waiting for an rpc reply.')
+
+    async def close_session(self):
+        "Closes the NETCONF session, then the connection."
+        try:
+            await self.execute(OPERATIONS["close_session"])
+        finally:
+            await self._session.aclose()
+
+    async def take_notification(self, block=True, timeout=None):
+        """Waits for the next notification, for at most *timeout* seconds if
+        given, and returns it, see
+        :meth:`~ncclient.manager.Manager.take_notification`. Returns `None`
+        if there is none."""
+        if not block:
+            return self._session.take_notification(False, None)
+        try:
+            return await asyncio.wait_for(self._session.next_notification(),
+                                          timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def notifications(self):
+        """Returns an asynchronous iterator over the notifications received,
+        after a subscription has been created::
+
+            await m.create_subscription()
+            async for notification in m.notifications():
+                print(notification.notification_xml)
+        """
+        return _Notifications(self._session)
+
+    def locked(self, target):
+        """Returns an asynchronous context manager for a lock on a datastore,
+        see :meth:`~ncclient.manager.Manager.locked`::
+
+            async with m.locked("running"):
+                # do your stuff
+        """
+        return _Locked(self, target)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        if method in VENDOR_OPERATIONS:
+            return functools.partial(self.execute, VENDOR_OPERATIONS[method])
+        elif method in OPERATIONS:
+            return functools.partial(self.execute, OPERATIONS[method])
+        return getattr(self._manager, method)
+
+
+class _Locked(object):
+
+    def __init__(self, manager, target):
+        self._manager = manager
+        self._target = target
+
+    async def __aenter__(self):
+        await self._manager.lock(self._target)
+        return self
+
+    async def __aexit__(self, *args):
+        await self._manager.unlock(self._target)
+        return False
+
+
+class _Notifications(object):
+
+    def __init__(self, session):
+        self._session = session
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._session.next_notification()
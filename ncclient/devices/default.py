@@ -23,6 +23,9 @@ generic information needed for interaction with a Netconf server.
 
 """
 import sys
+
+from ncclient.xml_ import xslt_transform
+
 if sys.version >= '3':
     xrange = range
 
@@ -192,6 +195,26 @@ class DefaultDeviceHandler(object):
         return False
 
 
+    def nested_rpc_errors(self):
+        """
+        RFC 6241 has *rpc-error* elements as children of *rpc-reply*, which is
+        all that is looked at for errors in replies by default. Devices that
+        nest them deeper in replies should return True here, to have the
+        whole reply searched instead.
+
+        """
+        return False
+
+    def max_rpcs_in_flight(self):
+        """
+        The number of RPCs that may be sent to the device without waiting for
+        their reply, or None (the default) for no limit. Requests beyond it
+        wait until a reply makes room. Devices that handle only so many
+        pipelined requests at a time should return that number here.
+
+        """
+        return None
+
     def perform_qualify_check(self):
         """
         During RPC operations, we perform some initial sanity checks on the responses.
@@ -221,3 +244,17 @@ class DefaultDeviceHandler(object):
 
     def transform_reply(self):
         return False
+
+    def get_reply_transform(self):
+        """
+        Return the callable that turns the root element of a reply into what
+        is handed to the user (wrapped in an NCElement), or False if replies
+        are returned as they are. It may change the tree in place.
+
+        By default this is the XSLT from transform_reply(), compiled once per
+        stylesheet. Handlers can return something cheaper, such as
+        ncclient.xml_.strip_namespaces.
+
+        """
+        xslt = self.transform_reply()
+        return xslt_transform(xslt) if xslt else False
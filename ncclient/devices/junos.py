@@ -12,13 +12,14 @@ generic information needed for interaction with a Netconf server.
 
 """
 
+import copy
 import re
 from lxml import etree
 from .default import DefaultDeviceHandler
 from ncclient.operations.third_party.juniper.rpc import GetConfiguration, LoadConfiguration, CompareConfiguration
 from ncclient.operations.third_party.juniper.rpc import ExecuteRpc, Command, Reboot, Halt, Commit, Rollback
 from ncclient.operations.rpc import RPCError
-from ncclient.xml_ import to_ele
+from ncclient.xml_ import to_ele, strip_namespaces
 
 
 class JunosDeviceHandler(DefaultDeviceHandler):
@@ -46,6 +47,10 @@ class JunosDeviceHandler(DefaultDeviceHandler):
     def perform_qualify_check(self):
         return False
 
+    def nested_rpc_errors(self):
+        # e.g. within <load-configuration-results> or <commit-results>
+        return True
+
     def handle_raw_dispatch(self, raw):
         if 'routing-engine' in raw:
             raw = re.sub(r'<ok/>', '</routing-engine>\n<ok/>', raw)
@@ -110,3 +115,12 @@ class JunosDeviceHandler(DefaultDeviceHandler):
             return reply
         else:
             return reply.encode('UTF-8')
+
+    def get_reply_transform(self):
+        # does what the transform_reply() stylesheet does, without XSLT
+        return _strip_reply
+
+
+def _strip_reply(root):
+    # on a copy, the tree of an RPCReply being what its data_ele is part of
+    return strip_namespaces(copy.deepcopy(root), blank_text=True)
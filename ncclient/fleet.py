@@ -0,0 +1,391 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module runs an operation on many devices at once: each device is
+connected to, has the operation run on it and is disconnected from, while
+results are handed back as they come in. :func:`fan_out` does so in threads
+of the calling process, :func:`collect` in a number of processes."""
+
+import multiprocessing
+import pickle
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+from ncclient import manager, NCClientError
+from ncclient.operations.rpc import RPCReply
+from ncclient.xml_ import NCElement
+
+import logging
+logger = logging.getLogger('ncclient.fleet')
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class WorkerError(NCClientError):
+    """Stands for an error on a device that :func:`collect` could not bring
+    back from its worker process as it was, or for the worker having died
+    before it got to the device."""
+    pass
+
+
+class DeviceResult(object):
+
+    "What running the operation on one device came to."
+
+    def __init__(self, device, site):
+        #: The entry of the inventory for the device.
+        self.device = device
+        #: The site of the device, or `None`.
+        self.site = site
+        #: What the operation returned.
+        self.result = None
+        #: The exception raised connecting or running the operation, if any.
+        self.error = None
+        #: Seconds taken to connect, `None` if it failed.
+        self.connect_time = None
+        #: Seconds taken to run the operation, `None` if it did not complete.
+        self.run_time = None
+        #: Seconds from starting to connect to having disconnected.
+        self.total_time = None
+
+    @property
+    def ok(self):
+        "Whether the operation was run without an error."
+        return self.error is None
+
+    @property
+    def host(self):
+        return self.device.get('host')
+
+    def __repr__(self):
+        return '<DeviceResult %s %s in %.3fs>' % (
+            self.host, 'ok' if self.ok else repr(self.error), self.total_time or 0)
+
+
+def fan_out(inventory, operation, args=(), kwds=None, max_workers=32,
+            max_per_site=None, site='site', reactor=None, connect=None):
+    """
+    Run *operation* on every device of *inventory*, a number of devices at a
+    time, and yield a :class:`DeviceResult` for each as it completes::
+
+        inventory = [{'host': 'r1', 'username': 'admin', 'site': 'lon'},
+                     {'host': 'r2', 'username': 'admin', 'site': 'lon'},
+                     {'host': 'r3', 'username': 'admin', 'site': 'nyc'}]
+        for r in fleet.fan_out(inventory, 'get_config', ('running',),
+                               max_per_site=1):
+            print(r.host, r.result if r.ok else r.error)
+
+    Each entry of *inventory* is a dictionary of the arguments to
+    :func:`~ncclient.manager.connect`. *operation* is either the name of a
+    :class:`~ncclient.manager.Manager` operation, called with *args* and
+    *kwds*, or a callable taking the manager followed by *args* and *kwds*.
+    The session is closed once it returns. An error connecting or running
+    the operation ends up in :attr:`DeviceResult.error` and does not affect
+    the other devices.
+
+    At most *max_workers* devices are worked on at once and, if given, at
+    most *max_per_site* of any one site. The site of a device is the value
+    of its *site* key, which is not passed on to connect, or what *site*
+    returns for the entry if it is a callable. Devices without a site are
+    only bound by *max_workers*.
+
+    Sessions are given *reactor* if any, see
+    :class:`~ncclient.transport.reactor.Reactor`, so that their I/O is not
+    done by a thread of their own. Known hosts and private key files are
+    read once for all sessions, see
+    :meth:`~ncclient.transport.SSHSession.load_known_hosts`.
+
+    Breaking out of the loop leaves the devices still being worked on to
+    complete in the background, but no other device is started.
+    """
+    _check_bounds(max_workers, max_per_site)
+    return _fan_out(inventory, operation, args, kwds, max_workers,
+                    max_per_site, site, reactor, connect)
+
+
+def _fan_out(inventory, operation, args, kwds, max_workers, max_per_site,
+             site, reactor, connect):
+    if connect is None:
+        connect = manager.connect
+    kwds = kwds or {}
+    # the devices not started yet, by site, in the order of the inventory
+    pending = OrderedDict()
+    for entry in inventory:
+        entry, key = _site_of(entry, site)
+        if reactor is not None:
+            params = dict(entry.get('manager_params') or {})
+            params.setdefault('reactor', reactor)
+            entry['manager_params'] = params
+        pending.setdefault(key, deque()).append(entry)
+
+    def work(entry, key):
+        result = DeviceResult(entry, key)
+        start = _clock()
+        try:
+            m = connect(**dict(entry))
+            connected = _clock()
+            result.connect_time = connected - start
+            try:
+                if callable(operation):
+                    result.result = operation(m, *args, **kwds)
+                else:
+                    result.result = getattr(m, operation)(*args, **kwds)
+                result.run_time = _clock() - connected
+            finally:
+                try:
+                    m.close_session()
+                except Exception as e:
+                    logger.debug('closing the session of %s failed: %r',
+                                 entry.get('host'), e)
+        except Exception as e:
+            result.error = e
+        result.total_time = _clock() - start
+        return result
+
+    running = {}
+    per_site = dict((key, 0) for key in pending)
+    executor = ThreadPoolExecutor(max_workers)
+    try:
+        while pending or running:
+            # start whatever the bounds allow, site by site
+            for key in list(pending):
+                queue = pending[key]
+                while (queue and len(running) < max_workers
+                       and (max_per_site is None or key is None
+                            or per_site[key] < max_per_site)):
+                    per_site[key] += 1
+                    running[executor.submit(work, queue.popleft(), key)] = key
+                if not queue:
+                    del pending[key]
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                per_site[running.pop(future)] -= 1
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def collect(inventory, operation, args=(), kwds=None, processes=None,
+            shard='round_robin', extract=None, max_workers=32,
+            max_per_site=None, site='site', reactor_threads=None,
+            connect=None):
+    """
+    Like :func:`fan_out`, but with the devices shared out among *processes*
+    worker processes (by default, one per CPU), each running
+    :func:`fan_out` on its share. Parsing replies and the transport threads
+    of many sessions keep more than one core busy, which threads of a single
+    process cannot do. Results are yielded as they complete, in whichever
+    process::
+
+        def interfaces(m):
+            reply = m.get(('subtree', '<interfaces/>'))
+            return [name.text for name in reply.data_ele.iter('{*}name')]
+
+        for r in fleet.collect(inventory, interfaces, processes=8):
+            print(r.host, r.result if r.ok else r.error)
+
+    *shard* is how devices are shared out:
+
+    * `'round_robin'` -- in turn, so that each process gets as many.
+    * `'site'` -- all devices of a site to the same process, sites being
+      spread so that each process gets about as many devices. Then
+      *max_per_site* bounds each site as a whole rather than in each
+      process.
+    * a callable, returning the number of the process for an inventory
+      entry (taken modulo *processes*).
+
+    *max_workers*, *max_per_site* and *site* apply to each process as to
+    :func:`fan_out`. With *reactor_threads*, each process has its sessions
+    use a :class:`~ncclient.transport.reactor.Reactor` of as many threads.
+
+    What the operation returns is handed back to this process, so it should
+    be small: extracted fields, the path of a file written, or raw bytes
+    rather than parsed documents. *extract*, if given, is called on it in
+    the worker process to that end; otherwise, an
+    :class:`~ncclient.operations.RPCReply`, or the
+    :class:`~ncclient.xml_.NCElement` device handlers that transform replies
+    make of it, is handed back as its XML text.
+    An error that cannot be handed back as it is becomes a
+    :exc:`WorkerError`.
+
+    *operation*, *extract*, *site* and *shard* must be picklable, i.e.
+    names or functions defined at the top level of a module, unless worker
+    processes are forked. Breaking out of the loop terminates the worker
+    processes.
+    """
+    _check_bounds(max_workers, max_per_site)
+    return _collect(inventory, operation, args, kwds, processes, shard,
+                    extract, max_workers, max_per_site, site,
+                    reactor_threads, connect)
+
+
+def _collect(inventory, operation, args, kwds, processes, shard, extract,
+             max_workers, max_per_site, site, reactor_threads, connect):
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    shards = _shard(list(inventory), processes, shard, site)
+    options = dict(max_workers=max_workers, max_per_site=max_per_site,
+                   site=site, connect=connect)
+    queue = multiprocessing.Queue()
+    workers = {}
+    # the positions in each shard of the devices still to be heard of
+    remaining = {}
+    try:
+        for index, entries in enumerate(shards):
+            if not entries:
+                continue
+            worker = multiprocessing.Process(
+                target=_collect_shard, name='ncclient-fleet-%d' % index,
+                args=(queue, index, entries, operation, args, kwds, extract,
+                      reactor_threads, options))
+            worker.daemon = True
+            worker.start()
+            workers[index] = worker
+            remaining[index] = set(range(len(entries)))
+        while remaining:
+            try:
+                item = queue.get(timeout=1)
+            except Empty:
+                # a worker that died leaves the rest of its devices failed
+                for index in list(remaining):
+                    worker = workers[index]
+                    if worker.is_alive():
+                        continue
+                    worker.join()
+                    # what it sent before dying
+                    while True:
+                        try:
+                            item = queue.get(timeout=0.1)
+                        except Empty:
+                            break
+                        result = _received(remaining, item)
+                        if result is not None:
+                            yield result
+                    error = WorkerError('worker process exited with code %s'
+                                        % worker.exitcode)
+                    for position in sorted(remaining.pop(index, ())):
+                        result = DeviceResult(*_site_of(shards[index][position], site))
+                        result.error = error
+                        yield result
+                continue
+            result = _received(remaining, item)
+            if result is not None:
+                yield result
+    finally:
+        for worker in workers.values():
+            if worker.is_alive() and remaining:
+                worker.terminate()
+            worker.join()
+
+
+def _check_bounds(max_workers, max_per_site):
+    # a bound of 0 would never let a device start
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1: %r' % (max_workers,))
+    if max_per_site is not None and max_per_site < 1:
+        raise ValueError('max_per_site must be at least 1: %r' % (max_per_site,))
+
+
+def _site_of(entry, site):
+    "A copy of *entry* without its site, and the site."
+    entry = dict(entry)
+    if callable(site):
+        return entry, site(entry)
+    return entry, entry.pop(site, None)
+
+
+def _received(remaining, item):
+    index, position, data = item
+    positions = remaining.get(index)
+    if positions is None or position not in positions:
+        return None
+    positions.discard(position)
+    if not positions:
+        del remaining[index]
+    return pickle.loads(data)
+
+
+def _shard(inventory, processes, shard, site):
+    shards = [[] for i in range(processes)]
+    if shard == 'round_robin':
+        for i, entry in enumerate(inventory):
+            shards[i % processes].append(entry)
+    elif shard == 'site':
+        sites = OrderedDict()
+        for entry in inventory:
+            key = site(entry) if callable(site) else entry.get(site)
+            sites.setdefault(key, []).append(entry)
+        # the largest sites first, each to the process with the fewest devices
+        for entries in sorted(sites.values(), key=len, reverse=True):
+            min(shards, key=len).extend(entries)
+    elif callable(shard):
+        for entry in inventory:
+            shards[shard(entry) % processes].append(entry)
+    else:
+        raise ValueError('Unknown sharding: %r' % (shard,))
+    return shards
+
+
+def _collect_shard(queue, index, entries, operation, args, kwds, extract,
+                   reactor_threads, options):
+    # runs in a worker process of collect()
+    reactor = None
+    if reactor_threads:
+        from ncclient.transport.reactor import Reactor
+        reactor = Reactor(threads=reactor_threads)
+    # identifies the results, as fan_out copies the entries
+    tagged = []
+    for position, entry in enumerate(entries):
+        entry = dict(entry)
+        entry['_fleet_position'] = position
+        tagged.append(entry)
+    connect = options.pop('connect') or manager.connect
+    def tagged_connect(_fleet_position, **kwds):
+        return connect(**kwds)
+    try:
+        for result in fan_out(tagged, operation, args, kwds, reactor=reactor,
+                              connect=tagged_connect, **options):
+            position = result.device.pop('_fleet_position')
+            # as in the inventory, without the reactor added
+            result.device = _site_of(entries[position], options['site'])[0]
+            if result.ok:
+                try:
+                    if extract is not None:
+                        result.result = extract(result.result)
+                    elif isinstance(result.result, RPCReply):
+                        result.result = result.result.xml
+                    elif isinstance(result.result, NCElement):
+                        result.result = result.result.data_xml
+                except Exception as e:
+                    result.result, result.error = None, e
+            if result.error is not None:
+                try:
+                    pickle.dumps(result.error)
+                except Exception:
+                    result.error = WorkerError('%s: %s' % (type(result.error).__name__,
+                                                           result.error))
+            try:
+                data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                result.result = None
+                result.error = WorkerError('cannot hand back the result: %r' % e)
+                data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+            queue.put((index, position, data))
+    finally:
+        if reactor is not None:
+            reactor.close()
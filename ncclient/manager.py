@@ -119,6 +119,24 @@ def connect_ssh(*args, **kwds):
     To customize the :class:`Manager`, add a `manager_params` dictionnary in connection
     parameters (e.g. `manager_params={'timeout': 60}` for a bigger RPC timeout paramater)
 
+    How the session reads from the SSH channel can be tuned through `manager_params`
+    as well: `read_size` (bytes per read), `adaptive_read` (grow the read size during
+    large replies) and `read_budget` (bytes read before parsing), see
+    :attr:`~ncclient.transport.SSHSession.read_size`. Setting `dispatch_queue_size`
+    has replies parsed and delivered by a separate thread, so that the session keeps
+    reading from the channel meanwhile, see
+    :meth:`~ncclient.transport.Session.start_dispatcher`. With `incremental_parse`
+    replies are parsed while they are being received, see
+    :attr:`~ncclient.transport.SSHSession.incremental_parse`. `spill_threshold` and
+    `max_message_size` bound the memory a single message may take, see
+    :attr:`~ncclient.transport.SSHSession.spill_threshold`. `rpc_ttl` and
+    `drop_late_replies` decide what happens to RPCs whose reply does not come,
+    see :attr:`Manager.rpc_ttl`. `max_rpcs_in_flight` and `block_when_full`
+    bound the number of RPCs pipelined, see :attr:`Manager.max_rpcs_in_flight`.
+    With a `reactor`, the session does its I/O in a thread shared with other
+    sessions instead of one of its own, see
+    :class:`~ncclient.transport.reactor.Reactor`.
+
     To invoke advanced vendor related operation add
     `device_params={'name': '<vendor_alias>'}` in connection parameters. For the time,
     'junos' and 'nexus' are supported for Juniper and Cisco Nexus respectively.
@@ -136,6 +154,7 @@ def connect_ssh(*args, **kwds):
     global VENDOR_OPERATIONS
     VENDOR_OPERATIONS.update(device_handler.add_additional_operations())
     session = transport.SSHSession(device_handler)
+    session.reactor = manager_params.pop("reactor", None)
     if "hostkey_verify" not in kwds or kwds["hostkey_verify"]:
         session.load_known_hosts()
 
@@ -202,13 +221,41 @@ class Manager(object):
     HUGE_TREE_DEFAULT = False
     """Default for `huge_tree` support for XML parsing of RPC replies (defaults to False)"""
 
-    def __init__(self, session, device_handler, timeout=30):
+    def __init__(self, session, device_handler, timeout=30, read_size=None,
+                 adaptive_read=None, read_budget=None, dispatch_queue_size=None,
+                 incremental_parse=None, spill_threshold=None,
+                 max_message_size=None, rpc_ttl=None, drop_late_replies=None,
+                 max_rpcs_in_flight=None, block_when_full=None):
         self._session = session
         self._async_mode = False
         self._timeout = timeout
         self._raise_mode = operations.RaiseMode.ALL
         self._huge_tree = self.HUGE_TREE_DEFAULT
         self._device_handler = device_handler
+        # receive tuning, see SSHSession.read_size and friends
+        if read_size is not None:
+            session.read_size = read_size
+        if adaptive_read is not None:
+            session.adaptive_read = adaptive_read
+        if read_budget is not None:
+            session.read_budget = read_budget
+        if dispatch_queue_size is not None:
+            session.start_dispatcher(dispatch_queue_size)
+        if incremental_parse is not None:
+            session.incremental_parse = incremental_parse
+        if spill_threshold is not None:
+            session.spill_threshold = spill_threshold
+        if max_message_size is not None:
+            session.max_message_size = max_message_size
+        # RPCs in flight, see rpc_ttl
+        if rpc_ttl is not None:
+            self.rpc_ttl = rpc_ttl
+        if drop_late_replies is not None:
+            self._listener().drop_late_replies = drop_late_replies
+        if max_rpcs_in_flight is not None:
+            self.max_rpcs_in_flight = max_rpcs_in_flight
+        if block_when_full is not None:
+            self._listener().block_when_full = block_when_full
 
     def __enter__(self):
         return self
@@ -228,12 +275,47 @@ class Manager(object):
         self._raise_mode = mode
 
     def execute(self, cls, *args, **kwds):
+        if isinstance(cls, operations.PreparedRPC):
+            prepared = cls
+            rpc = self._rpc(prepared.cls)
+            # what request() would have set on the RPC
+            if prepared.huge_tree:
+                rpc.huge_tree = True
+            return rpc._request(prepared, **prepared.kwargs)
+        return self._rpc(cls).request(*args, **kwds)
+
+    def prepare(self, method, *args, **kwds):
+        """Returns a :class:`~ncclient.operations.PreparedRPC` for the
+        operation *method*, the name of an operation such as `"get"` or an
+        :class:`~ncclient.operations.RPC` subclass, called with the given
+        arguments. The request is serialized only once; pass the result to
+        :meth:`execute` to send it, as often as needed, with a new
+        *message-id* each time::
+
+            get_ifs = m.prepare("get", filter=("subtree", ifs_filter))
+            while True:
+                reply = m.execute(get_ifs)
+
+        It may be executed by another manager too, as long as the device is
+        of the same kind: capabilities are checked and vendor namespaces
+        added when preparing only.
+        """
+        if isinstance(method, six.string_types):
+            cls = VENDOR_OPERATIONS.get(method) or OPERATIONS[method]
+        else:
+            cls = method
+        return self._rpc(cls).prepare(*args, **kwds)
+
+    def _listener(self):
+        return operations.rpc.RPCReplyListener(self._session, self._device_handler)
+
+    def _rpc(self, cls):
         return cls(self._session,
                    device_handler=self._device_handler,
                    async_mode=self._async_mode,
                    timeout=self._timeout,
                    raise_mode=self._raise_mode,
-                   huge_tree=self._huge_tree).request(*args, **kwds)
+                   huge_tree=self._huge_tree)
 
     def locked(self, target):
         """Returns a context manager for a lock on a datastore, where
@@ -326,7 +408,8 @@ class Manager(object):
     async_mode = property(fget=lambda self: self._async_mode,
                           fset=__set_async_mode)
     """Specify whether operations are executed asynchronously (`True`) or
-    synchronously (`False`) (the default)."""
+    synchronously (`False`) (the default). Asynchronous operations return an
+    :class:`~ncclient.operations.RPCFuture`."""
 
     timeout = property(fget=lambda self: self._timeout, fset=__set_timeout)
     """Specify the timeout for synchronous RPC requests."""
@@ -347,3 +430,50 @@ class Manager(object):
     @huge_tree.setter
     def huge_tree(self, x):
         self._huge_tree = x
+
+    @property
+    def rpc_ttl(self):
+        """Seconds after which an RPC still waiting for its reply is given up
+        on, failing with :exc:`~ncclient.operations.TimeoutExpiredError`, or
+        `None` (the default) to wait forever. This is what stops asynchronous
+        RPCs that are never answered from piling up. A synchronous RPC is
+        given up on when its :attr:`timeout` expires anyway.
+
+        Replies that arrive for RPCs given up on or cancelled are dropped
+        without being parsed. They are logged as a warning, as replies to
+        unknown RPCs are, if `drop_late_replies=False` is passed in
+        `manager_params`.
+        """
+        return self._listener().ttl
+
+    @rpc_ttl.setter
+    def rpc_ttl(self, ttl):
+        self._listener().ttl = ttl
+
+    @property
+    def max_rpcs_in_flight(self):
+        """The number of RPCs that may be waiting for their reply at the same
+        time, or `None` for no limit. Once it is reached, a request waits
+        until a reply makes room, for at most the RPC's timeout, and then
+        fails with :exc:`~ncclient.operations.PipelineFullError`; with
+        `block_when_full=False` in `manager_params` it fails right away.
+
+        Asynchronous RPCs are pipelined this way: they are sent back to back,
+        and the replies, which come in the order of the requests, are
+        matched to them by *message-id*. The default comes from the device
+        handler's :meth:`max_rpcs_in_flight`.
+        """
+        return self._listener().max_in_flight
+
+    @max_rpcs_in_flight.setter
+    def max_rpcs_in_flight(self, n):
+        listener = self._listener()
+        with listener._lock:
+            listener.max_in_flight = n
+            # more room, or none to wait for anymore
+            listener._window.notify_all()
+
+    @property
+    def rpcs_in_flight(self):
+        """Number of RPCs on the session waiting for their reply."""
+        return self._listener().in_flight
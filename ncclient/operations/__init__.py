@@ -12,12 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from ncclient.operations.errors import OperationError, TimeoutExpiredError, MissingCapabilityError
-from ncclient.operations.rpc import RPC, RPCReply, RPCError, RaiseMode
+from ncclient.operations.errors import OperationError, TimeoutExpiredError, MissingCapabilityError, PipelineFullError
+from ncclient.operations.rpc import RPC, RPCReply, RPCError, RaiseMode, PreparedRPC, RPCFuture
 
 # rfc4741 ops
 
-from ncclient.operations.retrieve import Get, GetConfig, GetSchema, GetReply, Dispatch
+from ncclient.operations.retrieve import Get, GetConfig, GetSchema, GetReply, RawDataReply, Dispatch
 from ncclient.operations.edit import EditConfig, CopyConfig, DeleteConfig, Validate, Commit, DiscardChanges, CancelCommit
 from ncclient.operations.session import CloseSession, KillSession
 from ncclient.operations.lock import Lock, Unlock, LockContext
@@ -31,11 +31,15 @@ __all__ = [
     'RPCReply',
     'RPCError',
     'RaiseMode',
+    'PreparedRPC',
+    'RPCFuture',
+    'PipelineFullError',
     'Get',
     'GetConfig',
     'GetSchema',
     'Dispatch',
     'GetReply',
+    'RawDataReply',
     'EditConfig',
     'CopyConfig',
     'Validate',
@@ -27,6 +27,8 @@ logger = logging.getLogger("ncclient.operations.edit")
 class EditConfig(RPC):
     "`edit-config` RPC"
 
+    __slots__ = ()
+
     def request(self, config, format='xml', target='candidate', default_operation=None,
             test_option=None, error_option=None):
         """Loads all or part of the specified *config* to the *target* configuration datastore.
@@ -70,6 +72,8 @@ class EditConfig(RPC):
 class DeleteConfig(RPC):
     "`delete-config` RPC"
 
+    __slots__ = ()
+
     def request(self, target):
         """Delete a configuration datastore.
 
@@ -84,6 +88,8 @@ class DeleteConfig(RPC):
 class CopyConfig(RPC):
     "`copy-config` RPC"
 
+    __slots__ = ()
+
     def request(self, source, target):
         """Create or replace an entire configuration datastore with the contents of another complete
         configuration datastore.
@@ -109,6 +115,8 @@ class CopyConfig(RPC):
 class Validate(RPC):
     "`validate` RPC. Depends on the `:validate` capability."
 
+    __slots__ = ()
+
     DEPENDS = [':validate']
 
     def request(self, source="candidate"):
@@ -131,6 +139,8 @@ class Validate(RPC):
 class Commit(RPC):
     "`commit` RPC. Depends on the `:candidate` capability, and the `:confirmed-commit`."
 
+    __slots__ = ()
+
     DEPENDS = [':candidate']
 
     def request(self, confirmed=False, timeout=None, persist=None):
@@ -159,6 +169,8 @@ class Commit(RPC):
 class CancelCommit(RPC):
     "`cancel-commit` RPC. Depends on the `:candidate` and `:confirmed-commit` capabilities."
 
+    __slots__ = ()
+
     DEPENDS = [':candidate', ':confirmed-commit']
 
     def request(self, persist_id=None):
@@ -176,6 +188,8 @@ class CancelCommit(RPC):
 class DiscardChanges(RPC):
     "`discard-changes` RPC. Depends on the `:candidate` capability."
 
+    __slots__ = ()
+
     DEPENDS = [":candidate"]
 
     def request(self):
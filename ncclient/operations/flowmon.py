@@ -24,6 +24,8 @@ class PoweroffMachine(RPC):
 
     "*poweroff-machine* RPC (flowmon)"
 
+    __slots__ = ()
+
     DEPENDS = ["urn:liberouter:param:netconf:capability:power-control:1.0"]
     
     def request(self):
@@ -33,6 +35,8 @@ class RebootMachine(RPC):
 
     "*reboot-machine* RPC (flowmon)"
 
+    __slots__ = ()
+
     DEPENDS = ["urn:liberouter:params:netconf:capability:power-control:1.0"]
 
     def request(self):
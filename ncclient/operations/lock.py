@@ -24,6 +24,7 @@ class Lock(RPC):
 
     "`lock` RPC"
 
+    __slots__ = ()
 
     def request(self, target="candidate"):
         """Allows the client to lock the configuration system of a device.
@@ -39,6 +40,8 @@ class Unlock(RPC):
 
     "`unlock` RPC"
 
+    __slots__ = ()
+
     def request(self, target="candidate"):
         """Release a configuration lock, previously obtained with the lock operation.
 
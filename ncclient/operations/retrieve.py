@@ -15,6 +15,8 @@
 from ncclient.operations.errors import OperationError
 from ncclient.operations.rpc import RPC, RPCReply
 
+import six
+
 from ncclient.xml_ import *
 from lxml import etree
 
@@ -30,9 +32,11 @@ class GetReply(RPCReply):
 
     """Adds attributes for the *data* element to `RPCReply`."""
 
+    __slots__ = ('_data', '_data_xml')
+
     def _parsing_hook(self, root):
-        self._data = None
-        if not self._errors:
+        self._data = self._data_xml = None
+        if not self._error_eles:
             self._data = root.find(qualify("data"))
 
     @property
@@ -47,7 +51,85 @@ class GetReply(RPCReply):
         "*data* element as an XML string"
         if not self._parsed:
             self.parse()
-        return to_xml(self._data)
+        if self._data_xml is None:
+            # cut out of the reply as received where possible, which is
+            # much cheaper than serializing the element again
+            xml = None
+            if self._data is not None:
+                xml = sliced_xml(self._raw, self._data)
+            self._data_xml = xml if xml is not None else to_xml(self.data_ele)
+        return self._data_xml
+
+    data = data_ele
+    "Same as :attr:`data_ele`"
+
+
+class RawDataReply(GetReply):
+
+    """A `GetReply` for which the content of the *data* element is not parsed
+    but kept as it was received, see :attr:`data_raw`. Only the *rpc-reply*
+    element and its other children are parsed, so :attr:`ok`, :attr:`error`
+    and :attr:`errors` work as usual while a large reply costs little more
+    than finding where *data* starts and ends.
+
+    Accessing :attr:`data_ele` parses the whole reply.
+    """
+
+    __slots__ = ('_data_range',)
+
+    def parse(self):
+        "Parses the *rpc-reply*, except for the content of *data* where possible."
+        if self._parsed: return
+        self._data_range = None
+        if self._root is None:
+            split = split_child(self._raw, qualify("data"), huge_tree=self._huge_tree)
+            if split is not None:
+                self._root, start, end = split
+                self._data_range = start, end
+        GetReply.parse(self)
+
+    @property
+    def data_raw(self):
+        """Content of the *data* element as received, or `None` if there is
+        none. This is a :class:`memoryview` of the reply if it was kept as
+        bytes, else a string.
+
+        .. note::
+            Namespace prefixes used in it may be declared on the *rpc-reply*
+            or *data* element, see :attr:`data_nsmap`.
+        """
+        if not self._parsed:
+            self.parse()
+        if self._data is None:
+            return None
+        if self._data_range is not None:
+            start, end = self._data_range
+            if isinstance(self._raw, six.text_type):
+                return self._raw[start:end]
+            return memoryview(self._raw)[start:end]
+        # the reply was parsed in full after all
+        xml = etree.tostring(self._data, encoding=six.text_type, with_tail=False)
+        if xml.endswith('/>'):
+            return ''
+        return xml[xml.index('>') + 1:xml.rindex('</')]
+
+    @property
+    def data_nsmap(self):
+        "Namespace prefixes in scope for the content of *data*, see :attr:`data_raw`."
+        if not self._parsed:
+            self.parse()
+        return None if self._data is None else self._data.nsmap
+
+    @property
+    def data_ele(self):
+        "*data* element as an :class:`~xml.etree.ElementTree.Element`"
+        if not self._parsed:
+            self.parse()
+        if self._data is not None and self._data_range is not None and \
+                self._data.getparent() is self._root:
+            # so far only the empty stand-in for it was parsed
+            self._data = to_ele(self._raw, huge_tree=self._huge_tree).find(qualify("data"))
+        return self._data
 
     data = data_ele
     "Same as :attr:`data_ele`"
@@ -56,9 +138,11 @@ class GetReply(RPCReply):
 class GetSchemaReply(GetReply):
     """Reply for GetSchema called with specific parsing hook."""
 
+    __slots__ = ()
+
     def _parsing_hook(self, root):
-        self._data = None
-        if not self._errors:
+        self._data = self._data_xml = None
+        if not self._error_eles:
             self._data = root.find(qualify("data", NETCONF_MONITORING_NS)).text
 
 
@@ -66,16 +150,24 @@ class Get(RPC):
 
     "The *get* RPC."
 
+    __slots__ = ()
+
     REPLY_CLS = GetReply
     "See :class:`GetReply`."
 
-    def request(self, filter=None, with_defaults=None):
+    def request(self, filter=None, with_defaults=None, sink=None, compress=False, raw_data=False):
         """Retrieve running configuration and device state information.
 
         *filter* specifies the portion of the configuration to retrieve (by default entire configuration is retrieved)
 
         *with_defaults* defines an explicit method of retrieving default values from the configuration (see RFC 6243)
 
+        *sink*, if given, is where the reply is written as it is received instead of being kept in memory: a file name, a file object or a callable taking :class:`bytes`; the result is then a :class:`~ncclient.operations.rpc.SinkReply`
+
+        *compress* gzip compresses what is written to *sink*
+
+        *raw_data*, if true, leaves the content of the *data* element unparsed; the result is then a :class:`RawDataReply`
+
         :seealso: :ref:`filter_params`
         """
         node = new_ele("get")
@@ -88,7 +180,8 @@ class Get(RPC):
                 with_defaults,
                 self._session.server_capabilities,
             )
-        return self._request(node)
+        return self._request(node, sink=sink, compress=compress,
+                             reply_cls=RawDataReply if raw_data else None)
 
 
 def _append_with_defaults_mode(node, mode, capabilities):
@@ -139,10 +232,12 @@ class GetConfig(RPC):
 
     """The *get-config* RPC."""
 
+    __slots__ = ()
+
     REPLY_CLS = GetReply
     """See :class:`GetReply`."""
 
-    def request(self, source, filter=None, with_defaults=None):
+    def request(self, source, filter=None, with_defaults=None, sink=None, compress=False, raw_data=False):
         """Retrieve all or part of a specified configuration.
 
         *source* name of the configuration datastore being queried
@@ -151,6 +246,12 @@ class GetConfig(RPC):
 
         *with_defaults* defines an explicit method of retrieving default values from the configuration (see RFC 6243)
 
+        *sink*, if given, is where the reply is written as it is received instead of being kept in memory: a file name, a file object or a callable taking :class:`bytes`; the result is then a :class:`~ncclient.operations.rpc.SinkReply`
+
+        *compress* gzip compresses what is written to *sink*
+
+        *raw_data*, if true, leaves the content of the *data* element unparsed; the result is then a :class:`RawDataReply`
+
         :seealso: :ref:`filter_params`"""
         node = new_ele("get-config")
         node.append(util.datastore_or_url("source", source, self._assert))
@@ -163,12 +264,15 @@ class GetConfig(RPC):
                 with_defaults,
                 self._session.server_capabilities,
             )
-        return self._request(node)
+        return self._request(node, sink=sink, compress=compress,
+                             reply_cls=RawDataReply if raw_data else None)
 
 class GetSchema(RPC):
 
     """The *get-schema* RPC."""
 
+    __slots__ = ()
+
     REPLY_CLS = GetSchemaReply
     """See :class:`GetReply`."""
 
@@ -201,10 +305,12 @@ class Dispatch(RPC):
 
     """Generic retrieving wrapper"""
 
+    __slots__ = ()
+
     REPLY_CLS = GetReply
     """See :class:`GetReply`."""
 
-    def request(self, rpc_command, source=None, filter=None):
+    def request(self, rpc_command, source=None, filter=None, sink=None, compress=False, raw_data=False):
         """
         *rpc_command* specifies rpc command to be dispatched either in plain text or in xml element format (depending on command)
 
@@ -212,6 +318,12 @@ class Dispatch(RPC):
 
         *filter* specifies the portion of the configuration to retrieve (by default entire configuration is retrieved)
 
+        *sink*, if given, is where the reply is written as it is received instead of being kept in memory: a file name, a file object or a callable taking :class:`bytes`; the result is then a :class:`~ncclient.operations.rpc.SinkReply`
+
+        *compress* gzip compresses what is written to *sink*
+
+        *raw_data*, if true, leaves the content of the *data* element unparsed; the result is then a :class:`RawDataReply`
+
         :seealso: :ref:`filter_params`
 
         Examples of usage::
@@ -236,4 +348,5 @@ class Dispatch(RPC):
         if filter is not None:
             node.append(util.build_filter(filter))
 
-        return self._request(node)
+        return self._request(node, sink=sink, compress=compress,
+                             reply_cls=RawDataReply if raw_data else None)
@@ -12,19 +12,70 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from threading import Event, Lock
-from uuid import uuid4
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Condition, Event, Lock, Thread
+import heapq
+import itertools
+import time
+import weakref
+from xml.sax.saxutils import escape
 import six
 
 from ncclient.xml_ import *
 from ncclient.logging_ import SessionLoggerAdapter
 from ncclient.transport import SessionListener
+from ncclient.transport.framing import SinkMessageBuilder
 
-from ncclient.operations.errors import OperationError, TimeoutExpiredError, MissingCapabilityError
+from ncclient.operations.errors import OperationError, TimeoutExpiredError, MissingCapabilityError, PipelineFullError
 
 import logging
 logger = logging.getLogger("ncclient.operations.rpc")
 
+# not affected by changes to the system time where available
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class _Expiry(object):
+
+    # runs the TTL sweeps of the reply listeners of all sessions from a
+    # single thread, started once needed, see RPCReplyListener._arm()
+
+    def __init__(self):
+        self._cond = Condition()
+        # (due, sequence number, weak reference to the listener)
+        self._heap = []
+        self._seq = itertools.count()
+        self._thread = None
+
+    def schedule(self, due, listener):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), weakref.ref(listener)))
+            # also after a fork, which leaves the thread behind
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name='ncclient-rpc-expiry')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = _clock()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                due, _, ref = heapq.heappop(self._heap)
+            listener = ref()
+            if listener is not None:
+                try:
+                    listener._expire(due)
+                except Exception:
+                    logger.exception('Failed to expire RPCs')
+
+_expiry = _Expiry()
+
 
 class RPCError(OperationError):
 
@@ -41,14 +92,18 @@ class RPCError(OperationError):
 
     def __init__(self, raw, errs=None):
         self._raw = raw
+        self._info_ele = None
         if errs is None:
             # Single RPCError
             for attr in six.itervalues(RPCError.tag_to_attr):
                 setattr(self, attr, None)
             for subele in raw:
                 attr = RPCError.tag_to_attr.get(subele.tag, None)
-                if attr is not None:
-                    setattr(self, attr, subele.text if attr != "_info" else to_xml(subele) )
+                if attr == "_info":
+                    # serialized when asked for, see info
+                    self._info_ele = subele
+                elif attr is not None:
+                    setattr(self, attr, subele.text)
             if self.message is not None:
                 OperationError.__init__(self, self.message)
             else:
@@ -77,7 +132,7 @@ class RPCError(OperationError):
             OperationError.__init__(self, self.message)
 
     def to_dict(self):
-        return dict([ (attr[1:], getattr(self, attr)) for attr in six.itervalues(RPCError.tag_to_attr) ])
+        return dict([ (attr[1:], getattr(self, attr[1:])) for attr in six.itervalues(RPCError.tag_to_attr) ])
 
     @property
     def xml(self):
@@ -113,6 +168,8 @@ class RPCError(OperationError):
     @property
     def info(self):
         "XML string or `None`; representing the `error-info` element."
+        if self._info is None and self._info_ele is not None:
+            self._info = to_xml(self._info_ele)
         return self._info
 
 
@@ -120,10 +177,15 @@ class RPCReply(object):
 
     """Represents an *rpc-reply*. Only concerns itself with whether the operation was successful.
 
-    *raw*: the raw unparsed reply
+    *raw*: the raw unparsed reply, as received (:class:`bytes` or :class:`bytearray`) or as a string
 
     *huge_tree*: parse XML with very deep trees and very long text content
 
+    *root*: the already parsed *rpc-reply* element, if available
+
+    *deep_errors*: look for *rpc-error* elements anywhere in the reply rather
+    than only among the children of *rpc-reply*, where RFC 6241 has them
+
     .. note::
         If the reply has not yet been parsed there is an implicit, one-time parsing overhead to
         accessing some of the attributes defined by this class.
@@ -132,29 +194,36 @@ class RPCReply(object):
     ERROR_CLS = RPCError
     "Subclasses can specify a different error class, but it should be a subclass of `RPCError`."
 
-    def __init__(self, raw, huge_tree=False):
+    __slots__ = ('_raw', '_parsed', '_root', '_error_eles', '_error_objs',
+                 '_huge_tree', '_deep_errors')
+
+    def __init__(self, raw, huge_tree=False, root=None, deep_errors=False):
         self._raw = raw
         self._parsed = False
-        self._root = None
-        self._errors = []
+        self._root = root
+        self._error_eles = []
+        self._error_objs = None
         self._huge_tree = huge_tree
+        self._deep_errors = deep_errors
 
     def __repr__(self):
-        return self._raw
+        return to_text(self._raw)
 
     def parse(self):
         "Parses the *rpc-reply*."
         if self._parsed: return
-        root = self._root = to_ele(self._raw, huge_tree=self._huge_tree) # The <rpc-reply> element
+        root = self._root # The <rpc-reply> element
+        if root is None:
+            root = self._root = to_ele(self._raw, huge_tree=self._huge_tree)
         # Per RFC 4741 an <ok/> tag is sent when there are no errors or warnings
         ok = root.find(qualify("ok"))
         if ok is None:
-            # Create RPCError objects from <rpc-error> elements
-            error = root.find('.//'+qualify('rpc-error'))
-            if error is not None:
-                for err in root.getiterator(error.tag):
-                    # Process a particular <rpc-error>
-                    self._errors.append(self.ERROR_CLS(err))
+            # RPCError objects are only made from the <rpc-error> elements
+            # when they are asked for
+            if self._deep_errors:
+                self._error_eles = list(root.iter(qualify('rpc-error')))
+            else:
+                self._error_eles = root.findall(qualify('rpc-error'))
         self._parsing_hook(root)
         self._parsed = True
 
@@ -162,16 +231,22 @@ class RPCReply(object):
         "No-op by default. Gets passed the *root* element for the reply."
         pass
 
+    @property
+    def _errors(self):
+        if self._error_objs is None:
+            self._error_objs = [self.ERROR_CLS(err) for err in self._error_eles]
+        return self._error_objs
+
     @property
     def xml(self):
         "*rpc-reply* element as returned."
-        return self._raw
+        return to_text(self._raw)
 
     @property
     def ok(self):
         "Boolean value indicating if there were no errors."
         self.parse()
-        return not self.errors # empty list => false
+        return not self._error_eles # empty list => false
 
     @property
     def error(self):
@@ -189,28 +264,181 @@ class RPCReply(object):
         return self._errors
 
 
+class SinkReply(RPCReply):
+
+    """Reply to an RPC whose reply was written to a sink. Only carries whether
+    the operation was successful (:attr:`ok`, :attr:`error`, :attr:`errors`)
+    and the :attr:`size` of the reply; :attr:`xml` is the reply without its
+    payload.
+
+    *sink* is the :class:`~ncclient.transport.framing.SinkMessageBuilder` the
+    reply was written with.
+    """
+
+    __slots__ = ('_size', '_sink_error')
+
+    def __init__(self, raw, sink, huge_tree=False, root=None, deep_errors=False):
+        RPCReply.__init__(self, raw, huge_tree=huge_tree, root=root,
+                          deep_errors=deep_errors)
+        self._size = sink.written
+        self._sink_error = sink.error
+
+    @property
+    def size(self):
+        "Size of the reply written to the sink, in bytes (before compression)."
+        return self._size
+
+    @property
+    def sink_error(self):
+        "Exception that prevented the reply from being written out, or `None`."
+        return self._sink_error
+
+
 class RPCReplyListener(SessionListener): # internal use
 
     creation_lock = Lock()
 
+    LATE_IDS_KEPT = 1024
+    # message-ids of cancelled and expired RPCs remembered, see callback()
+
     # one instance per session -- maybe there is a better way??
     def __new__(cls, session, device_handler):
+        # the session keeps track of it, so it is normally found without
+        # taking any lock
+        instance = session.get_listener_instance(cls)
+        if instance is not None:
+            return instance
         with RPCReplyListener.creation_lock:
             instance = session.get_listener_instance(cls)
             if instance is None:
                 instance = object.__new__(cls)
                 instance._lock = Lock()
+                # waited on for a place in the window, see acquire()
+                instance._window = Condition(instance._lock)
                 instance._id2rpc = {}
+                # message-ids of the RPCs sent, counted against max_in_flight
+                instance._sent = set()
+                # message-id -> deadline, only kept while ttl is set
+                instance._deadlines = {}
+                instance._next_sweep = None
+                # when _expiry sweeps next, see _arm()
+                instance._expiry_due = None
+                instance._late_ids = OrderedDict()
+                instance.ttl = None
+                instance.drop_late_replies = True
+                instance.max_in_flight = device_handler.max_rpcs_in_flight()
+                instance.block_when_full = True
                 instance._device_handler = device_handler
-                #instance._pipelined = session.can_pipeline
                 session.add_listener(instance)
                 instance.logger = SessionLoggerAdapter(logger,
                                                        {'session': session})
             return instance
 
     def register(self, id, rpc):
+        sweep = False
         with self._lock:
             self._id2rpc[id] = rpc
+            if self.ttl is not None:
+                now = _clock()
+                deadline = self._deadlines[id] = now + self.ttl
+                if self._next_sweep is None:
+                    self._next_sweep = deadline
+                else:
+                    sweep = now >= self._next_sweep
+                self._arm(deadline)
+        if sweep:
+            self.sweep()
+
+    def _arm(self, due):
+        # with the lock held: have sweep() run by *due* at the latest, even
+        # if the session goes quiet
+        if self._expiry_due is not None and self._expiry_due <= due:
+            return
+        self._expiry_due = due
+        _expiry.schedule(due, self)
+
+    def _expire(self, due):
+        with self._lock:
+            if self._expiry_due == due:
+                self._expiry_due = None
+        self.sweep()
+
+    def acquire(self, id, timeout=None):
+        """Take a place in the window of :attr:`max_in_flight` RPCs sent and
+        waiting for their reply for the RPC with message-id *id*, which is
+        about to be sent. While the window is full this blocks until a reply
+        makes room, for at most *timeout* seconds, or fails right away if
+        :attr:`block_when_full` is false; either way with
+        :exc:`PipelineFullError`, after which the RPC is forgotten."""
+        with self._lock:
+            if self.max_in_flight is not None and len(self._sent) >= self.max_in_flight:
+                deadline = None if timeout is None else _clock() + timeout
+                while len(self._sent) >= self.max_in_flight:
+                    remaining = None if deadline is None else deadline - _clock()
+                    if not self.block_when_full or (remaining is not None and remaining <= 0):
+                        self._forget(id)
+                        raise PipelineFullError('%d RPCs are already waiting for a reply'
+                                                % len(self._sent))
+                    self._window.wait(remaining)
+                    if self.max_in_flight is None:
+                        break
+            self._sent.add(id)
+
+    def unregister(self, id):
+        with self._lock:
+            self._forget(id)
+
+    def cancel(self, id):
+        """Forget the RPC with message-id *id*, if it is still waiting for
+        its reply, and return it. A reply that still arrives for it is
+        dropped, see :attr:`drop_late_replies`."""
+        with self._lock:
+            rpc = self._forget(id)
+            if rpc is not None:
+                self._late(id)
+            return rpc
+
+    def sweep(self):
+        """Expire the RPCs that have waited longer than :attr:`ttl` for their
+        reply; they fail with :exc:`TimeoutExpiredError`. Runs now and then
+        as RPCs are registered and replies received, and by the time the
+        oldest RPC expires from a thread shared by all sessions, should the
+        session be idle."""
+        with self._lock:
+            now = _clock()
+            expired = [id for id, deadline in six.iteritems(self._deadlines)
+                       if deadline <= now]
+            rpcs = []
+            for id in expired:
+                rpcs.append(self._forget(id))
+                self._late(id)
+            self._next_sweep = None if self.ttl is None else now + self.ttl / 2.0
+            if self._deadlines:
+                self._arm(min(six.itervalues(self._deadlines)))
+        if rpcs:
+            self.logger.warning('Expired %d RPCs still waiting for a reply after %rs',
+                                len(rpcs), self.ttl)
+        for rpc in rpcs:
+            rpc._abandon(TimeoutExpiredError('ncclient gave up waiting for an rpc reply.'))
+
+    def _forget(self, id):
+        # with the lock held: drop the RPC and free its place in the window
+        self._deadlines.pop(id, None)
+        if id in self._sent:
+            self._sent.remove(id)
+            self._window.notify()
+        return self._id2rpc.pop(id, None)
+
+    def _late(self, id):
+        # remember a message-id whose reply is no longer waited for
+        self._late_ids[id] = None
+        if len(self._late_ids) > self.LATE_IDS_KEPT:
+            self._late_ids.popitem(last=False)
+
+    @property
+    def in_flight(self):
+        "Number of RPCs waiting for their reply."
+        return len(self._id2rpc)
 
     def callback(self, root, raw):
         tag, attrs = root
@@ -223,23 +451,34 @@ class RPCReplyListener(SessionListener): # internal use
         else:
             id = attrs["message-id"]  # get the msgid
             with self._lock:
-                try:
-                    rpc = self._id2rpc[id]  # the corresponding rpc
-                    self.logger.debug("Delivering to %r", rpc)
-                    rpc.deliver_reply(raw)
-                except KeyError:
-                    raise OperationError("Unknown 'message-id': %s" % id)
-                # no catching other exceptions, fail loudly if must
-                else:
-                    # if no error delivering, can del the reference to the RPC
-                    del self._id2rpc[id]
+                rpc = self._forget(id)  # the corresponding rpc
+                sweep = self._next_sweep is not None and _clock() >= self._next_sweep
+                if rpc is None:
+                    # nobody is waiting for it (anymore), so don't parse it;
+                    # raising would take the whole session down
+                    if self.drop_late_replies and id in self._late_ids:
+                        del self._late_ids[id]
+                        self.logger.debug("Dropping late reply to %s", id)
+                    else:
+                        self.logger.warning("Dropping reply with unknown 'message-id': %s", id)
+                    return
+            self.logger.debug("Delivering to %r", rpc)
+            # not holding the lock, as done callbacks of futures may well
+            # send more requests; no catching exceptions, fail loudly if must
+            rpc.deliver_reply(raw, getattr(root, 'element', None))
+            if sweep:
+                self.sweep()
 
     def errback(self, err):
-        try:
-            for rpc in six.itervalues(self._id2rpc):
-                rpc.deliver_error(err)
-        finally:
+        with self._lock:
+            rpcs = list(six.itervalues(self._id2rpc))
             self._id2rpc.clear()
+            self._deadlines.clear()
+            self._sent.clear()
+            self._window.notify_all()
+            self._expiry_due = None
+        for rpc in rpcs:
+            rpc.deliver_error(err)
 
 
 class RaiseMode(object):
@@ -261,6 +500,85 @@ class RaiseMode(object):
     "Don't look at the `error-type`, always raise."
 
 
+
+class PreparedRPC(object):
+
+    """An RPC request that has been serialized once, to be sent any number of
+    times; each time only a new *message-id* is put into the cached bytes.
+    See :meth:`RPC.prepare` and :meth:`~ncclient.manager.Manager.prepare`.
+
+    The request was built with the device handler and checked against the
+    capabilities of the session it was prepared on, so it should only be sent
+    on sessions to devices of the same kind.
+    """
+
+    MARKER = 'ncclient-prepared-rpc'
+    # stands in for the message-id while the request is serialized
+
+    __slots__ = ('cls', 'huge_tree', 'kwargs', '_head', '_tail')
+
+    def __init__(self, cls, xml, huge_tree=False, **kwargs):
+        #: the :class:`RPC` subclass the request was prepared with
+        self.cls = cls
+        #: whether the reply needs :attr:`RPC.huge_tree` support, as the
+        #: request set it when prepared
+        self.huge_tree = huge_tree
+        #: arguments for :meth:`RPC._request`, such as *sink*
+        self.kwargs = kwargs
+        head, marker, tail = xml.encode('UTF-8').partition(
+            ('message-id="%s"' % self.MARKER).encode('UTF-8'))
+        if not marker:
+            raise OperationError('message-id not found in prepared request')
+        self._head = head + b'message-id="'
+        self._tail = b'"' + tail
+
+    def render(self, message_id):
+        "Return the request, as :class:`bytes`, with *message_id* filled in."
+        return b''.join((self._head,
+                         escape(message_id, {'"': '&quot;'}).encode('UTF-8'),
+                         self._tail))
+
+    def __repr__(self):
+        return '<PreparedRPC %s: %r>' % (self.cls.__name__, self.render('')[:80])
+
+
+class RPCFuture(Future):
+
+    """What an :class:`RPC` requested in asynchronous mode returns: a
+    :class:`concurrent.futures.Future` that resolves to the reply just as a
+    synchronous request returns it, or to the exception it raises, including
+    :exc:`RPCError` depending on the :attr:`~RPC.raise_mode`. So any number
+    of outstanding RPCs can be waited for with :func:`concurrent.futures.wait`
+    or :func:`~concurrent.futures.as_completed`.
+
+    Callbacks added with :meth:`add_done_callback` are run by the thread that
+    receives the reply, so they should not take long.
+
+    Attributes of the RPC, such as :attr:`~RPC.event`, :attr:`~RPC.reply` and
+    :attr:`~RPC.id`, can be used on the future as well.
+    """
+
+    def __init__(self, rpc):
+        Future.__init__(self)
+        #: The :class:`RPC` requested.
+        self.rpc = rpc
+
+    def cancel(self):
+        "Cancels the RPC unless its reply was received already, see :meth:`RPC.cancel`."
+        return self.rpc.cancel()
+
+    def _set_cancelled(self):
+        # internal use, by the RPC once cancelled; the second step is what
+        # wait() and as_completed() look for, as executors would do it
+        Future.cancel(self)
+        self.set_running_or_notify_cancel()
+
+    def __getattr__(self, name):
+        if name == 'rpc':
+            raise AttributeError(name)
+        return getattr(self.rpc, name)
+
+
 class RPC(object):
 
     """Base class for all operations, directly corresponding to *rpc* requests. Handles making the request, and taking delivery of the reply."""
@@ -271,6 +589,10 @@ class RPC(object):
     REPLY_CLS = RPCReply
     "By default :class:`RPCReply`. Subclasses can specify a :class:`RPCReply` subclass."
 
+    __slots__ = ('_session', '_async', '_timeout', '_raise_mode', '_huge_tree',
+                 '_id', '_listener', '_reply', '_error', '_sink', '_reply_cls',
+                 '_event', '_device_handler', 'logger', '_preparing', '_future')
+
 
     def __init__(self, session, device_handler, async_mode=False, timeout=30, raise_mode=RaiseMode.NONE, huge_tree=False):
         """
@@ -296,64 +618,138 @@ class RPC(object):
         self._timeout = timeout
         self._raise_mode = raise_mode
         self._huge_tree = huge_tree
-        self._id = uuid4().urn # Keeps things simple instead of having a class attr with running ID that has to be locked
+        self._id = session.next_message_id()
         self._listener = RPCReplyListener(session, device_handler)
-        self._listener.register(self._id, self)
         self._reply = None
         self._error = None
+        self._sink = None
+        self._reply_cls = None
         self._event = Event()
         self._device_handler = device_handler
-        self.logger = SessionLoggerAdapter(logger, {'session': session})
+        # the same for every RPC on the session
+        self.logger = self._listener.logger
+        self._preparing = False
+        self._future = None
 
 
-    def _wrap(self, subele):
+    def _wrap(self, subele, message_id=None):
         # internal use
-        ele = new_ele("rpc", {"message-id": self._id},
+        ele = new_ele("rpc", {"message-id": self._id if message_id is None else message_id},
                       **self._device_handler.get_xml_extra_prefix_kwargs())
         ele.append(subele)
         #print to_xml(ele)
         return to_xml(ele)
 
-    def _request(self, op):
+    def prepare(self, *args, **kwds):
+        """Build the request just like :meth:`request` does with the same
+        arguments, but return it as a :class:`PreparedRPC` instead of sending
+        it. This RPC object is not used any further."""
+        self._preparing = True
+        try:
+            return self.request(*args, **kwds)
+        finally:
+            self._preparing = False
+
+    def _request(self, op, sink=None, compress=False, reply_cls=None):
         """Implementations of :meth:`request` call this method to send the request and process the reply.
 
         In synchronous mode, blocks until the reply is received and returns :class:`RPCReply`. Depending on the :attr:`raise_mode` a `rpc-error` element in the reply may lead to an :exc:`RPCError` exception.
 
-        In asynchronous mode, returns immediately, returning `self`. The :attr:`event` attribute will be set when the reply has been received (see :attr:`reply`) or an error occured (see :attr:`error`).
+        In asynchronous mode, returns immediately, returning an :class:`RPCFuture`. It resolves to what the request would have returned in synchronous mode, or to the exception it would have raised. The :attr:`event` attribute will also be set when the reply has been received (see :attr:`reply`) or an error occured (see :attr:`error`).
 
         *op* is the operation to be requested as an :class:`~xml.etree.ElementTree.Element`
+
+        *sink*, if given, is where the reply is written as it is received: a file name, a file object or a callable taking :class:`bytes`. It is not kept in memory and the reply is a :class:`SinkReply`. With *compress* it is written gzip compressed.
+
+        *reply_cls*, if given, is the :class:`RPCReply` subclass the reply is made into instead of :attr:`REPLY_CLS`. Such a reply is returned as it is, without the device handler's reply transform.
+
+        *op* may also be a :class:`PreparedRPC`, whose request is sent with this RPC's *message-id*.
+
+        If the session already has as many RPCs waiting for their reply as it allows, see :attr:`~ncclient.manager.Manager.max_rpcs_in_flight`, this waits for up to :attr:`timeout` seconds for one of them to be answered before sending the request, and raises :exc:`PipelineFullError` if none is.
         """
+        if self._preparing:
+            # nothing is sent and no reply will come for this RPC
+            return PreparedRPC(type(self), self._wrap(op, PreparedRPC.MARKER),
+                               huge_tree=self._huge_tree, sink=sink, compress=compress,
+                               reply_cls=reply_cls)
         self.logger.info('Requesting %r', self.__class__.__name__)
-        req = self._wrap(op)
-        self._session.send(req)
+        if isinstance(op, PreparedRPC):
+            req = op.render(self._id)
+        else:
+            req = self._wrap(op)
+        self._reply_cls = reply_cls
+        self._listener.acquire(self._id, self._timeout)
+        try:
+            if sink is not None:
+                self._sink = SinkMessageBuilder(sink, compress, self._id)
+                self._session.redirect_message(self._id, self._sink)
+            if self._async:
+                # before sending, the reply may be quick
+                self._future = RPCFuture(self)
+            self._listener.register(self._id, self)
+            self._session.send(req)
+        except Exception:
+            # nothing was sent, so no reply will take the RPC out of the window
+            self._listener.unregister(self._id)
+            if self._sink is not None:
+                self._session.redirect_message(self._id, None)
+            raise
         if self._async:
-            self.logger.debug('Async request, returning %r', self)
-            return self
+            self.logger.debug('Async request, returning %r', self._future)
+            return self._future
         else:
             self.logger.debug('Sync request, will wait for timeout=%r', self._timeout)
             self._event.wait(self._timeout)
             if self._event.isSet():
-                if self._error:
-                    # Error that prevented reply delivery
-                    raise self._error
-                self._reply.parse()
-                if self._reply.error is not None and not self._device_handler.is_rpc_error_exempt(self._reply.error.message):
-                    # <rpc-error>'s [ RPCError ]
-
-                    if self._raise_mode == RaiseMode.ALL or (self._raise_mode == RaiseMode.ERRORS and self._reply.error.severity == "error"):
-                        errlist = []
-                        errors = self._reply.errors
-                        if len(errors) > 1:
-                            raise RPCError(to_ele(self._reply._raw), errs=errors)
-                        else:
-                            raise self._reply.error
-                if self._device_handler.transform_reply():
-                    return NCElement(self._reply, self._device_handler.transform_reply(), huge_tree=self._huge_tree)
-                else:
-                    return self._reply
+                return self._result()
             else:
+                self._listener.cancel(self._id)
+                if self._sink is not None:
+                    self._session.redirect_message(self._id, None)
                 raise TimeoutExpiredError('ncclient timed out while waiting for an rpc reply.')
 
+    def _result(self):
+        # what the request comes to once the event is set: a reply to
+        # return or an exception to raise
+        if self._error:
+            # Error that prevented reply delivery
+            raise self._error
+        if self._sink is not None and self._sink.error is not None:
+            raise self._sink.error
+        self._reply.parse()
+        if self._reply.error is not None and not self._device_handler.is_rpc_error_exempt(self._reply.error.message):
+            # <rpc-error>'s [ RPCError ]
+
+            if self._raise_mode == RaiseMode.ALL or (self._raise_mode == RaiseMode.ERRORS and self._reply.error.severity == "error"):
+                errlist = []
+                errors = self._reply.errors
+                if len(errors) > 1:
+                    raise RPCError(to_ele(self._reply._raw), errs=errors)
+                else:
+                    raise self._reply.error
+        if self._sink is not None or self._reply_cls is not None:
+            return self._reply
+        transform = self._device_handler.get_reply_transform()
+        if transform:
+            return NCElement(self._reply, transform, huge_tree=self._huge_tree)
+        else:
+            return self._reply
+
+    def _resolve(self, cancelled=False):
+        # settle the future returned for an asynchronous request
+        future = self._future
+        if future is None:
+            return
+        if cancelled:
+            future._set_cancelled()
+            return
+        try:
+            result = self._result()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
     def request(self):
         """Subclasses must implement this method. Typically only the request needs to be built as an
         :class:`~xml.etree.ElementTree.Element` and everything else can be handed off to
@@ -367,15 +763,51 @@ class RPC(object):
         if capability not in self._session.server_capabilities:
             raise MissingCapabilityError('Server does not support [%s]' % capability)
 
-    def deliver_reply(self, raw):
+    def deliver_reply(self, raw, root=None):
         # internal use
-        self._reply = self.REPLY_CLS(raw, huge_tree=self._huge_tree)
+        kwargs = {'huge_tree': self._huge_tree}
+        if self._device_handler.nested_rpc_errors():
+            kwargs['deep_errors'] = True
+        if self._sink is not None:
+            if not self._sink.finished:
+                # the transport did not redirect the reply, write it out now
+                self._sink.write(raw.encode('UTF-8') if isinstance(raw, six.text_type) else raw)
+                raw = self._sink.finish()
+                root = None
+            self._reply = SinkReply(raw, self._sink, root=root, **kwargs)
+        else:
+            if root is not None:
+                kwargs['root'] = root
+            self._reply = (self._reply_cls or self.REPLY_CLS)(raw, **kwargs)
         self._event.set()
+        self._resolve()
 
-    def deliver_error(self, err):
+    def deliver_error(self, err, cancelled=False):
         # internal use
         self._error = err
         self._event.set()
+        self._resolve(cancelled)
+
+    def cancel(self):
+        """Stop waiting for the reply to this RPC, e.g. an asynchronous one
+        that is no longer of interest. It no longer counts as in flight and a
+        reply that still arrives is dropped without being parsed. Unless the
+        reply was received already, :attr:`error` is then set to an
+        :exc:`OperationError`, :attr:`event` is set and the
+        :class:`RPCFuture` returned for the request is cancelled.
+
+        Returns whether the RPC was still waiting for its reply.
+        """
+        if self._listener.cancel(self._id) is None:
+            return False
+        self._abandon(OperationError('rpc cancelled while waiting for its reply'), True)
+        return True
+
+    def _abandon(self, err, cancelled=False):
+        # internal use, once removed from the listener
+        if self._sink is not None:
+            self._session.redirect_message(self._id, None)
+        self.deliver_error(err, cancelled)
 
     @property
     def reply(self):
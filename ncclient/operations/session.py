@@ -22,6 +22,8 @@ class CloseSession(RPC):
 
     "`close-session` RPC. The connection to NETCONF server is also closed."
 
+    __slots__ = ()
+
     def request(self):
         "Request graceful termination of the NETCONF session, and also close the transport."
         try:
@@ -34,6 +36,8 @@ class KillSession(RPC):
 
     "`kill-session` RPC."
 
+    __slots__ = ()
+
     def request(self, session_id):
         """Force the termination of a NETCONF session (not the current one!)
 
@@ -22,6 +22,8 @@ from ncclient.operations import util
 class CreateSubscription(RPC):
     "`create-subscription` RPC. Depends on the `:notification` capability."
 
+    __slots__ = ()
+
     DEPENDS = [':notification']
 
     def request(self, filter=None, stream_name=None, start_time=None, stop_time=None):
@@ -7,6 +7,8 @@ from ncclient.operations import util
 
 
 class ShowCLI(RPC):
+    __slots__ = ()
+
     def request(self, command=None):
         """Run CLI -show commands
         *command* (show) command to run
@@ -21,6 +23,8 @@ class ShowCLI(RPC):
 
 
 class GetConfiguration(RPC):
+    __slots__ = ()
+
 
     def request(self, content='xml', filter=None, detail=False):
         """Get config from Alu router
@@ -58,6 +62,8 @@ class GetConfiguration(RPC):
 
 
 class LoadConfiguration(RPC):
+    __slots__ = ()
+
 
     def request(self, format='xml', default_operation=None, target='running', config=None):
         node = new_ele('edit-config')
@@ -11,6 +11,8 @@ from ncclient.operations.rpc import RPC
 class GetBulk(RPC):
     "The *get-bulk* RPC."
 
+    __slots__ = ()
+
     def request(self, filter=None):
         """Retrieve running configuration and device state information.
 
@@ -27,6 +29,8 @@ class GetBulk(RPC):
 class GetBulkConfig(RPC):
     """The *get-bulk-config* RPC."""
 
+    __slots__ = ()
+
     def request(self, source, filter=None):
         """Retrieve all or part of a specified configuration.
 
@@ -43,6 +47,8 @@ class GetBulkConfig(RPC):
 
 
 class CLI(RPC):
+    __slots__ = ()
+
     def request(self, command=None):
         """command text
         view: Execution user view exec
@@ -55,12 +61,16 @@ class CLI(RPC):
 
 
 class Action(RPC):
+    __slots__ = ()
+
     def request(self, action=None):
         node = new_ele("action")
         node.append(validated_element(action))
         return self._request(node)
 
 class Save(RPC):
+    __slots__ = ()
+
     def request(self, file=None):
         node = new_ele('save')
         sub_ele(node, 'file').text = file
@@ -68,6 +78,8 @@ class Save(RPC):
 
 
 class Load(RPC):
+    __slots__ = ()
+
     def request(self, file=None):
         node = new_ele('load')
         sub_ele(node, 'file').text = file
@@ -75,6 +87,8 @@ class Load(RPC):
 
 
 class Rollback(RPC):
+    __slots__ = ()
+
     def request(self, file=None):
         node = new_ele('rollback')
         sub_ele(node, 'file').text = file
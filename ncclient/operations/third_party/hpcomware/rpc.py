@@ -4,6 +4,8 @@ from ncclient.operations.rpc import RPC
 
 
 class DisplayCommand(RPC):
+    __slots__ = ()
+
     def request(self, cmds):
         """
         Single Execution element is permitted.
@@ -23,6 +25,8 @@ class DisplayCommand(RPC):
 
 
 class ConfigCommand(RPC):
+    __slots__ = ()
+
     def request(self, cmds):
         """
         Single Configuration element is permitted.
@@ -44,6 +48,8 @@ class ConfigCommand(RPC):
 
 
 class Action(RPC):
+    __slots__ = ()
+
     def request(self, action=None):
         node = new_ele("action")
         node.append(validated_element(action))
@@ -51,6 +57,8 @@ class Action(RPC):
 
 
 class Save(RPC):
+    __slots__ = ()
+
     def request(self, filename=None):
         node = new_ele('save')
         sub_ele(node, 'file').text = filename
@@ -58,6 +66,8 @@ class Save(RPC):
 
 
 class Rollback(RPC):
+    __slots__ = ()
+
     def request(self, filename=None):
         node = new_ele('rollback')
         sub_ele(node, 'file').text = filename
@@ -8,6 +8,8 @@ from ncclient.operations.rpc import RPC
 
 
 class CLI(RPC):
+    __slots__ = ()
+
     def request(self, command=None):
         """command text
         view: Execution user view exec
@@ -21,6 +23,8 @@ class CLI(RPC):
 
 class Action(RPC):
     "`execute-action` RPC"
+
+    __slots__ = ()
     def request(self, action=None):
         node = new_ele("execute-action", attrs={"xmlns":HW_PRIVATE_NS})
         node.append(validated_element(action))
@@ -4,6 +4,8 @@ from ncclient.xml_ import *
 from ncclient.operations.rpc import RPC
 
 class SaveConfig(RPC):
+    __slots__ = ()
+
     def request(self):
         node = etree.Element(qualify('save-config', "http://cisco.com/yang/cisco-ia"))
         return self._request(node)
@@ -8,16 +8,20 @@ import math
 
 
 class GetConfiguration(RPC):
-    def request(self, format='xml', filter=None):
+    __slots__ = ()
+
+    def request(self, format='xml', filter=None, sink=None, compress=False):
         node = new_ele('get-configuration', {'format':format})
         if filter is not None:
             node.append(filter)
         if format !='xml':
             # The entire config comes as a single text element and this requires huge_tree support for large configs
             self._huge_tree = True
-        return self._request(node)
+        return self._request(node, sink=sink, compress=compress)
 
 class LoadConfiguration(RPC):
+    __slots__ = ()
+
     def request(self, format='xml', action='merge',
             target='candidate', config=None):
         if config is not None:
@@ -38,28 +42,38 @@ class LoadConfiguration(RPC):
             return self._request(node)
 
 class CompareConfiguration(RPC):
+    __slots__ = ()
+
     def request(self, rollback=0, format='text'):
         node = new_ele('get-configuration', {'compare':'rollback', 'format':format, 'rollback':str(rollback)})
         return self._request(node)
 
 class ExecuteRpc(RPC):
+    __slots__ = ()
+
     def request(self, rpc):
         if isinstance(rpc, str):
             rpc = to_ele(rpc)
         return self._request(rpc)
 
 class Command(RPC):
+    __slots__ = ()
+
     def request(self, command=None, format='xml'):
         node = new_ele('command', {'format':format})
         node.text = command
         return self._request(node)
 
 class Reboot(RPC):
+    __slots__ = ()
+
     def request(self):
         node = new_ele('request-reboot')
         return self._request(node)
 
 class Halt(RPC):
+    __slots__ = ()
+
     def request(self):
         node = new_ele('request-halt')
         return self._request(node)
@@ -67,6 +81,8 @@ class Halt(RPC):
 class Commit(RPC):
     "`commit` RPC. Depends on the `:candidate` capability, and the `:confirmed-commit`."
 
+    __slots__ = ()
+
     DEPENDS = [':candidate']
 
     def request(self, confirmed=False, timeout=None, comment=None, synchronize=False, at_time=None, check=False):
@@ -115,6 +131,8 @@ class Commit(RPC):
         return self._request(node)
 
 class Rollback(RPC):
+    __slots__ = ()
+
     def request(self, rollback=0):
         node = new_ele('load-configuration', {'rollback':str(rollback)})
         return self._request(node)
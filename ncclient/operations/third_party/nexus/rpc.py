@@ -4,6 +4,8 @@ from ncclient.xml_ import *
 from ncclient.operations.rpc import RPC
 
 class ExecCommand(RPC):
+    __slots__ = ()
+
     def request(self, cmds):
         node = etree.Element(qualify('exec-command', NXOS_1_0))
 
@@ -14,13 +14,14 @@
 
 "Transport layer"
 
-from ncclient.transport.session import Session, SessionListener
+from ncclient.transport.session import Session, SessionListener, ParsedRoot
 from ncclient.transport.ssh import SSHSession
 from ncclient.transport.errors import *
 
 __all__ = [
     'Session',
     'SessionListener',
+    'ParsedRoot',
     'SSHSession',
     'TransportError',
     'AuthenticationError',
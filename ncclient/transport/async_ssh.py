@@ -0,0 +1,181 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"NETCONF over SSH driven by an :mod:`asyncio` event loop (Python 3.5+)"
+
+import asyncio
+import functools
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+from ncclient.transport.errors import SessionCloseError, SessionError
+from ncclient.transport.session import HELLO_TIMEOUT
+from ncclient.transport.ssh import SSHSession, TICK
+
+import logging
+logger = logging.getLogger("ncclient.transport.async_ssh")
+
+
+class NotificationQueue(object):
+
+    """Where an :class:`AsyncSSHSession` keeps the notifications received
+    until they are awaited, see :meth:`AsyncSSHSession.next_notification`.
+    Also takes the place of the :class:`queue.Queue` other sessions use, for
+    :meth:`~ncclient.transport.Session.take_notification` without blocking."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._q = asyncio.Queue()
+
+    def put(self, notification):
+        # called wherever messages are dispatched, which need not be the loop
+        self._loop.call_soon_threadsafe(self._q.put_nowait, notification)
+
+    def get(self, block=True, timeout=None):
+        try:
+            return self._q.get_nowait()
+        except asyncio.QueueEmpty:
+            raise Empty
+
+    async def wait(self):
+        return await self._q.get()
+
+
+class AsyncSSHSession(SSHSession):
+
+    """An :class:`~ncclient.transport.SSHSession` that runs on an
+    :mod:`asyncio` event loop rather than in a thread of its own: received
+    data is read, framed and dispatched from a reader callback on the loop,
+    and queued requests are written out from the loop. So replies are
+    delivered, and :class:`~ncclient.operations.RPCFuture` callbacks run, on
+    the loop.
+
+    The SSH connection itself is still handled by :mod:`paramiko`, whose
+    blocking setup and authentication :meth:`connect` runs in the loop's
+    default executor.
+    """
+
+    def __init__(self, device_handler, loop=None):
+        SSHSession.__init__(self, device_handler)
+        self._loop = loop
+        self._reading = False
+        # see send() and _flush()
+        self._flush_scheduled = False
+
+    async def connect(self, *args, **kwds):
+        """Connect via SSH and initialize the NETCONF session, taking the same
+        arguments as :meth:`SSHSession.connect
+        <ncclient.transport.SSHSession.connect>`."""
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        loop = self._loop
+        self._notification_q = NotificationQueue(loop)
+        await loop.run_in_executor(
+            None, functools.partial(SSHSession.connect, self, *args, **kwds))
+        hello = loop.create_future()
+        def settle(error):
+            if not hello.done():
+                if error is None:
+                    hello.set_result(None)
+                else:
+                    hello.set_exception(error)
+        def ok_cb(id, capabilities):
+            self._id = id
+            self._server_capabilities = capabilities
+            loop.call_soon_threadsafe(settle, None)
+        def err_cb(err):
+            loop.call_soon_threadsafe(settle, err)
+        listener = self._send_hello(ok_cb, err_cb)
+        self.logger.debug('starting to read on the event loop')
+        self._start_reading()
+        error = None
+        try:
+            await asyncio.wait_for(hello, HELLO_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SessionError("Capability exchange timed out")
+        except Exception as e:
+            error = e
+        self._hello_done(listener, error)
+
+    def _open_wakeup(self):
+        # the loop wakes up by itself when something is sent
+        pass
+
+    def _post_connect(self):
+        # the greeting is done by connect() once back on the loop
+        pass
+
+    def _start_reading(self):
+        self._reading = True
+        self._loop.add_reader(self._channel.fileno(), self._on_readable)
+
+    def _stop_reading(self):
+        if self._reading:
+            self._reading = False
+            if self._channel is not None:
+                self._loop.remove_reader(self._channel.fileno())
+
+    def _on_readable(self):
+        try:
+            if not self._read_batch(self._channel):
+                if self._closing.is_set():
+                    # End of session, expected
+                    self._stop_reading()
+                    return
+                # End of session, unexpected
+                raise SessionCloseError(self._buffer.getvalue())
+        except Exception as e:
+            self._fail(e)
+
+    def send(self, message):
+        SSHSession.send(self, message)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_soon_threadsafe(self._flush)
+
+    def _flush(self):
+        """Write out the queued messages, as far as the channel takes them
+        without blocking. The channel offers nothing to wait on until it
+        takes more, so while it does not this tries again every
+        :data:`~ncclient.transport.ssh.TICK` seconds."""
+        self._flush_scheduled = False
+        chan = self._channel
+        if chan is None:
+            return
+        try:
+            if not self._write_ready(chan) and not self._flush_scheduled:
+                self._flush_scheduled = True
+                self._loop.call_later(TICK, self._flush)
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, e):
+        self.logger.debug("Broke out of main loop, error=%r", e)
+        self._stop_reading()
+        self._dispatch_error(e)
+        self.close()
+
+    def close(self):
+        self._stop_reading()
+        SSHSession.close(self)
+
+    async def aclose(self):
+        "Close the session without blocking the loop."
+        self._stop_reading()
+        await self._loop.run_in_executor(None, self.close)
+
+    async def next_notification(self):
+        "Wait for the next notification received and return it."
+        return await self._notification_q.wait()
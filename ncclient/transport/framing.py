@@ -0,0 +1,576 @@
+# Copyright 2009 Shikhar Bhushan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"NETCONF message framing, independent of any particular transport."
+
+import gzip
+import mmap
+import re
+import tempfile
+import zlib
+
+import six
+from lxml import etree
+
+from ncclient.transport.errors import NetconfFramingError
+from ncclient.xml_ import BASE_NS_1_0, RE_ROOT_START, qualify, sniff_root
+
+# v1.0: RFC 4742
+MSG_DELIM = b']]>]]>'
+MSG_DELIM_LEN = len(MSG_DELIM)
+# v1.1: RFC 6242
+END_DELIM = b'\n##\n'
+
+#
+# Define delimiters for chunks and messages for netconf 1.1 chunk enoding.
+# When matched:
+#
+# * result.group(0) will contain whole matched string
+# * result.group(1) will contain the digit string for a chunk
+# * result.group(2) will be defined if '##' found
+#
+RE_NC11_DELIM = re.compile(br'\n(?:#([0-9]+)|(##))\n')
+
+# RFC 6242 limits chunk-size to 4294967295, i.e. 10 digits, so a complete
+# delimiter can never be longer than this
+MAX_NC11_DELIM_LEN = len(b'\n#4294967295\n')
+
+# how much of a message is held back looking for its root start tag
+MAX_HEAD_LEN = 64 * 1024
+
+# replaces the content of a message larger than allowed
+TOO_BIG_ERROR = (
+    '<rpc-error xmlns="%s">'
+    '<error-type>rpc</error-type>'
+    '<error-tag>too-big</error-tag>'
+    '<error-severity>error</error-severity>'
+    '<error-message>message of %d bytes exceeds the maximum message size '
+    'of %d bytes</error-message>'
+    '</rpc-error>')
+
+
+def frame10(message):
+    "Return *message* (:class:`bytes`) framed for :rfc:`4742` transport."
+    return message + MSG_DELIM
+
+
+def frame11(message):
+    "Return *message* (:class:`bytes`) framed as a single :rfc:`6242` chunk."
+    return b''.join((('\n#%d\n' % len(message)).encode('ascii'), message, END_DELIM))
+
+
+class MessageBuilder(object):
+
+    """Collects the body of a message while a decoder takes it off the wire.
+
+    The decoder calls :meth:`write` with every piece of the body as soon as it
+    has been received and :meth:`finish` once the end of the message has been
+    seen; whatever :meth:`finish` returns is what the decoder yields. A piece
+    is a :class:`memoryview` of the decoder's buffer, only valid for the call,
+    so that it is copied once at most. This implementation appends the pieces
+    to a :class:`bytearray`, which is returned.
+
+    Once a message grows beyond *spill_threshold* bytes, it is moved to an
+    anonymous temporary file and returned as a read-only :class:`mmap.mmap`
+    of it. A message beyond *max_size* bytes is dropped as it comes in and
+    replaced by its root element holding a `too-big` *rpc-error*, so that
+    whoever waits for it gets an error.
+    """
+
+    element = None
+    "The parsed root element of the last finished message, if available."
+
+    def __init__(self, spill_threshold=None, max_size=None):
+        self.spill_threshold = spill_threshold
+        self.max_size = max_size
+        self._buf = bytearray()
+        self._file = None
+        # start of a message beyond max_size, once it has been dropped
+        self._dropped = None
+        self.size = 0
+
+    def write(self, data):
+        "Add *data* (any bytes-like object) to the message being received."
+        self.size += len(data)
+        if self._dropped is not None:
+            return
+        if self.max_size is not None and self.size > self.max_size:
+            self._dropped = self._head() + data[:MAX_HEAD_LEN]
+            self._discard()
+        elif self._file is not None:
+            self._file.write(data)
+        elif self.spill_threshold is not None and self.size > self.spill_threshold:
+            self._file = tempfile.TemporaryFile()
+            self._file.write(self._buf)
+            self._file.write(data)
+            self._buf = bytearray()
+        else:
+            self._buf += data
+
+    def _head(self):
+        # the first MAX_HEAD_LEN bytes of what has been kept
+        if self._file is not None:
+            self._file.seek(0)
+            return self._file.read(MAX_HEAD_LEN)
+        return bytes(self._buf[:MAX_HEAD_LEN])
+
+    def _discard(self):
+        self._buf = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _too_big(self):
+        match = RE_ROOT_START.match(self._dropped)
+        if match is None or match.group(2).endswith(b'/'):
+            start, end = b'<rpc-reply>', b'</rpc-reply>'
+        else:
+            start = self._dropped[match.start(1) - 1:match.end()]
+            end = b'</' + match.group(1) + b'>'
+        error = TOO_BIG_ERROR % (BASE_NS_1_0, self.size, self.max_size)
+        return start + error.encode('UTF-8') + end
+
+    def finish(self):
+        "Complete the current message and return it."
+        if self._dropped is not None:
+            message = self._too_big()
+        elif self._file is not None:
+            self._file.flush()
+            message = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            message = self._buf
+        MessageBuilder.reset(self)
+        return message
+
+    def reset(self):
+        "Discard the message being received."
+        self._discard()
+        self._dropped = None
+        self.size = 0
+
+
+class ParsingMessageBuilder(MessageBuilder):
+
+    """A :class:`MessageBuilder` that also feeds every piece to an
+    :class:`lxml.etree.XMLPullParser`, so that the document is parsed while
+    the rest of it is still being received. After :meth:`finish`, the root
+    element is available as :attr:`element`.
+
+    If the document cannot be parsed this way (it is not well-formed or
+    exceeds the parser's limits), :attr:`element` is `None` and the raw
+    message is left to the usual parsing path.
+    """
+
+    def __init__(self, spill_threshold=None, max_size=None):
+        MessageBuilder.__init__(self, spill_threshold, max_size)
+        self._parser = None
+        self.element = None
+
+    def write(self, data):
+        if not self.size:
+            # no event collection, just the tree
+            self._parser = etree.XMLPullParser(events=())
+        MessageBuilder.write(self, data)
+        if self._dropped is not None:
+            self._parser = None
+        elif self._parser is not None:
+            try:
+                self._parser.feed(_bytes(data))
+            except etree.XMLSyntaxError:
+                self._parser = None
+
+    def finish(self):
+        parser, self._parser = self._parser, None
+        self.element = None
+        if parser is not None:
+            try:
+                self.element = parser.close()
+            except etree.XMLSyntaxError:
+                pass
+        return MessageBuilder.finish(self)
+
+    def reset(self):
+        MessageBuilder.reset(self)
+        self._parser = None
+        self.element = None
+
+
+class RoutingMessageBuilder(MessageBuilder):
+
+    """Passes every message on to another builder.
+
+    *routes* is a dictionary, shared with the session, mapping message-ids to
+    builders. While it is not empty, the start of each message is held back
+    until its root start tag is complete. If the root's `message-id` attribute
+    has a route, that builder is taken out of *routes* and receives the
+    message; otherwise, and whenever *routes* is empty, *default* does.
+    """
+
+    def __init__(self, default, routes):
+        self.default = default
+        self.routes = routes
+        # builder receiving the current message, once known
+        self._current = None
+        self._head = b''
+        self.element = None
+
+    def _route(self, head):
+        root = sniff_root(head)
+        if root is None:
+            return None
+        message_id = root[1].get('message-id')
+        if message_id is None:
+            return self.default
+        return self.routes.pop(message_id, self.default)
+
+    def write(self, data):
+        if self._current is None:
+            if not self.routes:
+                self._current = self.default
+            else:
+                head = self._head + data
+                builder = self._route(head)
+                if builder is None:
+                    if len(head) < MAX_HEAD_LEN:
+                        self._head = head
+                        return
+                    builder = self.default
+                self._current = builder
+                self._head = b''
+                data = head
+        self._current.write(data)
+
+    def finish(self):
+        builder = self._current
+        if builder is None:
+            # ended before its root start tag was complete
+            builder = self.default
+            if self._head:
+                builder.write(self._head)
+        self._current = None
+        self._head = b''
+        message = builder.finish()
+        self.element = builder.element
+        return message
+
+    def reset(self):
+        if self._current is not None and self._current is not self.default:
+            self._current.reset()
+        self.default.reset()
+        self._current = None
+        self._head = b''
+        self.element = None
+
+    @property
+    def size(self):
+        size = len(self._head)
+        if self._current is not None:
+            size += self._current.size
+        return size
+
+
+def _bytes(data):
+    # what a builder is given may be a view of the decoder's buffer
+    return data if isinstance(data, bytes) else memoryview(data).tobytes()
+
+
+def _nsmap(nsmap):
+    # parser targets are given '' for the default namespace, elements want None
+    return dict((prefix or None, uri) for prefix, uri in (nsmap or {}).items())
+
+
+class _ReplySummary(object):
+
+    # lxml parser target keeping the root and the elements telling how an
+    # operation went, i.e. <ok/> and every <rpc-error>, and nothing else
+
+    def __init__(self):
+        self.root = None
+        self.children = []
+        self._depth = 0
+        self._tree = None
+        self._tree_depth = 0
+
+    def start(self, tag, attrib, nsmap=None):
+        self._depth += 1
+        if self._depth == 1:
+            self.root = etree.Element(tag, dict(attrib), nsmap=_nsmap(nsmap))
+        elif self._tree is not None:
+            self._tree.start(tag, attrib, _nsmap(nsmap))
+        else:
+            name = tag.rpartition('}')[2]
+            if name == 'rpc-error' or (name == 'ok' and self._depth == 2):
+                self._tree = etree.TreeBuilder()
+                self._tree_depth = self._depth
+                self._tree.start(tag, attrib, _nsmap(nsmap))
+
+    def end(self, tag):
+        if self._tree is not None:
+            self._tree.end(tag)
+            if self._depth == self._tree_depth:
+                self.children.append(self._tree.close())
+                self._tree = None
+        self._depth -= 1
+
+    def data(self, data):
+        if self._tree is not None:
+            self._tree.data(data)
+
+    def close(self):
+        pass
+
+
+class SinkMessageBuilder(MessageBuilder):
+
+    """Writes a message to *sink* while it is being received, rather than
+    keeping it in memory.
+
+    *sink* is a file name, a file object or a callable taking :class:`bytes`.
+    If *compress* is true, what is written is gzip compressed.
+
+    The message is also run through an XML parser that keeps nothing but the
+    `ok` and `rpc-error` elements, and :meth:`finish` returns just those under
+    the message's root element; enough for the reply to be dispatched and
+    checked for errors as usual. *message_id* is used for the root should the
+    message turn out not to be well-formed.
+
+    :attr:`written` is the size of the message as received. If it could not
+    be written or parsed, the exception is kept in :attr:`error`.
+    """
+
+    def __init__(self, sink, compress=False, message_id=None):
+        MessageBuilder.__init__(self)
+        self._sink = sink
+        self._compress = compress
+        self._message_id = message_id
+        self._out = None
+        self._close = None
+        self._target = _ReplySummary()
+        self._parser = etree.XMLParser(target=self._target, huge_tree=True)
+        self.written = 0
+        self.finished = False
+        self.error = None
+
+    def _open(self):
+        sink = self._sink
+        if isinstance(sink, six.string_types):
+            f = gzip.open(sink, 'wb') if self._compress else open(sink, 'wb')
+            self._out, self._close = f.write, f.close
+        elif hasattr(sink, 'write'):
+            if self._compress:
+                # closing the GzipFile leaves the file object open
+                f = gzip.GzipFile(fileobj=sink, mode='wb')
+                self._out, self._close = f.write, f.close
+            else:
+                self._out = sink.write
+        elif self._compress:
+            z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._out = lambda data: sink(z.compress(data))
+            self._close = lambda: sink(z.flush())
+        else:
+            self._out = sink
+
+    def write(self, data):
+        self.size += len(data)
+        if self.error is not None:
+            return
+        data = _bytes(data)
+        try:
+            if self._out is None:
+                self._open()
+            self._out(data)
+            self.written += len(data)
+            self._parser.feed(data)
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        try:
+            if self.error is None:
+                self._parser.close()
+        except Exception as e:
+            self.error = e
+        try:
+            if self._close is not None:
+                self._close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+        root = self._target.root
+        if root is None:
+            root = etree.Element(qualify('rpc-reply'),
+                                 {'message-id': self._message_id or ''})
+        root.extend(self._target.children)
+        self.size = 0
+        self.finished = True
+        return etree.tostring(root)
+
+    def reset(self):
+        self.error = self.error or IOError('message was not received completely')
+        self.finish()
+
+
+class EOMDecoder(object):
+
+    """Incremental decoder for :rfc:`4742` end-of-message framing.
+
+    Received data is appended with :meth:`feed`, complete messages are taken
+    out with :meth:`messages`. The delimiter is searched for in the raw bytes,
+    starting where the previous search gave up, so every byte is looked at
+    about once. Whatever cannot be part of the delimiter is handed to the
+    *builder* (a :class:`MessageBuilder` by default) right away, so messages
+    are returned as :class:`bytearray` with surrounding whitespace removed.
+    """
+
+    def __init__(self, builder=None):
+        self._buf = bytearray()
+        # where to resume searching for MSG_DELIM
+        self._search = 0
+        # whether part of the current message went to the builder
+        self._started = False
+        # where the data after the last message returned starts
+        self._start = 0
+        self.builder = builder if builder is not None else MessageBuilder()
+
+    def feed(self, data):
+        "Append *data* (any bytes-like object) as received from the transport."
+        self._buf += data
+
+    def messages(self):
+        "Yield every message that has been completed by the data fed so far."
+        buf = self._buf
+        builder = self.builder
+        start = 0
+        try:
+            while True:
+                end = buf.find(MSG_DELIM, max(start, self._search))
+                complete = end >= 0
+                if not complete:
+                    # the delimiter could be split across two reads
+                    end = max(start, len(buf) - MSG_DELIM_LEN + 1)
+                lo, hi = start, end
+                if not self._started:
+                    while lo < hi and buf[lo:lo + 1].isspace():
+                        lo += 1
+                # trailing whitespace is held back until we know whether
+                # more of the message follows
+                while hi > lo and buf[hi - 1:hi].isspace():
+                    hi -= 1
+                if hi > lo:
+                    builder.write(memoryview(buf)[lo:hi])
+                    self._started = True
+                if not complete:
+                    start = hi if self._started else lo
+                    self._search = end
+                    break
+                start = self._start = end + MSG_DELIM_LEN
+                self._started = False
+                yield builder.finish()
+        finally:
+            del buf[:start]
+            self._search = max(0, self._search - start)
+            self._start = 0
+
+    def reset(self):
+        "Discard all buffered data and any partially received message."
+        self.builder.reset()
+        self.__init__(self.builder)
+
+    @property
+    def pending(self):
+        "Number of bytes received for the message currently being decoded."
+        return self.builder.size + len(self._buf)
+
+    @property
+    def unread(self):
+        """Number of bytes fed that come after the last message returned by
+        :meth:`messages`, while it is being iterated over."""
+        return len(self._buf) - self._start
+
+
+class ChunkedDecoder(object):
+
+    """Incremental decoder for :rfc:`6242` chunked framing.
+
+    Received data is appended with :meth:`feed`, complete messages are taken
+    out with :meth:`messages`. The decoder keeps its read position and the
+    number of bytes still missing from the current chunk across calls, so no
+    byte is scanned or copied twice no matter how the data was split up.
+    Chunk bodies go to the *builder* (a :class:`MessageBuilder` by default) as
+    they arrive.
+    """
+
+    def __init__(self, builder=None):
+        self._buf = bytearray()
+        self._pos = 0
+        # bytes still expected for the chunk currently being read
+        self._remaining = 0
+        self.builder = builder if builder is not None else MessageBuilder()
+
+    def feed(self, data):
+        "Append *data* (any bytes-like object) as received from the transport."
+        self._buf += data
+
+    def messages(self):
+        """Yield every message that has been completed by the data fed so far,
+        as :class:`bytearray`. Raises :exc:`NetconfFramingError` if the data is not
+        validly chunked."""
+        buf = self._buf
+        try:
+            while True:
+                if self._remaining:
+                    # in the middle of a chunk body; take what we have
+                    end = min(len(buf), self._pos + self._remaining)
+                    if end == self._pos:
+                        break
+                    self.builder.write(memoryview(buf)[self._pos:end])
+                    self._remaining -= end - self._pos
+                    self._pos = end
+                    continue
+                match = RE_NC11_DELIM.match(buf, self._pos)
+                if match is None:
+                    if len(buf) - self._pos >= MAX_NC11_DELIM_LEN:
+                        raise NetconfFramingError(
+                            'expected chunk or end-of-message delimiter',
+                            bytes(buf[self._pos:self._pos + MAX_NC11_DELIM_LEN]))
+                    # only the first few bytes of a delimiter are here yet
+                    break
+                self._pos = match.end()
+                if match.group(2):
+                    yield self.builder.finish()
+                else:
+                    self._remaining = int(match.group(1))
+                    if not self._remaining:
+                        raise NetconfFramingError('invalid chunk size 0')
+        finally:
+            # drop everything consumed so far; at most a partial delimiter
+            # is left behind
+            del buf[:self._pos]
+            self._pos = 0
+
+    def reset(self):
+        "Discard all buffered data and any partially received message."
+        self.builder.reset()
+        self.__init__(self.builder)
+
+    @property
+    def pending(self):
+        "Number of bytes received for the message currently being decoded."
+        return self.builder.size + len(self._buf)
+
+    @property
+    def unread(self):
+        """Number of bytes fed that come after the last message returned by
+        :meth:`messages`, while it is being iterated over."""
+        return len(self._buf) - self._pos
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from ncclient.xml_ import to_ele
+from ncclient.xml_ import to_ele, to_text
 
 class Notification(object):
     def __init__(self, raw):
@@ -25,4 +25,4 @@ class Notification(object):
 
     @property
     def notification_xml(self):
-        return self._raw
+        return to_text(self._raw)
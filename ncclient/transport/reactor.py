@@ -0,0 +1,223 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"I/O of many SSH sessions in a few threads"
+
+import socket
+from collections import deque
+from threading import Thread, Lock
+
+try:
+    import selectors
+except ImportError:
+    import selectors2 as selectors
+
+from ncclient.transport.errors import SessionCloseError, TransportError
+from ncclient.transport.ssh import BUF_SIZE, TICK
+
+import logging
+logger = logging.getLogger("ncclient.transport.reactor")
+
+
+class Reactor(object):
+
+    """Does the I/O of any number of :class:`~ncclient.transport.SSHSession`
+    in a few threads, instead of each session doing it in a thread of its
+    own. Every thread waits on the channels of its sessions with a single
+    selector (epoll where available), then reads, frames and dispatches what
+    they receive and writes out what is sent on them just as a session's own
+    thread would. An idle session costs nothing but its selector entry.
+
+    *threads* is the number of threads; each session is served by the one
+    with the fewest sessions, from connecting until it is closed. Threads
+    are started when they get their first session.
+
+    Sessions are given a reactor before they connect, see
+    :attr:`SSHSession.reactor <ncclient.transport.SSHSession.reactor>`, or
+    through `manager_params`::
+
+        reactor = Reactor(threads=4)
+        managers = [manager.connect(host=host, manager_params={'reactor': reactor})
+                    for host in hosts]
+
+    .. note::
+        Replies are parsed and listeners called by these threads as well, so
+        a slow listener holds up all sessions of its thread. The SSH
+        transport of each session still has the thread of its own that
+        :mod:`paramiko` starts.
+    """
+
+    def __init__(self, threads=1):
+        self._lock = Lock()
+        self._threads = [ReactorThread(i) for i in range(threads)]
+        self._closed = False
+
+    def register(self, session):
+        """Have the I/O of the connected *session* done by one of the threads,
+        which is returned. Raises :exc:`~ncclient.transport.TransportError`
+        once the reactor is closed."""
+        with self._lock:
+            if self._closed:
+                raise TransportError("reactor is closed")
+            thread = min(self._threads, key=lambda t: len(t.sessions))
+            thread.add(session)
+        return thread
+
+    @property
+    def sessions(self):
+        "Number of sessions served."
+        return sum(len(t.sessions) for t in self._threads)
+
+    def close(self):
+        "Stop the threads. Sessions still open are left without I/O."
+        with self._lock:
+            self._closed = True
+        for thread in self._threads:
+            thread.stop()
+
+
+class ReactorThread(Thread):
+
+    "One of the threads of a :class:`Reactor`."
+
+    def __init__(self, index):
+        Thread.__init__(self, name='ncclient-reactor-%d' % index)
+        self.daemon = True
+        #: The sessions served.
+        self.sessions = set()
+        self._lock = Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        # calls from other threads, run by this one, see _call()
+        self._calls = deque()
+        # session -> channel, for as long as the session is served
+        self._channels = {}
+        # sessions with something left to write
+        self._writers = set()
+        self._stopped = False
+
+    def add(self, session):
+        with self._lock:
+            self.sessions.add(session)
+            if not self.is_alive():
+                self.start()
+        self._call(self._add, session, session._channel)
+
+    def remove(self, session):
+        "Stop serving *session*, which is being closed."
+        with self._lock:
+            self.sessions.discard(session)
+        self._call(self._remove, session)
+
+    def want_write(self, session):
+        "Have what has been sent on *session* written out."
+        self._call(self._writers.add, session)
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup()
+
+    def _call(self, fn, session, *args):
+        # selectors are not thread safe, so only this thread touches it
+        self._calls.append((fn, session, args))
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            self._wakeup_w.send(b'\0')
+        except socket.error:
+            # buffer full means a wakeup is already pending
+            pass
+
+    def run(self):
+        selector = self._selector
+        wakeup = self._wakeup_r
+        while not self._stopped:
+            # only polls while a channel cannot take all there is to write
+            timeout = TICK if self._writers else None
+            for key, _ in selector.select(timeout=timeout):
+                if key.fileobj is wakeup:
+                    try:
+                        while wakeup.recv(BUF_SIZE):
+                            pass
+                    except socket.error:
+                        pass
+                else:
+                    self._read(key.data)
+            while self._calls:
+                fn, session, args = self._calls.popleft()
+                try:
+                    fn(session, *args)
+                except Exception as e:
+                    # only the session it was for is affected
+                    self._fail(session, e)
+            for session in list(self._writers):
+                self._write(session)
+        selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    def _add(self, session, chan):
+        if session._closing.is_set():
+            return
+        self._channels[session] = chan
+        self._selector.register(chan, selectors.EVENT_READ, session)
+        # the hello, queued before the session was added
+        self._writers.add(session)
+
+    def _remove(self, session):
+        self._writers.discard(session)
+        chan = self._channels.pop(session, None)
+        if chan is not None:
+            try:
+                self._selector.unregister(chan)
+            except (KeyError, ValueError):
+                pass
+
+    def _read(self, session):
+        chan = self._channels.get(session)
+        if chan is None:
+            return
+        try:
+            if not session._read_batch(chan):
+                if session._closing.is_set():
+                    # End of session, expected
+                    self._remove(session)
+                    return
+                # End of session, unexpected
+                raise SessionCloseError(session._buffer.getvalue())
+        except Exception as e:
+            self._fail(session, e)
+
+    def _write(self, session):
+        chan = self._channels.get(session)
+        if chan is None:
+            self._writers.discard(session)
+            return
+        try:
+            if session._write_ready(chan):
+                self._writers.discard(session)
+        except Exception as e:
+            self._fail(session, e)
+
+    def _fail(self, session, e):
+        session.logger.debug("Broke out of main loop, error=%r", e)
+        try:
+            self._remove(session)
+            session._dispatch_error(e)
+            session.close()
+        except Exception:
+            # the other sessions of the thread carry on regardless
+            logger.exception("Failed to close session %r", session)
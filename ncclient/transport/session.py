@@ -14,14 +14,15 @@
 # limitations under the License.
 
 
+import itertools
 import re
 import sys
 import logging
-from threading import Thread, Lock, Event
+from threading import Thread, Lock, Event, current_thread
 try:
-    from Queue import Queue, Empty
+    from Queue import Queue, Empty, Full
 except ImportError:
-    from queue import Queue, Empty
+    from queue import Queue, Empty, Full
 from ncclient.xml_ import *
 from ncclient.capabilities import Capabilities
 from ncclient.logging_ import SessionLoggerAdapter
@@ -30,6 +31,13 @@ from ncclient.transport.notify import Notification
 
 logger = logging.getLogger('ncclient.transport.session')
 
+# default bound for the queue between session and dispatcher thread
+DISPATCH_QUEUE_SIZE = 64
+# seconds between checks for the session closing while the queue is full
+DISPATCH_PUT_INTERVAL = 0.1
+# seconds to wait for the server's hello
+HELLO_TIMEOUT = 60
+
 
 class NetconfBase(object):
     '''Netconf Base protocol version'''
@@ -54,31 +62,75 @@ class Session(Thread):
         self._base = NetconfBase.BASE_10
         self._id = None # session-id
         self._connected = False # to be set/cleared by subclass implementation
+        self._closing = Event() # likewise, set once the session is being closed
         self.logger = SessionLoggerAdapter(logger, {'session': self})
         self.logger.debug('%r created: client_capabilities=%r',
                           self, self._client_capabilities)
         self._device_handler = None # Should be set by child class
+        # optional dispatcher thread, see start_dispatcher()
+        self._dispatcher = None
+        self._dispatch_q = None
+        # message-id -> builder, see redirect_message()
+        self._routes = {}
+        # see next_message_id()
+        self._message_ids = itertools.count(1)
+        # class -> listener, see get_listener_instance()
+        self._listener_instances = {}
+
+    def _dispatch_message(self, raw, ele=None):
+        q = self._dispatch_q
+        if q is not None:
+            self._enqueue(q, (self._deliver_message, (raw, ele)))
+        else:
+            self._deliver_message(raw, ele)
 
-    def _dispatch_message(self, raw):
+    def _deliver_message(self, raw, ele=None):
         try:
-            root = parse_root(raw)
+            if ele is not None:
+                # already parsed while it was being received
+                root = ParsedRoot(ele)
+            else:
+                root = parse_root(raw)
         except Exception as e:
-            device_handled_raw=self._device_handler.handle_raw_dispatch(raw)
+            device_handled_raw=self._device_handler.handle_raw_dispatch(to_text(raw))
             if isinstance(device_handled_raw, str):
                 root = parse_root(device_handled_raw)
             elif isinstance(device_handled_raw, Exception):
-                self._dispatch_error(device_handled_raw)
+                self._deliver_error(device_handled_raw)
                 return
             else:
                 self.logger.error('error parsing dispatch message: %s', e)
                 return
         with self._lock:
             listeners = list(self._listeners)
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         for l in listeners:
-            self.logger.debug('dispatching message to %r: %s', l, raw)
+            if debug:
+                self.logger.debug('dispatching message to %r: %s', l, to_text(raw))
             l.callback(root, raw) # no try-except; fail loudly if you must!
 
     def _dispatch_error(self, err):
+        q = self._dispatch_q
+        if q is not None:
+            self._enqueue(q, (self._deliver_error, (err,)))
+        else:
+            self._deliver_error(err)
+
+    def _enqueue(self, q, item):
+        # waits for room in the dispatcher's queue, unless the session is
+        # being closed: a listener closing it from the dispatcher thread
+        # would not take anything off the queue until the close is done
+        while True:
+            try:
+                q.put(item, timeout=DISPATCH_PUT_INTERVAL)
+                return
+            except Full:
+                if self._closing.is_set():
+                    self.logger.debug('session closing, not dispatching %r',
+                                      item[1][0])
+                    return
+
+    def _deliver_error(self, err):
         with self._lock:
             listeners = list(self._listeners)
         for l in listeners:
@@ -88,6 +140,76 @@ class Session(Thread):
             except Exception as e:
                 self.logger.warning('error dispatching to %r: %r', l, e)
 
+    def start_dispatcher(self, queue_size=DISPATCH_QUEUE_SIZE):
+        """Have received messages and errors delivered to listeners by a
+        separate dispatcher thread, so that the session thread only does I/O
+        and framing while replies are parsed and callbacks run.
+
+        *queue_size* bounds the number of messages waiting for the dispatcher;
+        when it is reached the session thread stops reading until there is
+        room again. See :attr:`dispatch_queue_depth`.
+
+        .. note::
+            An exception raised by a listener is logged and does not end the
+            session, unlike when listeners are called from the session thread.
+        """
+        if self._dispatcher is not None:
+            return
+        self._dispatch_q = Queue(queue_size)
+        self._dispatcher = Thread(target=self._dispatcher_loop,
+                                  args=(self._dispatch_q,),
+                                  name='session-dispatcher')
+        self._dispatcher.daemon = True
+        self._dispatcher.start()
+
+    def _stop_dispatcher(self):
+        dispatcher, q = self._dispatcher, self._dispatch_q
+        if dispatcher is None:
+            return
+        self._dispatcher = self._dispatch_q = None
+        if dispatcher is current_thread():
+            # we cannot wait for room in the queue; the loop checks for this
+            return
+        # anything queued before this is still delivered; if the queue is
+        # full, the loop stops once it has taken all of it off
+        try:
+            q.put_nowait(None)
+        except Full:
+            pass
+
+    def _dispatcher_loop(self, q):
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            deliver, args = item
+            try:
+                deliver(*args)
+            except Exception as e:
+                self.logger.error('error dispatching %r: %r', args[0], e)
+            if self._dispatch_q is not q and q.empty():
+                break
+
+    def _on_dispatcher(self):
+        # whether called by a listener run by the dispatcher thread
+        dispatcher = self._dispatcher
+        return dispatcher is not None and dispatcher is current_thread()
+
+    def redirect_message(self, message_id, builder):
+        """Have the message whose root element carries the *message_id*
+        attribute handed to *builder*, a
+        :class:`~ncclient.transport.framing.MessageBuilder`, while it is being
+        received, instead of collecting it in memory. Listeners get whatever
+        the builder's :meth:`finish` returns. With *builder* `None`, a pending
+        redirection is cancelled.
+
+        Transports that do not support this deliver the message as usual.
+        """
+        if builder is None:
+            self._routes.pop(message_id, None)
+        else:
+            self._routes[message_id] = builder
+
     def _post_connect(self):
         "Greeting stuff"
         init_event = Event()
@@ -100,20 +222,33 @@ class Session(Thread):
         def err_cb(err):
             error[0] = err
             init_event.set()
-        self.add_listener(NotificationHandler(self._notification_q))
-        listener = HelloHandler(ok_cb, err_cb)
-        self.add_listener(listener)
-        self.send(HelloHandler.build(self._client_capabilities, self._device_handler))
+        listener = self._send_hello(ok_cb, err_cb)
         self.logger.debug('starting main loop')
-        self.start()
+        self._start_io()
         # we expect server's hello message, if server doesn't responds in 60 seconds raise exception
-        init_event.wait(60)
+        init_event.wait(HELLO_TIMEOUT)
         if not init_event.is_set():
             raise SessionError("Capability exchange timed out")
-        # received hello message or an error happened
+        self._hello_done(listener, error[0])
+
+    def _start_io(self):
+        # have what is sent and received handled from now on
+        self.start()
+
+    def _send_hello(self, ok_cb, err_cb):
+        # first half of the greeting: returns the listener waiting for the
+        # server's hello, which calls ok_cb or err_cb
+        self.add_listener(NotificationHandler(self._notification_q))
+        listener = HelloHandler(ok_cb, err_cb)
+        self.add_listener(listener)
+        self.send(HelloHandler.build(self._client_capabilities, self._device_handler))
+        return listener
+
+    def _hello_done(self, listener, error):
+        # second half: the server's hello has been received or error happened
         self.remove_listener(listener)
-        if error[0]:
-            raise error[0]
+        if error:
+            raise error
         #if ':base:1.0' not in self.server_capabilities:
         #    raise MissingCapabilityError(':base:1.0')
         if 'urn:ietf:params:netconf:base:1.1' in self._server_capabilities and 'urn:ietf:params:netconf:base:1.1' in self._client_capabilities:
@@ -143,6 +278,7 @@ class Session(Thread):
         self.logger.debug('discarding listener %r', listener)
         with self._lock:
             self._listeners.discard(listener)
+            self._listener_instances.clear()
 
     def get_listener_instance(self, cls):
         """If a listener of the specified type is registered, returns the
@@ -150,11 +286,23 @@ class Session(Thread):
 
         :type cls: :class:`SessionListener`
         """
+        # looked up once, then served from _listener_instances without
+        # taking the lock until a listener is removed
+        instance = self._listener_instances.get(cls)
+        if instance is not None:
+            return instance
         with self._lock:
             for listener in self._listeners:
                 if isinstance(listener, cls):
+                    self._listener_instances[cls] = listener
                     return listener
 
+    def next_message_id(self):
+        """Return a *message-id* for an RPC on this session. These count up
+        from `"1"` and are unique within the session."""
+        # next() on a count is atomic, so no lock is needed
+        return str(next(self._message_ids))
+
     def connect(self, *args, **kwds): # subclass implements
         raise NotImplementedError
 
@@ -162,10 +310,11 @@ class Session(Thread):
         raise NotImplementedError
 
     def send(self, message):
-        """Send the supplied *message* (xml string) to NETCONF server."""
+        """Send the supplied *message* (xml string or UTF-8 encoded :class:`bytes`) to NETCONF server."""
         if not self.connected:
             raise TransportError('Not connected to NETCONF server')
-        self.logger.debug('queueing %s', message)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('queueing %s', to_text(message))
         self._q.put(message)
 
     def scp(self):
@@ -178,6 +327,19 @@ class Session(Thread):
         except Empty:
             return None
 
+    @property
+    def dispatch_queue_depth(self):
+        """Number of received messages waiting for the dispatcher thread, or
+        `None` if messages are dispatched from the session thread."""
+        q = self._dispatch_q
+        return None if q is None else q.qsize()
+
+    @property
+    def can_pipeline(self):
+        """Whether requests can be sent before the replies to earlier ones
+        are received, as NETCONF allows. The RPCs sent are answered in order."""
+        return True
+
     @property
     def connected(self):
         "Connection status of the session."
@@ -199,6 +361,18 @@ class Session(Thread):
         return self._id
 
 
+class ParsedRoot(tuple):
+
+    """The *(tag, attributes)* tuple passed to :meth:`SessionListener.callback`
+    for a message that has already been parsed in full. The root element is
+    available as :attr:`element`, so listeners need not parse *raw* again."""
+
+    def __new__(cls, element):
+        root = tuple.__new__(cls, (element.tag, element.attrib))
+        root.element = element
+        return root
+
+
 class SessionListener(object):
 
     """Base class for :class:`Session` listeners, which are notified when a new
@@ -213,7 +387,12 @@ class SessionListener(object):
 
         Here, *root* is a tuple of *(tag, attributes)* where *tag* is the qualified name of the root element and *attributes* is a dictionary of its attributes (also qualified names).
 
-        *raw* will contain the XML document as a string.
+        *raw* will contain the XML document as received, in :class:`bytes` or
+        a :class:`bytearray`; :func:`~ncclient.xml_.to_ele` parses it and
+        :func:`~ncclient.xml_.to_text` turns it into a string.
+
+        If the document has already been parsed, *root* is a :class:`ParsedRoot`
+        whose :attr:`~ParsedRoot.element` is the parsed root element.
         """
         raise NotImplementedError
 
@@ -15,8 +15,8 @@
 
 import base64
 import getpass
+import hashlib
 import os
-import re
 import six
 import sys
 import socket
@@ -33,9 +33,19 @@ from ncclient.logging_ import SessionLoggerAdapter
 
 import paramiko
 
-from ncclient.transport.errors import AuthenticationError, SessionCloseError, SSHError, SSHUnknownHostError, NetconfFramingError
+from ncclient.transport.errors import AuthenticationError, SessionCloseError, SSHError, SSHUnknownHostError
+from ncclient.transport.framing import ChunkedDecoder, EOMDecoder
+from ncclient.transport.framing import frame10, frame11
+from ncclient.transport.framing import MessageBuilder, ParsingMessageBuilder
+from ncclient.transport.framing import RoutingMessageBuilder
 from ncclient.transport.session import Session
 from ncclient.transport.session import NetconfBase
+from ncclient.xml_ import to_text
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
 
 import logging
 logger = logging.getLogger("ncclient.transport.ssh")
@@ -44,24 +54,22 @@ PORT_NETCONF_DEFAULT = 830
 PORT_SSH_DEFAULT = 22
 
 BUF_SIZE = 4096
+# upper bound for the read size when it is adapted to large replies
+MAX_BUF_SIZE = 256 * 1024
+# how much to read from the channel before parsing what has been received
+READ_BUDGET = 1024 * 1024
+# how much of the outbound queue to coalesce into one write
+WRITE_BUDGET = 1024 * 1024
 # v1.0: RFC 4742
 MSG_DELIM = "]]>]]>"
 MSG_DELIM_LEN = len(MSG_DELIM)
 # v1.1: RFC 6242
 END_DELIM = '\n##\n'
 
+# Only used to poll while the channel cannot take more data, or when there
+# is no wakeup socket pair to wait on
 TICK = 0.1
 
-#
-# Define delimiters for chunks and messages for netconf 1.1 chunk enoding.
-# When matched:
-#
-# * result.group(0) will contain whole matched string
-# * result.group(1) will contain the digit string for a chunk
-# * result.group(2) will be defined if '##' found
-#
-RE_NC11_DELIM = re.compile(br'\n(?:#([0-9]+)|(##))\n')
-
 
 def default_unknown_host_cb(host, fingerprint):
     """An unknown host callback returns `True` if it finds the key acceptable, and `False` if not.
@@ -85,12 +93,67 @@ def _colonify(fp):
     return finga
 
 
-if sys.version < '3':
-    def textify(buf):
-        return buf
-else:
-    def textify(buf):
-        return buf.decode('UTF-8')
+class _NotCached(Exception):
+    pass
+
+
+# known_hosts and private key files as loaded, shared by all sessions
+_file_cache = {}
+_file_cache_lock = threading.Lock()
+
+
+def _cached_file(path, kind, load):
+    """Return what *load* returns for the file *path*, or raises, loading it
+    again only once the file has changed. Raises :exc:`_NotCached` if *path*
+    cannot be looked at."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        raise _NotCached()
+    stamp = (st.st_mtime, st.st_size)
+    key = (kind, path)
+    with _file_cache_lock:
+        cached = _file_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        try:
+            cached = (stamp, load(path), None)
+        except Exception as e:
+            cached = (stamp, None, e)
+        with _file_cache_lock:
+            _file_cache[key] = cached
+    if cached[2] is not None:
+        raise cached[2]
+    return cached[1]
+
+
+def _known_hosts_entries(path):
+    "The entries of the known_hosts file *path*, read as HostKeys.load() does."
+    entries = []
+    with open(path, 'r') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+            try:
+                entry = paramiko.hostkeys.HostKeyEntry.from_line(line, lineno)
+            except paramiko.SSHException:
+                continue
+            if entry is not None:
+                entries.append(entry)
+    return entries
+
+
+def _private_key(cls, path, password):
+    "A private key of type *cls* from the file *path*, loaded once."
+    # keyed on a digest, so that passphrases are not kept around
+    secret = hashlib.sha256(password.encode('UTF-8') if isinstance(password, six.text_type)
+                            else password or b'').hexdigest()
+    load = lambda path: cls.from_private_key_file(path, password)
+    try:
+        return _cached_file(path, (cls, secret), load)
+    except _NotCached:
+        return load(path)
+
 
 if sys.version < '3':
     from six import StringIO
@@ -115,145 +178,210 @@ class SSHSession(Session):
         self._buffer = StringIO()
         # parsing-related, see _parse()
         self._device_handler = device_handler
-        self._parsing_state10 = 0
-        self._parsing_pos10 = 0
-        self._parsing_pos11 = 0
-        self._parsing_state11 = 0
-        self._expchunksize = 0
-        self._curchunksize = 0
-        self._inendpos = 0
-        self._size_num_list = []
-        self._message_list = []
-        self._closing = threading.Event()
+        self._decoder10 = EOMDecoder(
+            RoutingMessageBuilder(MessageBuilder(), self._routes))
+        self._decoder11 = ChunkedDecoder(
+            RoutingMessageBuilder(MessageBuilder(), self._routes))
+        # socket pair used to wake up the main loop when something is queued
+        self._wakeup_r = None
+        self._wakeup_w = None
+        # see reactor; what the reactor thread doing the I/O is, and what
+        # remains to be written of the messages taken off the queue
+        self._reactor = None
+        self._io = None
+        self._out = None
+        # receive tuning, see read_size, adaptive_read and read_budget
+        self._read_size = BUF_SIZE
+        self._cur_read_size = BUF_SIZE
+        self._adaptive_read = False
+        self._read_budget = READ_BUDGET
+        # receive counters, see receive_stats
+        self._msg_reads = 0
+        self._msg_parses = 0
+        # sizes of the reads of the last batch, see _count_reads()
+        self._batch_reads = []
+        self._receive_stats = {
+            'messages': 0,
+            'reads': 0,
+            'parse_passes': 0,
+            'bytes': 0,
+            'last_message': {'reads': 0, 'parse_passes': 0},
+        }
 
         self.logger = SessionLoggerAdapter(logger, {'session': self})
 
-    def _dispatch_message(self, raw):
-        self.logger.info("Received:\n%s", raw)
-        return super(SSHSession, self)._dispatch_message(raw)
+    def _dispatch_message(self, raw, ele=None):
+        # messages are passed on as received, in bytes; only decode them
+        # here if they are going to be logged
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Received:\n%s", to_text(raw))
+        stats = self._receive_stats
+        stats['messages'] += 1
+        stats['last_message'] = {'reads': self._msg_reads,
+                                 'parse_passes': self._msg_parses}
+        self.logger.debug('message took %d reads and %d parse passes',
+                          self._msg_reads, self._msg_parses)
+        self._msg_reads = self._msg_parses = 0
+        return super(SSHSession, self)._dispatch_message(raw, ele)
 
     def _parse(self):
-        "Messages ae delimited by MSG_DELIM. The buffer could have grown by a maximum of BUF_SIZE bytes everytime this method is called. Retains state across method calls and if a byte has been read it will not be considered again."
+        "Messages ae delimited by MSG_DELIM. Retains state across method calls and if a byte has been read it will not be considered again."
         return self._parse10()
 
     def _parse10(self):
 
-        """Messages are delimited by MSG_DELIM. The buffer could have grown by
-        a maximum of BUF_SIZE bytes everytime this method is called. Retains
-        state across method calls and if a chunk has been read it will not be
-        considered again."""
+        """Messages are delimited by MSG_DELIM. Whatever has been received
+        since the last call is handed to the session's #EOMDecoder, which
+        retains its search position across calls so that a byte is only
+        looked at once, and every message it completes is dispatched."""
 
         self.logger.debug("parsing netconf v1.0")
-        buf = self._buffer
-        buf.seek(self._parsing_pos10)
-        if MSG_DELIM in buf.read().decode('UTF-8'):
-            buf.seek(0)
-            msg, _, remaining = buf.read().decode('UTF-8').partition(MSG_DELIM)
-            msg = msg.strip()
-            if sys.version < '3':
-                self._dispatch_message(msg.encode())
-            else:
-                self._dispatch_message(msg)
-            # create new buffer which contains remaining of old buffer
-            self._buffer = StringIO()
-            self._buffer.write(remaining.encode())
-            self._parsing_pos10 = 0
-            if len(remaining) > 0:
-                # There could be another entire message in the
-                # buffer, so we should try to parse again.
-                self.logger.debug('Trying another round of parsing since there is still data')
-                self._parse10()
-        else:
-            # handle case that MSG_DELIM is split over two chunks
-            self._parsing_pos10 = buf.tell() - MSG_DELIM_LEN
-            if self._parsing_pos10 < 0:
-                self._parsing_pos10 = 0
+        self._count_parse()
+        data = self._buffer.getvalue()
+        self._buffer = StringIO()
+        self._decoder10.feed(data)
+        self._count_reads(data, self._decoder10)
 
     def _parse11(self):
 
         """Messages are split into chunks. Chunks and messages are delimited
-        by the regex #RE_NC11_DELIM defined earlier in this file. Each
-        time we get called here either a chunk delimiter or an
-        end-of-message delimiter should be found iff there is enough
-        data. If there is not enough data, we will wait for more. If a
-        delimiter is found in the wrong place, a #NetconfFramingError
-        will be raised."""
+        by the regex #RE_NC11_DELIM defined in #ncclient.transport.framing.
+        Whatever has been received since the last call is handed to the
+        session's #ChunkedDecoder, which retains its state across calls, and
+        every message it completes is dispatched. If there is not enough data
+        for a whole message, we will wait for more. If a delimiter is found in
+        the wrong place, a #NetconfFramingError will be raised."""
 
         self.logger.debug("_parse11: starting")
-
-        # suck in whole string that we have (this is what we will work on in
-        # this function) and initialize a couple of useful values
-        self._buffer.seek(0, os.SEEK_SET)
+        self._count_parse()
         data = self._buffer.getvalue()
-        data_len = len(data)
-        start = 0
-        self.logger.debug('_parse11: working with buffer of %d bytes', data_len)
-        while True and start < data_len:
-            # match to see if we found at least some kind of delimiter
-            self.logger.debug('_parse11: matching from %d bytes from start of buffer', start)
-            re_result = RE_NC11_DELIM.match(data[start:])
-            if not re_result:
-
-                # not found any kind of delimiter just break; this should only
-                # ever happen if we just have the first few characters of a
-                # message such that we don't yet have a full delimiter
-                self.logger.debug('_parse11: no delimiter found, buffer="%s"', data[start:].decode())
-                break
-
-            # save useful variables for reuse
-            re_start = re_result.start()
-            re_end = re_result.end()
-            self.logger.debug('_parse11: regular expression start=%d, end=%d', re_start, re_end)
-
-            # If the regex doesn't start at the beginning of the buffer,
-            # we're in trouble, so throw an error
-            if re_start != 0:
-                raise NetconfFramingError('_parse11: delimiter not at start of match buffer', data[start:])
-
-            if re_result.group(2):
-                # we've found the end of the message, need to form up
-                # whole message, save back remainder (if any) to buffer
-                # and dispatch the message
-                start += re_end
-                message = ''.join(self._message_list)
-                self._message_list = []
-                self.logger.debug('_parse11: found end of message delimiter')
-                self._dispatch_message(message)
-                break
+        self._buffer = StringIO()
+        self.logger.debug('_parse11: feeding %d bytes', len(data))
+        self._decoder11.feed(data)
+        self._count_reads(data, self._decoder11)
+        self.logger.debug('_parse11: ending')
 
-            elif re_result.group(1):
-                # we've found a chunk delimiter, and group(2) is the digit
-                # string that will tell us how many bytes past the end of
-                # where it was found that we need to have available to
-                # save the next chunk off
-                self.logger.debug('_parse11: found chunk delimiter')
-                digits = int(re_result.group(1))
-                self.logger.debug('_parse11: chunk size %d bytes', digits)
-                if (data_len-start) >= (re_end + digits):
-                    # we have enough data for the chunk
-                    fragment = textify(data[start+re_end:start+re_end+digits])
-                    self._message_list.append(fragment)
-                    start += re_end + digits
-                    self.logger.debug('_parse11: appending %d bytes', digits)
-                    self.logger.debug('_parse11: fragment = "%s"', fragment)
-                else:
-                    # we don't have enough bytes, just break out for now
-                    # after updating start pointer to start of new chunk
-                    start += re_start
-                    self.logger.debug('_parse11: not enough data for chunk yet')
-                    self.logger.debug('_parse11: setting start to %d', start)
+    def _count_parse(self):
+        self._msg_parses += 1
+        self._receive_stats['parse_passes'] += 1
+
+    def _count_reads(self, data, decoder):
+        """Dispatch the messages *decoder* completes from *data*, as received
+        by the last batch of reads, counting for each the reads that brought
+        any of it."""
+        lo = 0
+        for message in decoder.messages():
+            # where the data after this message starts
+            hi = max(lo, len(data) - decoder.unread)
+            self._msg_reads += self._reads_between(lo, hi)
+            self._dispatch_message(message, decoder.builder.element)
+            lo = hi
+            if lo < len(data):
+                # the next message has started, in this very parse pass
+                self._msg_parses = 1
+        self._msg_reads += self._reads_between(lo, len(data))
+
+    def _reads_between(self, lo, hi):
+        # the number of reads of the last batch that brought any of the
+        # bytes data[lo:hi]
+        count = offset = 0
+        if hi > lo:
+            for size in self._batch_reads:
+                if offset >= hi:
                     break
-
-        # Now out of the loop, need to see if we need to save back any content
-        if start > 0:
-            self.logger.debug(
-                '_parse11: saving back rest of message after %d bytes, original size %d',
-                start, data_len)
-            self._buffer = StringIO(data[start:])
-            if start < data_len:
-                self.logger.debug('_parse11: still have data, may have another full message!')
-                self._parse11()
-        self.logger.debug('_parse11: ending')
+                if offset + size > lo:
+                    count += 1
+                offset += size
+        return count
+
+    def _read_batch(self, chan):
+        """Read from *chan* for as long as it has data ready, up to the read
+        budget, then parse everything received in one pass.
+
+        Returns `False` if the channel has been closed by the other side."""
+        stats = self._receive_stats
+        self._buffer.seek(0, os.SEEK_END)
+        received = 0
+        sizes = self._batch_reads = []
+        while True:
+            data = chan.recv(self._cur_read_size)
+            if not data:
+                if not received:
+                    return False
+                break
+            self._buffer.write(data)
+            received += len(data)
+            sizes.append(len(data))
+            stats['reads'] += 1
+            if self._adaptive_read and len(data) == self._cur_read_size:
+                # the channel had at least as much as we asked for, so this
+                # is probably a large reply: read more at a time
+                self._cur_read_size = min(self._cur_read_size * 2,
+                                          max(MAX_BUF_SIZE, self._read_size))
+            if received >= self._read_budget or not chan.recv_ready():
+                break
+        stats['bytes'] += received
+        if self._base == NetconfBase.BASE_11:
+            self._parse11()
+        else:
+            self._parse10()
+        if self._cur_read_size != self._read_size and not self._msg_reads:
+            # back to the configured size once a message has completed and
+            # nothing of the next one has arrived yet
+            self._cur_read_size = self._read_size
+        return True
+
+    def _take_outbound(self):
+        """Take all queued messages, up to :data:`WRITE_BUDGET` bytes, off the
+        queue and return them framed, as one :class:`bytes` object."""
+        frame = frame11 if self._base == NetconfBase.BASE_11 else frame10
+        q = self._q
+        out = []
+        size = 0
+        while size < WRITE_BUDGET:
+            try:
+                data = q.get_nowait()
+            except Empty:
+                break
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Sending:\n%s", to_text(data))
+            if not isinstance(data, bytes):
+                data = data.encode('UTF-8')
+            data = frame(data)
+            out.append(data)
+            size += len(data)
+        return b''.join(out)
+
+    def _write_ready(self, chan):
+        """Write queued messages to *chan* as far as it takes them without
+        blocking, keeping what it does not take for the next call.
+
+        Returns whether everything has been written."""
+        while True:
+            if self._out is None:
+                if self._q.empty():
+                    return True
+                data = self._take_outbound()
+                self.logger.debug("Sending %d bytes", len(data))
+                self._out = memoryview(data)
+            while self._out and chan.send_ready():
+                n = chan.send(self._out)
+                if n <= 0:
+                    raise SessionCloseError(self._buffer.getvalue(), self._out.tobytes())
+                self._out = self._out[n:]
+            if self._out:
+                return False
+            self._out = None
+
+    def _write(self, chan, data):
+        "Write all of *data* to *chan*, however many sends that takes."
+        self.logger.debug("Sending %d bytes", len(data))
+        view = memoryview(data)
+        while view:
+            n = chan.send(view)
+            if n <= 0:
+                raise SessionCloseError(self._buffer.getvalue(), view.tobytes())
+            view = view[n:]
 
     def load_known_hosts(self, filename=None):
 
@@ -261,35 +389,104 @@ class SSHSession(Session):
         be called multiple times.
 
         If *filename* is not specified, looks in the default locations i.e. :file:`~/.ssh/known_hosts` and :file:`~/ssh/known_hosts` for Windows.
+
+        A file is only read once for all sessions, and again once it changes.
         """
 
         if filename is None:
             filename = os.path.expanduser('~/.ssh/known_hosts')
             try:
-                self._host_keys.load(filename)
+                self._load_host_keys(filename)
             except IOError:
                 # for windows
                 filename = os.path.expanduser('~/ssh/known_hosts')
                 try:
-                    self._host_keys.load(filename)
+                    self._load_host_keys(filename)
                 except IOError:
                     pass
         else:
+            self._load_host_keys(filename)
+
+    def _load_host_keys(self, filename):
+        # a file is parsed once for all sessions, each of which adds the
+        # keys to host keys of its own
+        try:
+            entries = _cached_file(filename, 'known_hosts', _known_hosts_entries)
+        except _NotCached:
             self._host_keys.load(filename)
+            return
+        for entry in entries:
+            for hostname in entry.hostnames:
+                self._host_keys.add(hostname, entry.key.get_name(), entry.key)
+
+    def _open_wakeup(self):
+        if self._reactor is not None:
+            # the reactor thread has one for all its sessions
+            return
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+
+    def _close_wakeup(self):
+        for sock in (self._wakeup_r, self._wakeup_w):
+            if sock is not None:
+                sock.close()
+        self._wakeup_r = self._wakeup_w = None
+
+    def _wakeup(self):
+        "Interrupt the main loop's select() so queued messages get sent right away."
+        sock = self._wakeup_w
+        if sock is not None:
+            try:
+                sock.send(b'\0')
+            except socket.error:
+                # buffer full means a wakeup is already pending; closed
+                # means the main loop is gone
+                pass
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(BUF_SIZE):
+                pass
+        except socket.error:
+            pass
+
+    def send(self, message):
+        Session.send(self, message)
+        io = self._io
+        if io is not None:
+            io.want_write(self)
+        else:
+            self._wakeup()
+
+    def _start_io(self):
+        if self._reactor is None:
+            Session._start_io(self)
+        else:
+            self._io = self._reactor.register(self)
 
     def close(self):
         self._closing.set()
+        io = self._io
+        if io is not None:
+            self._io = None
+            io.remove(self)
         if self._transport.is_active():
             self._transport.close()
+        self._wakeup()
 
-        # Wait for the transport thread to close.
-        while self.is_alive() and (self is not threading.current_thread()):
+        # Wait for the transport thread to close, unless called from it or
+        # from the dispatcher thread, which it may be waiting on.
+        while (self.is_alive() and self is not threading.current_thread()
+               and not self._on_dispatcher()):
             self.join(10)
 
         if self._channel:
             self._channel.close()
         self._channel = None
         self._connected = False
+        self._close_wakeup()
+        self._stop_dispatcher()
 
     # REMEMBER to update transport.rst if sig. changes, since it is hardcoded there
     def connect(
@@ -511,6 +708,7 @@ class SSHSession(Session):
                 if not handle_exception:
                     continue
             self._channel_name = self._channel.get_name()
+            self._open_wakeup()
             self._post_connect()
             return
         raise SSHError("Could not open connection, possibly due to unacceptable"
@@ -523,7 +721,7 @@ class SSHSession(Session):
         for key_filename in key_filenames:
             for cls in (paramiko.RSAKey, paramiko.DSSKey, paramiko.ECDSAKey):
                 try:
-                    key = cls.from_private_key_file(key_filename, password)
+                    key = _private_key(cls, key_filename, password)
                     self.logger.debug("Trying key %s from %s",
                                       hexlify(key.get_fingerprint()),
                                       key_filename)
@@ -568,7 +766,7 @@ class SSHSession(Session):
 
         for cls, filename in keyfiles:
             try:
-                key = cls.from_private_key_file(filename, password)
+                key = _private_key(cls, filename, password)
                 self.logger.debug("Trying discovered key %s in %s",
                                   hexlify(key.get_fingerprint()), filename)
                 self._transport.auth_publickey(username, key)
@@ -594,52 +792,146 @@ class SSHSession(Session):
     def run(self):
         chan = self._channel
         q = self._q
-
-        def start_delim(data_len): return '\n#%s\n' % (data_len)
+        wakeup = self._wakeup_r
 
         try:
             s = selectors.DefaultSelector()
             s.register(chan, selectors.EVENT_READ)
+            if wakeup is not None:
+                s.register(wakeup, selectors.EVENT_READ)
             self.logger.debug('selector type = %s', s.__class__.__name__)
             while True:
 
-                # Will wakeup evey TICK seconds to check if something
-                # to send, more quickly if something to read (due to
-                # select returning chan in readable list).
-                events = s.select(timeout=TICK)
-                if events:
-                    data = chan.recv(BUF_SIZE)
-                    if data:
-                        self._buffer.seek(0, os.SEEK_END)
-                        self._buffer.write(data)
-                        if self._base == NetconfBase.BASE_11:
-                            self._parse11()
-                        else:
-                            self._parse10()
-                    elif self._closing.is_set():
+                # Sleeps until there is something to read or a message has
+                # been queued (see send()). Without a wakeup socket, or
+                # while the channel is not ready to take more data, wakes
+                # up every TICK seconds to check again.
+                if not q.empty():
+                    timeout = 0 if chan.send_ready() else TICK
+                elif wakeup is None:
+                    timeout = TICK
+                else:
+                    timeout = None
+                readable = False
+                for key, _ in s.select(timeout=timeout) or ():
+                    if key.fileobj is wakeup:
+                        self._drain_wakeup()
+                    else:
+                        readable = True
+                if readable and not self._read_batch(chan):
+                    if self._closing.is_set():
                         # End of session, expected
                         break
                     else:
                         # End of session, unexpected
                         raise SessionCloseError(self._buffer.getvalue())
+                elif self._closing.is_set():
+                    break
                 if not q.empty() and chan.send_ready():
-                    self.logger.debug("Sending message")
-                    data = q.get()
-                    if self._base == NetconfBase.BASE_11:
-                        data = "%s%s%s" % (start_delim(len(data)), data, END_DELIM)
-                    else:
-                        data = "%s%s" % (data, MSG_DELIM)
-                    self.logger.info("Sending:\n%s", data)
-                    while data:
-                        n = chan.send(data)
-                        if n <= 0:
-                            raise SessionCloseError(self._buffer.getvalue(), data)
-                        data = data[n:]
+                    self._write(chan, self._take_outbound())
         except Exception as e:
             self.logger.debug("Broke out of main loop, error=%r", e)
             self._dispatch_error(e)
             self.close()
 
+    @property
+    def reactor(self):
+        """The :class:`~ncclient.transport.reactor.Reactor` doing the I/O of
+        this session, or `None` (the default) for the session to do it in a
+        thread of its own. Can only be set before connecting."""
+        return self._reactor
+
+    @reactor.setter
+    def reactor(self, reactor):
+        if self._connected:
+            raise SSHError("The reactor of a session cannot be changed once connected")
+        self._reactor = reactor
+
+    @property
+    def read_size(self):
+        """Number of bytes asked for in each read from the channel (default
+        :data:`BUF_SIZE`). With :attr:`adaptive_read` this is the size reads
+        start at and return to after each message."""
+        return self._read_size
+
+    @read_size.setter
+    def read_size(self, size):
+        if size <= 0:
+            raise ValueError("read_size must be positive")
+        self._read_size = self._cur_read_size = size
+
+    @property
+    def adaptive_read(self):
+        """Whether the read size doubles, up to :data:`MAX_BUF_SIZE`, while
+        reads keep coming back full, i.e. during large replies (default=False)."""
+        return self._adaptive_read
+
+    @adaptive_read.setter
+    def adaptive_read(self, x):
+        self._adaptive_read = x
+        self._cur_read_size = self._read_size
+
+    @property
+    def read_budget(self):
+        """Maximum number of bytes read from the channel before what has been
+        received is parsed (default :data:`READ_BUDGET`)."""
+        return self._read_budget
+
+    @read_budget.setter
+    def read_budget(self, size):
+        if size <= 0:
+            raise ValueError("read_budget must be positive")
+        self._read_budget = size
+
+    @property
+    def incremental_parse(self):
+        """Whether received messages are parsed as they arrive (default=False).
+        The XML parser then runs on each piece of a message as soon as it has
+        been read, while the rest is still on the wire, and listeners are
+        handed the finished tree instead of parsing the raw message again.
+        Takes effect from the next message on."""
+        return isinstance(self._decoder11.builder.default, ParsingMessageBuilder)
+
+    @incremental_parse.setter
+    def incremental_parse(self, x):
+        for decoder in (self._decoder10, self._decoder11):
+            # a message already being received is finished by the old one
+            old = decoder.builder.default
+            cls = ParsingMessageBuilder if x else MessageBuilder
+            decoder.builder.default = cls(old.spill_threshold, old.max_size)
+
+    @property
+    def spill_threshold(self):
+        """Size in bytes beyond which a message being received is moved out of
+        memory into an anonymous temporary file (default `None`, never). Such
+        a message reaches listeners as a read-only :class:`mmap.mmap` rather
+        than :class:`bytes`, which :func:`~ncclient.xml_.to_ele` parses directly."""
+        return self._decoder11.builder.default.spill_threshold
+
+    @spill_threshold.setter
+    def spill_threshold(self, size):
+        for decoder in (self._decoder10, self._decoder11):
+            decoder.builder.default.spill_threshold = size
+
+    @property
+    def max_message_size(self):
+        """Size in bytes beyond which a message being received is dropped
+        (default `None`, no limit). The RPC waiting for it gets a reply holding
+        a `too-big` *rpc-error* instead; the session carries on."""
+        return self._decoder11.builder.default.max_size
+
+    @max_message_size.setter
+    def max_message_size(self, size):
+        for decoder in (self._decoder10, self._decoder11):
+            decoder.builder.default.max_size = size
+
+    @property
+    def receive_stats(self):
+        """Dictionary of receive counters: the number of `messages`, channel
+        `reads`, `parse_passes` and `bytes` so far, and under `last_message`
+        the number of reads and parse passes the last message took."""
+        return self._receive_stats
+
     @property
     def host(self):
         """Host this session is connected to, or None if not connected."""
@@ -2,10 +2,6 @@ import os
 import sys
 import re
 
-if sys.version < '3':
-    from cStringIO import StringIO
-else:
-    from io import StringIO
 from select import select
 if sys.version>='2.7':
     from subprocess import Popen, check_output, PIPE, STDOUT
@@ -29,10 +25,6 @@ class IOProc(SSHSession):
         self._channel = None
         self._channel_id = None
         self._channel_name = None
-        self._buffer = StringIO()  # for incoming data
-        # parsing-related, see _parse()
-        self._parsing_state = 0
-        self._parsing_pos = 0
         self._device_handler = device_handler
 
     def close(self):
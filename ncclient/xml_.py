@@ -16,11 +16,10 @@
 "Methods for creating, parsing, and dealing with XML and ElementTree objects."
 
 
-import io
-import sys
+import mmap
+import re
+import threading
 import six
-import types
-from six import StringIO
 from io import BytesIO
 from lxml import etree
 
@@ -30,12 +29,24 @@ from lxml import etree
 
 from ncclient import NCClientError
 
-parser = etree.XMLParser(recover=False)
-huge_parser = etree.XMLParser(recover=False, huge_tree=True)
+# lxml parsers must not be used by several threads at once, so each thread
+# has its own
+_parsers = threading.local()
 
 
 def _get_parser(huge_tree=False):
-    return huge_parser if huge_tree else parser
+    try:
+        return _parsers.huge if huge_tree else _parsers.default
+    except AttributeError:
+        _parsers.default = etree.XMLParser(recover=False)
+        _parsers.huge = etree.XMLParser(recover=False, huge_tree=True)
+        return _parsers.huge if huge_tree else _parsers.default
+
+
+if six.PY2:
+    _native = lambda b: b
+else:
+    _native = lambda b: b.decode('UTF-8')
 
 
 class XMLError(NCClientError):
@@ -106,33 +117,277 @@ qualify = lambda tag, ns=BASE_NS_1_0: tag if ns is None else "{%s}%s" % (ns, tag
 def to_xml(ele, encoding="UTF-8", pretty_print=False):
     "Convert and return the XML for an *ele* (:class:`~xml.etree.ElementTree.Element`) with specified *encoding*."
     xml = etree.tostring(ele, encoding=encoding, pretty_print=pretty_print)
-    if sys.version < '3':
-        return xml if xml.startswith('<?xml') else '<?xml version="1.0" encoding="%s"?>%s' % (encoding, xml)
-    else:
-        return xml.decode('UTF-8') if xml.startswith(b'<?xml') \
-            else '<?xml version="1.0" encoding="%s"?>%s' % (encoding, xml.decode('UTF-8'))
+    if not xml.startswith(b'<?xml'):
+        xml = b'<?xml version="1.0" encoding="' + encoding.encode('ascii') + b'"?>' + xml
+    return _native(xml)
 
 
 def to_ele(x, huge_tree=False):
     """Convert and return the :class:`~xml.etree.ElementTree.Element` for the XML document *x*. If *x* is already an :class:`~xml.etree.ElementTree.Element` simply returns that.
 
     *huge_tree*: parse XML with very deep trees and very long text content
+
+    *x* may be a string or, as received, :class:`bytes`, a :class:`bytearray`
+    or the :class:`mmap.mmap` of a message that was spilled to disk.
     """
-    if sys.version < '3':
-        return x if etree.iselement(x) else etree.fromstring(x, parser=_get_parser(huge_tree))
-    else:
-        return x if etree.iselement(x) else etree.fromstring(x.encode('UTF-8'), parser=_get_parser(huge_tree))
+    if etree.iselement(x):
+        return x
+    if isinstance(x, mmap.mmap):
+        # a message too large to have been kept in memory
+        x.seek(0)
+        return etree.parse(x, parser=_get_parser(huge_tree)).getroot()
+    if isinstance(x, six.text_type):
+        x = x.encode('UTF-8')
+    return etree.fromstring(x, parser=_get_parser(huge_tree))
+
+
+def to_text(raw):
+    """Return the XML document *raw* as a string. *raw* may also be a
+    received message as :class:`bytes`, a :class:`bytearray` or, if it was
+    spilled to disk, as an :class:`mmap.mmap`, which is read into memory for
+    this."""
+    if isinstance(raw, mmap.mmap):
+        raw = raw[:]
+    elif isinstance(raw, bytearray):
+        raw = bytes(raw)
+    return _native(raw) if isinstance(raw, bytes) else raw
+
+
+#: The start tag of a document's root element, after the XML declaration and
+#: any comments or processing instructions; group(1) is the tag name and
+#: group(2) the attributes.
+RE_ROOT_START = re.compile(
+    br'(?:\s+|<\?.*?\?>|<!--.*?-->)*<([^\s/>!?]+)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.S)
+RE_ATTRIBUTE = re.compile(br'([^\s=/]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+#: How much of a document :func:`parse_root` looks at before falling back to
+#: a real parser.
+SNIFF_LEN = 4096
+
+
+
+def sniff_root(head):
+    """Read the root element's qualified name and attributes off the start of
+    an XML document, *head* (:class:`bytes`), without parsing it. Returns
+    `None` if *head* does not contain the complete root start tag or it
+    cannot be dealt with this way (entity references, undeclared prefixes)."""
+    match = RE_ROOT_START.match(head)
+    if match is None:
+        return None
+    nsmap = {b'xml': XML_NS}
+    attrs = []
+    for name, dq, sq in RE_ATTRIBUTE.findall(match.group(2)):
+        value = dq or sq
+        if b'&' in value:
+            return None
+        if name == b'xmlns':
+            nsmap[None] = _native(value)
+        elif name.startswith(b'xmlns:'):
+            nsmap[name[6:]] = _native(value)
+        else:
+            attrs.append((name, value))
+
+    def qname(name, default):
+        prefix, _, local = name.rpartition(b':')
+        if not prefix:
+            ns = default
+        elif prefix in nsmap:
+            ns = nsmap[prefix]
+        else:
+            raise KeyError(prefix)
+        return "{%s}%s" % (ns, _native(local)) if ns else _native(local)
+
+    try:
+        tag = qname(match.group(1), nsmap.get(None))
+        return (tag, dict((qname(name, None), _native(value)) for name, value in attrs))
+    except KeyError:
+        return None
 
 
 def parse_root(raw):
     "Efficiently parses the root element of a *raw* XML document, returning a tuple of its qualified name and attribute dictionary."
-    if sys.version < '3':
-        fp = StringIO(raw)
-    else:
+    # the root start tag is nearly always within the first few hundred
+    # bytes; only look further if it is not
+    head = raw[:SNIFF_LEN]
+    if isinstance(head, six.text_type):
+        head = head.encode('UTF-8')
+    elif not isinstance(head, bytes):
+        head = bytes(head)
+    root = sniff_root(head)
+    if root is not None:
+        return root
+    if isinstance(raw, mmap.mmap):
+        raw.seek(0)
+        fp = raw
+    elif isinstance(raw, six.text_type):
         fp = BytesIO(raw.encode('UTF-8'))
+    else:
+        fp = BytesIO(raw)
     for event, element in etree.iterparse(fp, events=('start',)):
         return (element.tag, element.attrib)
 
+def _text_re(regex):
+    # the same pattern, for matching against a string
+    return re.compile(regex.pattern.decode('ascii'), regex.flags)
+
+
+_RE_START_TAG = re.compile(br'\s*<([^\s/>!?]+)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+_RE_ENCODING = re.compile(br'<\?xml[^>]*?encoding\s*=\s*["\']([^"\']*)')
+_RE_END_TAGS = r'\A\s*(</%s\s*>)\s*\Z'
+_RE_END_TAGS_CHILD = r'</%s\s*>\s*(</%s\s*>)\s*\Z'
+_SLICE_RES = (RE_ROOT_START, _RE_START_TAG, RE_ATTRIBUTE, _RE_ENCODING)
+_TEXT_SLICE_RES = tuple(_text_re(regex) for regex in _SLICE_RES)
+
+#: How far from the end of a document :func:`sliced_xml` looks for the end
+#: tags of the element and of the root.
+SLICE_TAIL_LEN = 1024
+
+
+def _match_root_start(raw):
+    # the root start tag of a document that can be cut into pieces: a
+    # function turning str literals into what *raw* holds, the patterns to
+    # use on it and the match, or None
+    if isinstance(raw, six.text_type):
+        lit = lambda t: t
+        res = _TEXT_SLICE_RES
+    elif isinstance(raw, (bytes, bytearray, mmap.mmap)):
+        lit = lambda t: t.encode('ascii')
+        res = _SLICE_RES
+    else:
+        return None
+    re_root, re_start, re_attr, re_encoding = res
+    root_start = re_root.match(raw)
+    if root_start is None or root_start.group(2).rstrip().endswith(lit('/')):
+        return None
+    if not isinstance(raw, six.text_type):
+        encoding = re_encoding.match(raw, 0, root_start.start(1))
+        if encoding is not None and \
+                encoding.group(1).upper().replace(b'-', b'') != b'UTF8':
+            return None
+    return lit, res, root_start
+
+
+def sliced_xml(raw, ele):
+    """Return the XML for *ele*, the only child of the root element of the
+    *raw* document it was parsed from, as cut out of *raw* rather than
+    serialized again. The root's namespace declarations are copied onto the
+    start tag, as :func:`to_xml` would have them. Returns `None` if *ele*
+    cannot be cut out this way (other content next to it, a document not in
+    UTF-8).
+    """
+    root = ele.getparent()
+    if root is None or root.getparent() is not None or \
+            ele.getprevious() is not None or ele.getnext() is not None:
+        return None
+    found = _match_root_start(raw)
+    if found is None:
+        return None
+    lit, (re_root, re_start, re_attr, re_encoding), root_start = found
+    qname = ele.tag.rpartition('}')[2]
+    if ele.prefix:
+        qname = '%s:%s' % (ele.prefix, qname)
+    if not isinstance(raw, six.text_type):
+        qname = qname.encode('UTF-8')
+    start = re_start.match(raw, root_start.end())
+    if start is None or start.group(1) != qname:
+        return None
+    empty = start.group(2).rstrip().endswith(lit('/'))
+    # nothing but whitespace, the element's tail, may follow the element
+    tail_start = max(start.end(), len(raw) - SLICE_TAIL_LEN)
+    if empty and tail_start != start.end():
+        return None
+    tail = raw[tail_start:]
+    end_tags = lit(_RE_END_TAGS if empty else _RE_END_TAGS_CHILD) % (
+        re.escape(root_start.group(1)) if empty else
+        (re.escape(qname), re.escape(root_start.group(1))))
+    found = re.search(end_tags, tail)
+    if found is None:
+        return None
+    end = tail_start + found.start(1)
+    # the root's namespace declarations go after the element's own ones
+    names, decls, attrs = set(), [], []
+    for attr in re_attr.finditer(start.group(2)):
+        names.add(attr.group(1))
+        is_decl = attr.group(1).partition(lit(':'))[0] == lit('xmlns')
+        (decls if is_decl else attrs).append(attr.group(0))
+    for decl in re_attr.finditer(root_start.group(2)):
+        if decl.group(1).partition(lit(':'))[0] == lit('xmlns') and \
+                decl.group(1) not in names:
+            decls.append(decl.group(0))
+    xml = lit(' ').join([lit('<') + start.group(1)] + decls + attrs)
+    xml += lit('/>' if empty else '>') + raw[start.end():end]
+    if not isinstance(xml, six.text_type):
+        xml = xml.decode('UTF-8')
+    return '<?xml version="1.0" encoding="UTF-8"?>%s' % xml
+
+
+#: How far into a document, and back from its end, :func:`split_child` looks
+#: for the start and end tags of the element.
+SPLIT_SCAN_LEN = 64 * 1024
+
+# the attribute marking the child emptied by split_child
+_SPLIT_MARK = 'ncclient-split-child'
+
+
+def split_child(raw, tag, huge_tree=False, scan_len=SPLIT_SCAN_LEN):
+    """Find the child of the root element of the *raw* XML document with the
+    qualified name *tag* without parsing its content. Returns a tuple
+    *(skeleton, start, end)*: *skeleton* is the root element of the document
+    parsed as if that child were empty, and *raw[start:end]* is the child's
+    content as received, which is not checked any further.
+
+    Only the first and the last *scan_len* characters of *raw* are looked at.
+    Returns `None` if the child is not found there or the document cannot be
+    split this way.
+    """
+    found = _match_root_start(raw)
+    if found is None:
+        return None
+    lit, (re_root, re_start, re_attr, re_encoding), root_start = found
+    local = tag.rpartition('}')[2]
+    re_child = re.compile(lit(r'<(?:[^\s/>!?:]+:)?%s(?=[\s/>])' % re.escape(local)))
+    child = re_child.search(raw, root_start.end(),
+                            min(len(raw), root_start.end() + scan_len))
+    start = child and re_start.match(raw, child.start())
+    if not start:
+        return None
+    tail_start = max(start.end(), len(raw) - scan_len)
+    root_end = re.search(lit(r'</%s\s*>\s*\Z') % re.escape(root_start.group(1)),
+                         raw[tail_start:])
+    if root_end is None:
+        return None
+    root_end = tail_start + root_end.start()
+    head = raw[child.start():start.end() - 1].rstrip()
+    if head.endswith(lit('/')):
+        head = head[:-1]
+        content = after = start.end()
+    else:
+        content = raw.rfind(lit('</') + start.group(1), tail_start, root_end)
+        if content < 0:
+            return None
+        after = raw.find(lit('>'), content, root_end) + 1
+        if not after or raw[content + 2 + len(start.group(1)):after - 1].strip():
+            return None
+    # the child, emptied and marked, so that it can be told from what only
+    # looks like it
+    skeleton = raw[:child.start()] + head + lit(' %s=""/>' % _SPLIT_MARK) + raw[after:]
+    if isinstance(skeleton, six.text_type):
+        skeleton = skeleton.encode('UTF-8')
+    try:
+        skeleton = etree.fromstring(skeleton, parser=_get_parser(huge_tree))
+    except etree.XMLSyntaxError:
+        return None
+    stand_in = skeleton.find('*[@%s]' % _SPLIT_MARK)
+    if stand_in is None or stand_in.tag != tag or len(stand_in) or stand_in.text \
+            or (stand_in.tail and stand_in.tail.strip()):
+        return None
+    del stand_in.attrib[_SPLIT_MARK]
+    return skeleton, start.end(), max(start.end(), content)
+
+
 def validated_element(x, tags=None, attrs=None):
     """Checks if the root element of an XML document or Element meets the supplied criteria.
 
@@ -168,8 +423,9 @@ class NCElement(object):
         self.__result = result
         self.__transform_reply = transform_reply
         self.__huge_tree = huge_tree
-        if isinstance(transform_reply, types.FunctionType):
-            self.__doc = self.__transform_reply(result._root)
+        self.__tostring = self.__data_xml = None
+        if callable(transform_reply):
+            self.__doc = self.__transform_reply(_reply_tree(result, huge_tree))
         else:
             self.__doc = self.remove_namespaces(self.__result)
 
@@ -195,35 +451,136 @@ class NCElement(object):
 
     def __str__(self):
         """syntactic sugar for str() - alias to tostring"""
-        if sys.version<'3':
-            return self.tostring
-        else:
-            return self.tostring.decode('UTF-8')
+        return _native(self.tostring)
 
     @property
     def tostring(self):
         """return a pretty-printed string output for rpc reply"""
-        parser = etree.XMLParser(remove_blank_text=True, huge_tree=self.__huge_tree)
-        outputtree = etree.XML(etree.tostring(self.__doc), parser)
-        return etree.tostring(outputtree, pretty_print=True)
+        # serialized once; the document is not expected to change
+        if self.__tostring is None:
+            parser = etree.XMLParser(remove_blank_text=True, huge_tree=self.__huge_tree)
+            outputtree = etree.XML(etree.tostring(self.__doc), parser)
+            self.__tostring = etree.tostring(outputtree, pretty_print=True)
+        return self.__tostring
 
     @property
     def data_xml(self):
         """return an unmodified output for rpc reply"""
-        return to_xml(self.__doc)
+        if self.__data_xml is None:
+            self.__data_xml = to_xml(self.__doc)
+        return self.__data_xml
 
     def remove_namespaces(self, rpc_reply):
         """remove xmlns attributes from rpc reply"""
         self.__xslt=self.__transform_reply
-        self.__parser = etree.XMLParser(remove_blank_text=True, huge_tree=self.__huge_tree)
-        self.__xslt_doc = etree.parse(io.BytesIO(self.__xslt), self.__parser)
-        self.__transform = etree.XSLT(self.__xslt_doc)
-        self.__root = etree.fromstring(str(self.__transform(etree.parse(StringIO(str(rpc_reply)),
-                                                                        parser=self.__parser))),
-                                       parser=self.__parser)
+        self.__transform = xslt_transform(self.__xslt)
+        # work on the tree the reply was parsed into rather than on its text
+        self.__root = self.__transform(_reply_tree(rpc_reply, self.__huge_tree))
         return self.__root
 
 
+class XSLTransform(object):
+
+    """Callable applying the XSLT *stylesheet* (:class:`bytes` or string) to an
+    element and returning the root element of the result. With *blank_text*,
+    whitespace-only text between elements is then removed, as NCElement has
+    always done with the result of `transform_reply`.
+
+    The stylesheet is parsed once; the compiled :class:`lxml.etree.XSLT` is
+    kept per thread, as those must not be used from several threads at once.
+    """
+
+    def __init__(self, stylesheet, blank_text=False):
+        if not isinstance(stylesheet, bytes):
+            stylesheet = stylesheet.encode('UTF-8')
+        self._doc = etree.XML(stylesheet)
+        self._blank_text = blank_text
+        self._local = threading.local()
+
+    def __call__(self, ele):
+        xslt = getattr(self._local, 'xslt', None)
+        if xslt is None:
+            xslt = self._local.xslt = etree.XSLT(self._doc)
+        root = xslt(ele).getroot()
+        if self._blank_text:
+            _strip_blank_text(root)
+        return root
+
+
+_xslt_transforms = {}
+_xslt_transforms_lock = threading.Lock()
+
+
+def xslt_transform(stylesheet):
+    """Return the :class:`XSLTransform` for a `transform_reply` *stylesheet*,
+    compiling it the first time it is seen."""
+    transform = _xslt_transforms.get(stylesheet)
+    if transform is None:
+        with _xslt_transforms_lock:
+            transform = _xslt_transforms.get(stylesheet)
+            if transform is None:
+                transform = _xslt_transforms[stylesheet] = XSLTransform(
+                    stylesheet, blank_text=True)
+    return transform
+
+
+def strip_namespaces(root, blank_text=False):
+    """Remove all namespaces from the tree under *root*, in place: element and
+    attribute names are reduced to their local part and namespace declarations
+    are dropped. This is what a "remove all namespaces" `transform_reply`
+    stylesheet does, without the cost of XSLT. With *blank_text*,
+    whitespace-only text between elements is removed in the same pass.
+
+    Returns *root*.
+    """
+    for ele in root.iter():
+        if blank_text:
+            tail = ele.tail
+            if tail is not None and not tail.strip():
+                ele.tail = None
+        tag = ele.tag
+        if not isinstance(tag, six.string_types):
+            # comment or processing instruction
+            continue
+        if tag[0] == '{':
+            ele.tag = tag[tag.index('}') + 1:]
+        attrib = ele.attrib
+        if attrib and any(name[0] == '{' for name in attrib.keys()):
+            items = attrib.items()
+            attrib.clear()
+            for name, value in items:
+                attrib[name[name.find('}') + 1:]] = value
+        if blank_text:
+            text = ele.text
+            if text is not None and not text.strip() and len(ele):
+                ele.text = None
+    etree.cleanup_namespaces(root)
+    return root
+
+
+def _reply_tree(rpc_reply, huge_tree=False):
+    # the parsed root element of an RPCReply, an element or an XML document
+    if etree.iselement(rpc_reply):
+        return rpc_reply
+    if hasattr(rpc_reply, 'parse'):
+        rpc_reply.parse()
+        return rpc_reply._root
+    return to_ele(rpc_reply, huge_tree=huge_tree)
+
+
+def _strip_blank_text(root):
+    """Drop whitespace-only text between elements from the tree under *root*,
+    in place, much like parsing with `remove_blank_text` would (which keeps
+    more of it in mixed content)."""
+    for ele in root.iter():
+        tail = ele.tail
+        if tail is not None and not tail.strip():
+            ele.tail = None
+        text = ele.text
+        if text is not None and not text.strip() and len(ele):
+            ele.text = None
+
+
 new_ele = lambda tag, attrs={}, **extra: etree.Element(qualify(tag), attrs, **extra)
 
 new_ele_ns = lambda tag, ns, attrs={}, **extra: etree.Element(qualify(tag,ns), attrs, **extra)
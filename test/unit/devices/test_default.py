@@ -1,5 +1,16 @@
 import unittest
+from lxml import etree
 from ncclient.devices.default import DefaultDeviceHandler
+from ncclient.xml_ import xslt_transform
+
+xslt = b'''<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+    <xsl:template match="/*">
+        <x><xsl:apply-templates select="node()"/></x>
+    </xsl:template>
+    <xsl:template match="*">
+        <xsl:element name="{local-name()}"/>
+    </xsl:template>
+</xsl:stylesheet>'''
 
 
 capabilities = ['urn:ietf:params:netconf:base:1.0',
@@ -31,12 +42,31 @@ class TestDefaultDevice(unittest.TestCase):
     def test_perform_qualify_check(self):
         self.assertTrue(self.obj.perform_qualify_check())
 
+    def test_nested_rpc_errors(self):
+        self.assertFalse(self.obj.nested_rpc_errors())
+
+    def test_max_rpcs_in_flight(self):
+        self.assertEqual(self.obj.max_rpcs_in_flight(), None)
+
     def test_handle_raw_dispatch(self):
         self.assertFalse(self.obj.handle_raw_dispatch(None))
 
     def test_handle_connection_exceptions(self):
         self.assertFalse(self.obj.handle_connection_exceptions(None))
 
+    def test_get_reply_transform(self):
+        self.assertFalse(self.obj.get_reply_transform())
+
+    def test_get_reply_transform_compiled_once(self):
+        class XSLTDeviceHandler(DefaultDeviceHandler):
+            def transform_reply(self):
+                return xslt
+        transform = XSLTDeviceHandler().get_reply_transform()
+        self.assertTrue(transform is XSLTDeviceHandler().get_reply_transform())
+        self.assertTrue(transform is xslt_transform(xslt))
+        root = transform(etree.fromstring(b'<a xmlns="urn:a">\n <b/>\n</a>'))
+        self.assertEqual(etree.tostring(root), b'<x><b/></x>')
+
 
 suite = unittest.TestSuite()
 unittest.TextTestRunner().run(suite)
@@ -1,5 +1,7 @@
 import unittest
 from ncclient.devices.junos import *
+from ncclient.operations.rpc import RPCReply
+from ncclient.xml_ import NCElement, qualify
 import ncclient.transport
 from mock import patch
 import paramiko
@@ -85,5 +87,27 @@ class TestJunosDevice(unittest.TestCase):
             reply = xml
         self.assertEqual(self.obj.transform_reply(), reply)
 
+    def test_get_reply_transform(self):
+        reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                 'xmlns:junos="http://xml.juniper.net/junos/12.1X46/junos" '
+                 'junos:style="x" message-id="1">\n<!-- c -->\n'
+                 '<data junos:changed="y">\n  <a xmlns:q="urn:q" q:z="3">t</a>\n'
+                 '  <b> </b>\n</data>\n</rpc-reply>')
+        expected = NCElement(reply, self.obj.transform_reply()).data_xml
+        result = NCElement(reply, self.obj.get_reply_transform())
+        self.assertEqual(result.data_xml, expected)
+
+    def test_get_reply_transform_keeps_reply(self):
+        reply = RPCReply('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                         'message-id="1"><data><a>t</a></data></rpc-reply>')
+        result = NCElement(reply, self.obj.get_reply_transform())
+        self.assertEqual(result.find('data/a').text, 't')
+        # the reply itself is left namespaced
+        self.assertEqual(reply._root.tag, qualify('rpc-reply'))
+        self.assertEqual(reply._root[0].tag, qualify('data'))
+
+    def test_nested_rpc_errors(self):
+        self.assertTrue(self.obj.nested_rpc_errors())
+
     def test_perform_quality_check(self):
         self.assertFalse(self.obj.perform_qualify_check())
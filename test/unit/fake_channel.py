@@ -0,0 +1,26 @@
+import select
+
+
+class FakeChannel(object):
+    "Stands in for a paramiko channel, backed by one end of a socket pair."
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def recv(self, n):
+        return self._sock.recv(n)
+
+    def recv_ready(self):
+        return bool(select.select([self._sock], [], [], 0)[0])
+
+    def send(self, data):
+        return self._sock.send(data)
+
+    def send_ready(self):
+        return True
+
+    def close(self):
+        self._sock.close()
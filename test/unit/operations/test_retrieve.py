@@ -220,3 +220,72 @@ class TestRetrieve(unittest.TestCase):
         call = mock_request.call_args_list[0][0][0]
         call = ElementTree.tostring(call)
         self.assertEqual(call, xml)
+
+    def test_get_reply_data_xml(self):
+        reply = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                 'xmlns:x="urn:x" message-id="1">\n'
+                 '<data><x:a b="1">t&amp;</x:a></data>\n</rpc-reply>\n')
+        obj = GetReply(reply)
+        with patch('ncclient.operations.retrieve.to_xml') as mock_to_xml:
+            xml = obj.data_xml
+            self.assertFalse(mock_to_xml.called)
+        self.assertEqual(xml, to_xml(obj.data_ele))
+        self.assertTrue(obj.data_xml is xml)
+
+    def test_get_reply_data_xml_serialized(self):
+        # a comment next to <data> keeps it from being cut out of the reply
+        reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                 'message-id="1"><!-- c --><data><a/></data></rpc-reply>')
+        obj = GetReply(reply)
+        self.assertEqual(obj.data_xml, to_xml(obj.data_ele))
+
+    @patch('ncclient.operations.retrieve.RPC._request')
+    def test_get_raw_data(self, mock_request):
+        session = ncclient.transport.SSHSession(self.device_handler)
+        obj = Get(session, self.device_handler, raise_mode=RaiseMode.ALL)
+        obj.request(raw_data=True)
+        self.assertEqual(mock_request.call_args[1]['reply_cls'], RawDataReply)
+        obj.request()
+        self.assertEqual(mock_request.call_args[1]['reply_cls'], None)
+
+    def test_raw_data_reply(self):
+        reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                 'xmlns:x="urn:x" message-id="1">\n'
+                 '<data><x:a>&lt;<b/></x:a></data>\n</rpc-reply>\n')
+        obj = RawDataReply(reply)
+        with patch('ncclient.xml_.to_ele') as mock_to_ele:
+            self.assertTrue(obj.ok)
+            self.assertEqual(obj.data_raw, '<x:a>&lt;<b/></x:a>')
+            self.assertEqual(obj.data_nsmap['x'], 'urn:x')
+            self.assertFalse(mock_to_ele.called)
+        self.assertEqual(obj.data_ele[0].tag, '{urn:x}a')
+        self.assertEqual(obj.data_xml, GetReply(reply).data_xml)
+        raw = RawDataReply(reply.encode('UTF-8')).data_raw
+        self.assertTrue(isinstance(raw, memoryview))
+        self.assertEqual(raw.tobytes(), b'<x:a>&lt;<b/></x:a>')
+
+    def test_raw_data_reply_error(self):
+        reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                 'message-id="1"><rpc-error><error-type>rpc</error-type>'
+                 '<error-tag>operation-failed</error-tag>'
+                 '<error-severity>error</error-severity></rpc-error>'
+                 '<data><rpc-error/></data></rpc-reply>')
+        obj = RawDataReply(reply)
+        self.assertFalse(obj.ok)
+        self.assertEqual(len(obj.errors), 1)
+        self.assertEqual(obj.errors[0].tag, 'operation-failed')
+        self.assertEqual(obj.data_raw, None)
+
+    def test_raw_data_reply_parsed(self):
+        # the reply cannot be split, so it is parsed after all
+        reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                 'message-id="1"><data><a>1</a></data><!-- c --></rpc-reply>')
+        obj = RawDataReply(reply)
+        self.assertEqual(obj.data_raw, '<a>1</a>')
+        self.assertEqual(obj.data_ele[0].text, '1')
+        for content, data_raw in (('<data><a>1</a></data><!-- </data> -->', '<a>1</a>'),
+                                  ('<x:data xmlns:x="urn:x"/><data>z</data>', 'z')):
+            reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                     'message-id="1">%s</rpc-reply>' % content)
+            self.assertEqual(RawDataReply(reply).data_raw, data_raw)
@@ -5,10 +5,19 @@ from ncclient import manager
 import ncclient.manager
 import ncclient.transport
 from ncclient.xml_ import *
-from ncclient.operations import RaiseMode
+from ncclient.operations import RaiseMode, Dispatch
+from ncclient.operations.third_party.juniper.rpc import GetConfiguration
+from ncclient.operations.errors import PipelineFullError
+from ncclient.transport.errors import TransportError
 from ncclient.capabilities import Capabilities
+from ncclient.transport.framing import MessageBuilder
 from xml.sax.saxutils import escape
+import io
+import mmap
 import sys
+import tempfile
+import threading
+import concurrent.futures
 
 if sys.version >= '3':
     patch_str = 'ncclient.operations.rpc.Event.isSet'
@@ -104,6 +113,56 @@ class TestRPC(unittest.TestCase):
         obj = RPCReply(xml5_huge)
         self.assertRaises(etree.XMLSyntaxError, obj.parse)
 
+    def test_rpc_reply_parsed_root(self):
+        root = to_ele(xml4)
+        obj = RPCReply(xml4, root=root)
+        with patch('ncclient.operations.rpc.to_ele') as mock_to_ele:
+            self.assertTrue(obj.ok)
+            self.assertFalse(mock_to_ele.called)
+        self.assertEqual(obj._root, root)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_reply_listener_parsed_root(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, async_mode=True)
+        obj._request(new_ele("get"))
+        ele = to_ele(xml4)
+        ele.set('message-id', obj.id)
+        session._deliver_message(to_xml(ele), ele)
+        self.assertTrue(obj.event.is_set())
+        self.assertIs(obj.reply._root, ele)
+
+    def test_rpc_reply_errors(self):
+        reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">'
+                 '<rpc-error><error-severity>warning</error-severity>'
+                 '<error-info><bad-element>x</bad-element></error-info>'
+                 '<error-message>w</error-message></rpc-error>'
+                 '<load-configuration-results><rpc-error>'
+                 '<error-severity>error</error-severity></rpc-error>'
+                 '</load-configuration-results></rpc-reply>')
+        obj = RPCReply(reply)
+        with patch.object(RPCReply, 'ERROR_CLS') as mock_error:
+            self.assertFalse(obj.ok)
+            self.assertFalse(mock_error.called)
+        obj = RPCReply(reply)
+        self.assertEqual([err.severity for err in obj.errors], ['warning'])
+        self.assertEqual(obj.error._info, None)
+        self.assertTrue('<bad-element>x</bad-element>' in obj.error.info)
+        obj = RPCReply(reply, deep_errors=True)
+        self.assertEqual([err.severity for err in obj.errors],
+                         ['warning', 'error'])
+
+    def test_rpc_listener_cached(self):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler)
+        with patch.object(RPCReplyListener, 'creation_lock') as mock_lock:
+            obj2 = RPC(session, device_handler)
+            self.assertFalse(mock_lock.__enter__.called)
+        self.assertTrue(obj._listener is obj2._listener)
+        self.assertNotEqual(obj.id, obj2.id)
+        self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertFalse(hasattr(RPCReply(xml1), '__dict__'))
+
     def test_rpc_reply_huge_text_node_workaround(self):
         obj = RPCReply(xml5_huge, huge_tree=True)
         obj.parse()
@@ -138,6 +197,47 @@ class TestRPC(unittest.TestCase):
         self.assertEqual(obj.session, session)
         self.assertEqual(reply, obj.reply)
 
+    @patch('ncclient.transport.Session.send')
+    @patch(patch_str)
+    def test_rpc_prepared(self, mock_thread, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        node = new_ele("commit")
+        sub_ele(node, "log").text = 'say "hi"'
+        obj = Dispatch(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        prepared = obj.prepare(node)
+        self.assertFalse(mock_send.called)
+        self.assertEqual(prepared.cls, Dispatch)
+        self.assertNotIn(obj._id, RPCReplyListener(session, device_handler)._id2rpc)
+        for i in range(2):
+            obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+            obj._reply = RPCReply(xml1)
+            obj._request(prepared, **prepared.kwargs)
+            expected = obj._wrap(node).encode('UTF-8')
+            mock_send.assert_called_with(expected)
+            self.assertEqual(prepared.render(obj._id), expected)
+        self.assertIn(b'message-id="a&quot;b"', prepared.render('a"b'))
+
+    @patch('ncclient.manager.Manager._rpc')
+    def test_manager_prepared(self, mock_rpc):
+        conn = manager.Manager(None, None)
+        prepared = PreparedRPC(RPC, '<rpc message-id="%s"/>' % PreparedRPC.MARKER, sink='x')
+        conn.execute(prepared)
+        mock_rpc.assert_called_once_with(RPC)
+        mock_rpc.return_value._request.assert_called_once_with(prepared, sink='x')
+        conn.prepare("get", filter=None)
+        mock_rpc.assert_called_with(ncclient.operations.Get)
+        mock_rpc.return_value.prepare.assert_called_once_with(filter=None)
+
+    @patch('ncclient.manager.Manager._rpc')
+    @patch(patch_str)
+    def test_manager_prepared_huge_tree(self, mock_thread, mock_rpc):
+        device_handler, session = self._mock_device_handler_and_session()
+        prepared = GetConfiguration(session, device_handler).prepare(format='text')
+        self.assertTrue(prepared.huge_tree)
+        mock_rpc.return_value.huge_tree = False
+        manager.Manager(None, None).execute(prepared)
+        self.assertTrue(mock_rpc.return_value.huge_tree)
+
     @patch('ncclient.transport.Session.send')
     @patch(patch_str)
     def test_rpc_async(self, mock_thread, mock_send):
@@ -152,7 +252,10 @@ class TestRPC(unittest.TestCase):
         obj._reply = reply
         node = new_ele("commit")
         result = obj._request(node)
-        self.assertEqual(result, obj)
+        self.assertTrue(isinstance(result, RPCFuture))
+        self.assertEqual(result.rpc, obj)
+        self.assertEqual(result.event, obj.event)
+        self.assertFalse(result.done())
 
     @patch('ncclient.transport.Session.send')
     @patch(patch_str)
@@ -166,6 +269,187 @@ class TestRPC(unittest.TestCase):
         mock_thread.return_value = False
         self.assertRaises(TimeoutExpiredError, obj._request, node)
 
+    @patch('ncclient.transport.Session.send')
+    @patch(patch_str)
+    def test_rpc_timeout_late_reply(self, mock_thread, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        listener = obj._listener
+        # only registered once requested
+        self.assertEqual(listener.in_flight, 0)
+        mock_thread.return_value = False
+        self.assertRaises(TimeoutExpiredError, obj._request, new_ele("commit"))
+        self.assertEqual(listener.in_flight, 0)
+        late = '<rpc-reply xmlns="%s" message-id="%s"><ok/>'
+        with patch.object(RPC, 'deliver_reply') as mock_deliver:
+            # dropped once, without being parsed
+            raw = late % (BASE_NS_1_0, obj.id)
+            listener.callback(parse_root(raw), raw)
+            self.assertFalse(mock_deliver.called)
+            # then, or with drop_late_replies off, dropped as unknown
+            with patch.object(listener.logger, 'warning') as mock_warning:
+                listener.callback(parse_root(raw), raw)
+                listener.drop_late_replies = False
+                obj = RPC(session, device_handler, async_mode=True)
+                obj._request(new_ele("commit"))
+                obj.cancel()
+                raw = late % (BASE_NS_1_0, obj.id)
+                listener.callback(parse_root(raw), raw)
+            self.assertEqual(mock_warning.call_count, 2)
+            self.assertFalse(mock_deliver.called)
+
+    @patch('ncclient.transport.Session.send')
+    def test_manager_rpcs_in_flight(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        conn = manager.Manager(session, device_handler, rpc_ttl=30,
+                               drop_late_replies=False)
+        self.assertEqual(conn.rpc_ttl, 30)
+        self.assertFalse(RPCReplyListener(session, device_handler).drop_late_replies)
+        self.assertEqual(conn.rpcs_in_flight, 0)
+        RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        self.assertEqual(conn.rpcs_in_flight, 1)
+        # an RPC failing before it is requested is not left behind
+        session._server_capabilities = Capabilities([])
+        for i in range(3):
+            self.assertRaises(MissingCapabilityError, conn.get, with_defaults='report-all')
+        self.assertEqual(conn.rpcs_in_flight, 1)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_pipeline_window(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        conn = manager.Manager(session, device_handler, max_rpcs_in_flight=2,
+                               block_when_full=False)
+        first = RPC(session, device_handler, async_mode=True)
+        first.is_async = True
+        first._request(new_ele("get"))
+        RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        third = RPC(session, device_handler, async_mode=True)
+        self.assertRaises(PipelineFullError, third._request, new_ele("get"))
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(conn.rpcs_in_flight, 2)
+        # a reply makes room
+        raw = '<rpc-reply xmlns="%s" message-id="%s"><ok/></rpc-reply>' % (BASE_NS_1_0, first.id)
+        first._listener.callback(parse_root(raw), raw)
+        self.assertTrue(first.reply.ok)
+        RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        self.assertEqual(mock_send.call_count, 3)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_pipeline_window_send_error(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        conn = manager.Manager(session, device_handler, max_rpcs_in_flight=2,
+                               block_when_full=False)
+        mock_send.side_effect = TransportError('not connected')
+        for i in range(2):
+            rpc = RPC(session, device_handler, async_mode=True)
+            self.assertRaises(TransportError, rpc._request, new_ele("get"))
+        # the failed requests gave their places back
+        self.assertEqual(conn.rpcs_in_flight, 0)
+        mock_send.side_effect = None
+        RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        self.assertEqual(conn.rpcs_in_flight, 2)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_pipeline_window_wait(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        conn = manager.Manager(session, device_handler, max_rpcs_in_flight=1)
+        first = RPC(session, device_handler, async_mode=True)
+        first._request(new_ele("get"))
+        second = RPC(session, device_handler, async_mode=True, timeout=0.01)
+        self.assertRaises(PipelineFullError, second._request, new_ele("get"))
+        self.assertEqual(conn.rpcs_in_flight, 1)
+        second = RPC(session, device_handler, async_mode=True, timeout=10)
+        timer = threading.Timer(0.05, first.cancel)
+        timer.start()
+        self.assertEqual(second._request(new_ele("get")).rpc, second)
+        timer.join()
+        self.assertEqual(mock_send.call_count, 2)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_future(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        listener = RPCReplyListener(session, device_handler)
+        reply = '<rpc-reply xmlns="%s" message-id="%s">%s</rpc-reply>'
+        done = []
+        ok = RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        ok.add_done_callback(done.append)
+        err = RPC(session, device_handler, async_mode=True,
+                  raise_mode=RaiseMode.ALL)._request(new_ele("get"))
+        cancelled = RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        self.assertTrue(cancelled.cancel())
+        self.assertTrue(cancelled.cancelled())
+        self.assertFalse(cancelled.cancel())
+        error = ('<rpc-error><error-severity>error</error-severity>'
+                 '<error-message>failed</error-message></rpc-error>')
+        for future, content in ((ok, '<ok/>'), (err, error)):
+            raw = reply % (BASE_NS_1_0, future.id, content)
+            listener.callback(parse_root(raw), raw)
+        finished = concurrent.futures.wait([ok, err, cancelled], timeout=1)[0]
+        self.assertEqual(len(finished), 3)
+        self.assertEqual(done, [ok])
+        self.assertTrue(isinstance(ok.result(), NCElement))
+        self.assertTrue(ok.reply.ok)
+        self.assertTrue(isinstance(err.exception(), RPCError))
+        self.assertFalse(ok.cancel())
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_future_error(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        future = RPC(session, device_handler, async_mode=True)
+        future._request(new_ele("get"))
+        future._listener.errback(TransportError('gone'))
+        self.assertRaises(TransportError, future._future.result, 0)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_cancel(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, async_mode=True)
+        obj._request(new_ele("get"))
+        self.assertTrue(obj.cancel())
+        self.assertTrue(obj.event.is_set())
+        self.assertTrue(isinstance(obj.error, OperationError))
+        self.assertFalse(obj.cancel())
+        self.assertEqual(obj._listener.in_flight, 0)
+
+    @patch('ncclient.transport.Session.send')
+    @patch('ncclient.operations.rpc._clock')
+    def test_rpc_ttl(self, mock_clock, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        listener = RPCReplyListener(session, device_handler)
+        listener.ttl = 10
+        mock_clock.return_value = 100
+        old = RPC(session, device_handler, async_mode=True)
+        old._request(new_ele("get"))
+        mock_clock.return_value = 105
+        new = RPC(session, device_handler, async_mode=True)
+        new._request(new_ele("get"))
+        self.assertEqual(listener.in_flight, 2)
+        mock_clock.return_value = 110
+        RPC(session, device_handler, async_mode=True)._request(new_ele("get"))
+        self.assertEqual(listener.in_flight, 2)
+        self.assertTrue(isinstance(old.error, TimeoutExpiredError))
+        self.assertFalse(new.event.is_set())
+        late = '<rpc-reply xmlns="%s" message-id="%s"><ok/></rpc-reply>' % (BASE_NS_1_0, old.id)
+        listener.callback(parse_root(late), late)
+        self.assertEqual(old.reply, None)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_ttl_idle(self, mock_send):
+        # expired without any other RPC or reply on the session
+        device_handler, session = self._mock_device_handler_and_session()
+        other = self._mock_device_handler_and_session()[1]
+        futures = []
+        for s in (session, other):
+            RPCReplyListener(s, device_handler).ttl = 0.05
+            futures.append(RPC(s, device_handler, async_mode=True)._request(new_ele("get")))
+        for future in futures:
+            self.assertTrue(isinstance(future.exception(5), TimeoutExpiredError))
+            self.assertEqual(future.rpc._listener.in_flight, 0)
+        # by a single thread for all sessions
+        self.assertEqual(len([t for t in threading.enumerate()
+                              if t.name == 'ncclient-rpc-expiry']), 1)
+
     @patch('ncclient.transport.Session.send')
     @patch(patch_str)
     def test_rpc_rpcerror(self, mock_thread, mock_send):
@@ -190,6 +474,54 @@ class TestRPC(unittest.TestCase):
         self.assertRaises(MissingCapabilityError,
             obj._assert, ':candidate')
 
+    def test_rpc_reply_spilled(self):
+        f = tempfile.TemporaryFile()
+        f.write(xml4.encode('UTF-8'))
+        f.flush()
+        raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        obj = RPCReply(raw)
+        self.assertTrue(obj.ok)
+        self.assertEqual(obj.xml, xml4)
+        self.assertEqual(parse_root(raw)[0], qualify('rpc-reply'))
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_too_big(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        builder = MessageBuilder(max_size=100)
+        builder.write(xml4.replace('message-id="', 'message-id="%s" x="' % obj.id).encode('UTF-8'))
+        mock_send.side_effect = lambda req: session._deliver_message(builder.finish().decode('UTF-8'))
+        with self.assertRaises(RPCError) as cm:
+            obj._request(new_ele("get"))
+        self.assertEqual(cm.exception.tag, 'too-big')
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_sink(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        out = io.BytesIO()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        def send(req):
+            self.assertEqual(session._routes, {obj.id: obj._sink})
+            # not redirected by this transport, written out on delivery
+            obj.deliver_reply(xml4)
+        mock_send.side_effect = send
+        result = obj._request(new_ele("get-config"), sink=out)
+        self.assertTrue(isinstance(result, SinkReply))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.size, len(xml4))
+        self.assertEqual(out.getvalue(), xml4.encode('UTF-8'))
+        self.assertEqual(to_ele(result.xml).find(qualify('data')), None)
+
+    @patch('ncclient.transport.Session.send')
+    def test_rpc_sink_rpcerror(self, mock_send):
+        device_handler, session = self._mock_device_handler_and_session()
+        obj = RPC(session, device_handler, raise_mode=RaiseMode.ALL, timeout=0)
+        reply = xml2.replace('<rpc-reply ', '<rpc-reply xmlns="%s" ' % BASE_NS_1_0)
+        mock_send.side_effect = lambda req: obj.deliver_reply(reply)
+        self.assertRaises(RPCError, obj._request, new_ele("get-config"),
+                          sink=io.BytesIO())
+
     @patch('ncclient.transport.Session.send')
     def test_rpc_huge_text_node_exception(self, mock_send):
         device_handler, session = self._mock_device_handler_and_session()
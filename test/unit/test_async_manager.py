@@ -0,0 +1,116 @@
+import re
+import socket
+import sys
+import threading
+import unittest
+from mock import patch
+from ncclient.devices.default import DefaultDeviceHandler
+from ncclient.operations import RPCError, TimeoutExpiredError
+from ncclient.transport.ssh import SSHSession
+from ncclient.xml_ import BASE_NS_1_0
+from .fake_channel import FakeChannel
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from ncclient.async_manager import AsyncManager, connect
+
+
+hello = b"""<hello xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+    <capabilities>
+        <capability>urn:ietf:params:netconf:base:1.0</capability>
+        <capability>urn:ietf:params:netconf:capability:notification:1.0</capability>
+    </capabilities>
+    <session-id>7</session-id>
+</hello>]]>]]>"""
+
+reply = '<rpc-reply xmlns="%s" message-id="%%s">%%s</rpc-reply>]]>]]>' % BASE_NS_1_0
+
+notification = b"""<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
+    <eventTime>2019-01-01T00:00:00Z</eventTime>
+    <event/>
+</notification>]]>]]>"""
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio with async/await")
+class TestAsyncManager(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.client, self.server = socket.socketpair()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _connect(self, **kwds):
+        channel = FakeChannel(self.client)
+        def ssh_connect(session, *args, **kwds):
+            session._channel = channel
+            session._connected = True
+        self.server.sendall(hello)
+        with patch.object(SSHSession, 'connect', ssh_connect):
+            with patch('ncclient.manager.make_device_handler',
+                       return_value=DefaultDeviceHandler()):
+                return self.loop.run_until_complete(
+                    connect(host='h', hostkey_verify=False, **kwds))
+
+    def _serve(self, answers):
+        # answers the requests received, in order, with the given contents;
+        # the first request is the hello of the client
+        def serve():
+            received = b''
+            for content in [None] + answers:
+                while b']]>]]>' not in received:
+                    received += self.server.recv(4096)
+                request, received = received.split(b']]>]]>', 1)
+                if content is not None:
+                    id = re.search(b'message-id="([^"]*)"', request).group(1)
+                    self.server.sendall((reply % (id.decode(), content)).encode())
+        server = threading.Thread(target=serve)
+        server.daemon = True
+        server.start()
+        return server
+
+    def test_connect(self):
+        m = self._connect()
+        self.assertTrue(isinstance(m, AsyncManager))
+        self.assertEqual(m.session_id, '7')
+        self.assertTrue(':notification' in m.server_capabilities)
+        self.assertTrue(m.connected)
+
+    def test_operations(self):
+        m = self._connect(manager_params={'timeout': 5})
+        server = self._serve(['<data><a/></data>', '<ok/>', '<ok/>'])
+        get, lock, unlock = self.loop.run_until_complete(asyncio.gather(
+            m.get(), m.lock('running'), m.unlock('running')))
+        server.join()
+        self.assertEqual(get.data_ele[0].tag, '{%s}a' % BASE_NS_1_0)
+        self.assertTrue(lock.ok and unlock.ok)
+        self.assertEqual(m.rpcs_in_flight, 0)
+
+    def test_rpc_error(self):
+        m = self._connect()
+        error = ('<rpc-error><error-type>protocol</error-type>'
+                 '<error-severity>error</error-severity>'
+                 '<error-message>busy</error-message></rpc-error>')
+        server = self._serve([error])
+        self.assertRaises(RPCError, self.loop.run_until_complete, m.lock('running'))
+        server.join()
+
+    def test_timeout(self):
+        m = self._connect(manager_params={'timeout': 0.05})
+        self.assertRaises(TimeoutExpiredError, self.loop.run_until_complete, m.get())
+        self.assertEqual(m.rpcs_in_flight, 0)
+
+    def test_notifications(self):
+        m = self._connect()
+        run = self.loop.run_until_complete
+        self.assertEqual(run(m.take_notification(block=False)), None)
+        self.server.sendall(notification * 2)
+        first = run(m.take_notification(timeout=1))
+        second = run(m.notifications().__anext__())
+        self.assertTrue('<event/>' in first.notification_xml)
+        self.assertEqual(second.notification_xml, first.notification_xml)
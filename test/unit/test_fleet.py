@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+import unittest
+from mock import MagicMock
+from ncclient import fleet
+from ncclient.devices.junos import JunosDeviceHandler
+from ncclient.operations import RPCError
+from ncclient.xml_ import NCElement
+
+
+class FakeConnect(object):
+    "Hands out mock managers and keeps track of how many are in use."
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.busy = {}
+        self.most = {}
+        self.calls = []
+
+    def __call__(self, **kwds):
+        host = kwds['host']
+        if host == 'unreachable':
+            raise IOError('no route to host')
+        with self.lock:
+            self.calls.append(kwds)
+            for key in (None, host[0]):
+                self.busy[key] = self.busy.get(key, 0) + 1
+                self.most[key] = max(self.most.get(key, 0), self.busy[key])
+        m = MagicMock()
+        def get_config(source):
+            time.sleep(self.delay)
+            return '%s:%s' % (host, source)
+        def close_session():
+            with self.lock:
+                for key in (None, host[0]):
+                    self.busy[key] -= 1
+        m.get_config.side_effect = get_config
+        m.close_session.side_effect = close_session
+        return m
+
+
+def pid(m):
+    return os.getpid()
+
+
+class UnpicklableError(Exception):
+
+    def __init__(self):
+        Exception.__init__(self, 'locked')
+        self.lock = threading.Lock()
+
+
+def unpicklable(m):
+    raise UnpicklableError()
+
+
+def transformed(m):
+    # what a junos manager returns for a reply
+    reply = ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+             'message-id="1"><ok/></rpc-reply>')
+    return NCElement(reply, JunosDeviceHandler({'name': 'junos'}).transform_reply())
+
+
+def crash(m):
+    os._exit(3)
+
+
+class TestFleet(unittest.TestCase):
+
+    def test_fan_out(self):
+        connect = FakeConnect()
+        inventory = [{'host': 'a%d' % i, 'site': 'a'} for i in range(6)] + \
+                    [{'host': 'b%d' % i, 'site': 'b'} for i in range(6)]
+        results = list(fleet.fan_out(inventory, 'get_config', ('running',),
+                                     max_workers=4, max_per_site=2,
+                                     connect=connect))
+        self.assertEqual(sorted(r.result for r in results),
+                         sorted('%s:running' % d['host'] for d in inventory))
+        self.assertTrue(all(r.ok and r.connect_time is not None and
+                            r.run_time >= connect.delay for r in results))
+        self.assertEqual(set(r.site for r in results), set(['a', 'b']))
+        # the site is not passed on to connect
+        self.assertFalse(any('site' in kwds for kwds in connect.calls))
+        self.assertEqual(connect.most['a'], 2)
+        self.assertEqual(connect.most['b'], 2)
+        self.assertEqual(connect.most[None], 4)
+        self.assertEqual(connect.busy[None], 0)
+
+    def test_fan_out_bounds(self):
+        inventory = [{'host': 'a1', 'site': 'a'}]
+        # raised before anything is iterated
+        self.assertRaises(ValueError, fleet.fan_out, inventory, 'get_config',
+                          max_workers=0, connect=FakeConnect())
+        self.assertRaises(ValueError, fleet.fan_out, inventory, 'get_config',
+                          max_per_site=0, connect=FakeConnect())
+        self.assertRaises(ValueError, fleet.collect, inventory, 'get_config',
+                          max_per_site=0, connect=FakeConnect())
+
+    def test_fan_out_errors(self):
+        connect = FakeConnect()
+        def operation(m, source):
+            m.get_config(source)
+            raise RPCError(MagicMock())
+        inventory = [{'host': 'a1'}, {'host': 'unreachable'}]
+        results = dict((r.host, r) for r in fleet.fan_out(
+            inventory, operation, kwds={'source': 'running'}, connect=connect))
+        self.assertTrue(isinstance(results['a1'].error, RPCError))
+        self.assertTrue(results['a1'].run_time is None)
+        self.assertTrue(isinstance(results['unreachable'].error, IOError))
+        self.assertTrue(results['unreachable'].connect_time is None)
+        # closed despite the error
+        self.assertEqual(connect.busy['a'], 0)
+
+    def test_fan_out_reactor(self):
+        connect = FakeConnect(delay=0)
+        reactor = object()
+        inventory = [{'host': 'a1', 'manager_params': {'timeout': 5}},
+                     {'host': 'a2'}]
+        list(fleet.fan_out(inventory, 'get_config', ('running',),
+                           reactor=reactor, connect=connect))
+        params = sorted((kwds['host'], kwds['manager_params']) for kwds in connect.calls)
+        self.assertEqual(params, [('a1', {'timeout': 5, 'reactor': reactor}),
+                                  ('a2', {'reactor': reactor})])
+        # the inventory is left as it was
+        self.assertEqual(inventory[0]['manager_params'], {'timeout': 5})
+
+    def test_collect(self):
+        inventory = [{'host': 'a%d' % i} for i in range(8)]
+        results = list(fleet.collect(inventory, pid, processes=2,
+                                     connect=FakeConnect(delay=0)))
+        self.assertEqual(sorted(r.host for r in results),
+                         sorted(d['host'] for d in inventory))
+        self.assertTrue(all(r.ok for r in results))
+        pids = set(r.result for r in results)
+        self.assertEqual(len(pids), 2)
+        self.assertFalse(os.getpid() in pids)
+
+    def test_collect_transformed(self):
+        results = list(fleet.collect([{'host': 'a1'}], transformed, processes=1,
+                                     connect=FakeConnect(delay=0)))
+        self.assertTrue(results[0].ok)
+        self.assertTrue('<ok/>' in results[0].result)
+
+    def test_collect_errors(self):
+        connect = FakeConnect(delay=0)
+        results = list(fleet.collect([{'host': 'a1'}], unpicklable,
+                                     processes=1, connect=connect))
+        self.assertTrue(isinstance(results[0].error, fleet.WorkerError))
+        self.assertEqual(str(results[0].error), 'UnpicklableError: locked')
+        # the other devices of a dead worker fail
+        results = list(fleet.collect([{'host': 'a1'}, {'host': 'a2'}], crash,
+                                     processes=1, connect=connect))
+        self.assertEqual(sorted(r.host for r in results), ['a1', 'a2'])
+        self.assertTrue(all(isinstance(r.error, fleet.WorkerError) for r in results))
+        self.assertTrue('code 3' in str(results[0].error))
+
+    def test_shard(self):
+        inventory = [{'host': 'a%d' % i, 'site': 'a'} for i in range(4)] + \
+                    [{'host': 'b%d' % i, 'site': 'b'} for i in range(2)] + \
+                    [{'host': 'c%d' % i, 'site': 'c'} for i in range(2)]
+        hosts = lambda shards: [[d['host'] for d in shard] for shard in shards]
+        self.assertEqual(hosts(fleet._shard(inventory, 3, 'round_robin', 'site')),
+                         [['a0', 'a3', 'c0'],
+                          ['a1', 'b0', 'c1'], ['a2', 'b1']])
+        self.assertEqual(hosts(fleet._shard(inventory, 2, 'site', 'site')),
+                         [['a0', 'a1', 'a2', 'a3'], ['b0', 'b1', 'c0', 'c1']])
+        self.assertEqual(hosts(fleet._shard(inventory, 2, lambda d: int(d['host'][1]), 'site')),
+                         [['a0', 'a2', 'b0', 'c0'], ['a1', 'a3', 'b1', 'c1']])
+        self.assertRaises(ValueError, fleet._shard, inventory, 2, 'random', 'site')
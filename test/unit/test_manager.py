@@ -207,6 +207,27 @@ class TestManager(unittest.TestCase):
         mock_rpc.assert_called_once()
         self.assertFalse(mock_rpc.call_args[1]['huge_tree'])
 
+    @patch('ncclient.transport.SSHSession')
+    def test_ssh_read_params(self, mock_ssh):
+        m = MagicMock()
+        mock_ssh.return_value = m
+        conn = manager.connect(host='10.10.10.10',
+                               hostkey_verify=False,
+                               manager_params={'read_size': 65536,
+                                               'adaptive_read': True,
+                                               'read_budget': 4194304,
+                                               'dispatch_queue_size': 16,
+                                               'incremental_parse': True,
+                                               'spill_threshold': 1 << 20,
+                                               'max_message_size': 1 << 30})
+        self.assertEqual(m.read_size, 65536)
+        self.assertTrue(m.adaptive_read)
+        self.assertEqual(m.read_budget, 4194304)
+        m.start_dispatcher.assert_called_once_with(16)
+        self.assertTrue(m.incremental_parse)
+        self.assertEqual(m.spill_threshold, 1 << 20)
+        self.assertEqual(m.max_message_size, 1 << 30)
+
     def _mock_manager(self):
         conn = manager.connect(host='10.10.10.10',
                                     port=22,
@@ -1,6 +1,9 @@
 from ncclient import manager
 from ncclient.xml_ import *
+from ncclient.xml_ import _get_parser
 import unittest
+from mock import patch
+from ncclient.operations.rpc import RPCReply
 from nose.tools import assert_equal
 from nose.tools import assert_not_equal
 import os
@@ -76,6 +79,30 @@ class TestXML(unittest.TestCase):
             result.xpath("//package-information")[0].tag,
             "package-information")
 
+    def test_ncelement_reply_tree(self):
+        device_params = {'name': 'junos'}
+        device_handler = manager.make_device_handler(device_params)
+        transform_reply = device_handler.transform_reply()
+        reply = RPCReply(self.reply)
+        reply.parse()
+        with patch('ncclient.xml_.to_ele') as mock_to_ele:
+            result = NCElement(reply, transform_reply)
+            self.assertFalse(mock_to_ele.called)
+        self.assertEqual(result.data_xml,
+                         NCElement(self.reply, transform_reply).data_xml)
+        # the reply's own tree is left as it was
+        self.assertEqual(reply._root.tag, "rpc-reply")
+        self.assertTrue(reply._root.text.isspace())
+
+    def test_ncelement_cached(self):
+        device_params = {'name': 'junos'}
+        device_handler = manager.make_device_handler(device_params)
+        transform_reply = device_handler.transform_reply()
+        result = NCElement(self.reply, transform_reply)
+        self.assertTrue(result.tostring is result.tostring)
+        self.assertTrue(result.data_xml is result.data_xml)
+        self.assertNotEqual(result.tostring, result.data_xml.encode('UTF-8'))
+
     def test_ncelement_find(self):
         device_params = {'name': 'junos'}
         device_handler = manager.make_device_handler(device_params)
@@ -115,6 +142,23 @@ class TestXML(unittest.TestCase):
         ele = to_ele(self.reply)
         self.assertEqual(ele.tag, "rpc-reply")
 
+    def test_bytes(self):
+        raw = self.reply.encode('UTF-8')
+        self.assertEqual(to_ele(raw).tag, "rpc-reply")
+        self.assertEqual(parse_root(raw), parse_root(self.reply))
+        self.assertEqual(to_text(raw), self.reply)
+        self.assertEqual(to_text(self.reply), self.reply)
+
+    def test_parser_per_thread(self):
+        import threading
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(_get_parser()))
+        thread.start()
+        thread.join()
+        self.assertTrue(_get_parser() is _get_parser())
+        self.assertFalse(_get_parser() is parsers[0])
+        self.assertFalse(_get_parser() is _get_parser(huge_tree=True))
+
     def test_parse_root(self):
         device_params = {'name': 'junos'}
         device_handler = manager.make_device_handler(device_params)
@@ -176,3 +220,114 @@ class TestXML(unittest.TestCase):
         result_xml = result.data_xml
         self.assertRaises(XMLError,
             validated_element, result_xml, tags=["rpc"])
+
+
+class TestParseRoot(unittest.TestCase):
+
+    docs = [
+        '<rpc-reply message-id="101"><ok/></rpc-reply>',
+        '<?xml version="1.0" encoding="UTF-8"?>\n<!-- hi -->\n'
+        '<nc:rpc-reply xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" '
+        'xmlns:junos="http://xml.juniper.net/junos/17.3R1/junos" '
+        "nc:message-id='urn:uuid:1' junos:style=\"normal\" xml:lang='en'>"
+        '<nc:ok/></nc:rpc-reply>',
+        '<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"\n'
+        '    message-id="102" a = "x>y"><data/></rpc-reply>',
+        '<notification xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0"/>',
+    ]
+
+    def _iterparse(self, raw):
+        for event, element in etree.iterparse(BytesIO(raw.encode('UTF-8')),
+                                              events=('start',)):
+            return element.tag, dict(element.attrib)
+
+    def test_same_as_parser(self):
+        for doc in self.docs:
+            self.assertEqual(sniff_root(doc.encode('UTF-8')), self._iterparse(doc))
+            self.assertEqual(parse_root(doc), self._iterparse(doc))
+
+    def test_fallback(self):
+        # entity references and undeclared prefixes are left to the parser
+        doc = '<rpc-reply message-id="a&amp;b"/>'
+        self.assertEqual(sniff_root(doc.encode('UTF-8')), None)
+        self.assertEqual(parse_root(doc), ('rpc-reply', {'message-id': 'a&b'}))
+        self.assertEqual(sniff_root(b'<a:b/>'), None)
+        # root start tag beyond what is sniffed
+        doc = '<!--%s--><rpc-reply message-id="1"/>' % ('x' * SNIFF_LEN)
+        self.assertEqual(parse_root(doc), ('rpc-reply', {'message-id': '1'}))
+
+    def test_incomplete(self):
+        self.assertEqual(sniff_root(b'<rpc-reply message-id="1'), None)
+        self.assertEqual(sniff_root(b'<rpc-reply a="x>'), None)
+
+
+class TestSlicedXML(unittest.TestCase):
+
+    reply = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<nc:rpc-reply xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" '
+             'xmlns:x="urn:x" message-id="1">\n'
+             '<nc:data xmlns="urn:y" a="&gt;"><b x:c="1">t</b></nc:data>\n'
+             '</nc:rpc-reply>\n')
+
+    def test_sliced(self):
+        ele = to_ele(self.reply)[0]
+        self.assertEqual(sliced_xml(self.reply, ele), to_xml(ele))
+        self.assertEqual(sliced_xml(self.reply.encode('UTF-8'), ele),
+                         to_xml(ele))
+
+    def test_empty(self):
+        reply = '<rpc-reply xmlns="urn:x"><data xmlns:y="urn:y" /></rpc-reply>'
+        ele = to_ele(reply)[0]
+        self.assertEqual(sliced_xml(reply, ele), to_xml(ele))
+
+    def test_not_sliced(self):
+        for reply in ['<r><data/><data/></r>',
+                      '<r><data/>x</r>',
+                      '<r><data/></r><!-- c -->',
+                      '<r><!-- c --><data/></r>']:
+            self.assertEqual(sliced_xml(reply, to_ele(reply)[0]), None)
+        reply = to_ele(self.reply)
+        self.assertEqual(sliced_xml(self.reply, reply), None)
+        self.assertEqual(sliced_xml(self.reply, reply[0][0]), None)
+        reply = b'<?xml version="1.0" encoding="ISO-8859-1"?><r><d/></r>'
+        self.assertEqual(sliced_xml(reply, etree.XML(reply)[0]), None)
+
+
+class TestSplitChild(unittest.TestCase):
+
+    reply = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<nc:rpc-reply xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" '
+             'message-id="1">\n<nc:ok/>\n'
+             '<nc:data a="1"><b>t</b><data/></nc:data >\n'
+             '<nc:x/></nc:rpc-reply>\n')
+
+    def test_split(self):
+        for reply, content in ((self.reply, '<b>t</b><data/>'),
+                               (self.reply.encode('UTF-8'), b'<b>t</b><data/>')):
+            skeleton, start, end = split_child(reply, qualify('data'))
+            self.assertEqual(reply[start:end], content)
+            self.assertEqual(skeleton.tag, qualify('rpc-reply'))
+            self.assertEqual([child.tag for child in skeleton],
+                             [qualify('ok'), qualify('data'), qualify('x')])
+            self.assertEqual(skeleton[1].attrib, {'a': '1'})
+            self.assertEqual(len(skeleton[1]), 0)
+
+    def test_empty(self):
+        reply = '<rpc-reply><data /></rpc-reply>'
+        skeleton, start, end = split_child(reply, 'data')
+        self.assertEqual(start, end)
+        self.assertEqual(skeleton[0].tag, 'data')
+
+    def test_not_split(self):
+        for reply in ['<r><rpc-error><data>x</data></rpc-error></r>',
+                      '<r><!-- <data> --><data>x</data></r>',
+                      '<r><data>x</data></r><!-- c -->',
+                      '<r><y:data xmlns:y="urn:y">x</y:data></r>',
+                      '<r><ok/></r>',
+                      # the end tag found is in a comment after the child
+                      '<r><data><a>1</a></data><!-- </data> --></r>',
+                      # a foreign data element found before the child
+                      '<r><y:data xmlns:y="urn:y"/><data>z</data></r>']:
+            self.assertEqual(split_child(reply, 'data'), None)
+        reply = '<r><x>%s</x><data>x</data></r>' % (' ' * 100)
+        self.assertEqual(split_child(reply, 'data', scan_len=50), None)
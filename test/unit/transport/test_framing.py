@@ -0,0 +1,279 @@
+import gzip
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+from lxml import etree
+from ncclient.transport.framing import ChunkedDecoder, EOMDecoder
+from ncclient.transport.framing import MessageBuilder, ParsingMessageBuilder
+from ncclient.transport.framing import RoutingMessageBuilder, SinkMessageBuilder
+from ncclient.transport.errors import NetconfFramingError
+
+
+msg1 = b'<rpc-reply message-id="101"><ok/></rpc-reply>'
+msg2 = b'<rpc-reply message-id="102"><data>' + b'x' * 5000 + b'</data></rpc-reply>'
+
+
+def chunked(msg, size):
+    out = b''
+    for i in range(0, len(msg), size):
+        chunk = msg[i:i + size]
+        out += b'\n#' + str(len(chunk)).encode() + b'\n' + chunk
+    return out + b'\n##\n'
+
+
+class TestEOMDecoder(unittest.TestCase):
+
+    def test_single_message(self):
+        decoder = EOMDecoder()
+        decoder.feed(b'\n' + msg1 + b'\n]]>]]>')
+        self.assertEqual(list(decoder.messages()), [msg1])
+        self.assertEqual(decoder.pending, 0)
+
+    def test_many_messages_in_one_read(self):
+        decoder = EOMDecoder()
+        decoder.feed((msg1 + b']]>]]>') * 2000 + msg2[:10])
+        messages = list(decoder.messages())
+        self.assertEqual(len(messages), 2000)
+        self.assertTrue(all(m == msg1 for m in messages))
+        self.assertEqual(decoder.pending, 10)
+
+    def test_split_everywhere(self):
+        data = msg1 + b']]>]]>\n' + msg2 + b'\n]]>]]>'
+        for split in range(1, 40):
+            decoder = EOMDecoder()
+            messages = []
+            for i in range(0, len(data), split):
+                decoder.feed(data[i:i + split])
+                messages.extend(decoder.messages())
+            self.assertEqual(messages, [msg1, msg2])
+
+    def test_body_is_handed_on(self):
+        decoder = EOMDecoder()
+        decoder.feed(msg2 + b']]>]]')
+        self.assertEqual(list(decoder.messages()), [])
+        # only what could be the start of the delimiter is left behind
+        self.assertEqual(decoder.builder.size, len(msg2))
+        self.assertEqual(bytes(decoder._buf), b']]>]]')
+        decoder.feed(b'>')
+        self.assertEqual(list(decoder.messages()), [msg2])
+
+    def test_trailing_whitespace_held_back(self):
+        decoder = EOMDecoder()
+        decoder.feed(b'\n  ' + msg1 + b' \n')
+        self.assertEqual(list(decoder.messages()), [])
+        decoder.feed(b'\n]]>]]>')
+        self.assertEqual(list(decoder.messages()), [msg1])
+
+
+class TestChunkedDecoder(unittest.TestCase):
+
+    def test_single_message(self):
+        decoder = ChunkedDecoder()
+        decoder.feed(chunked(msg1, 1000))
+        self.assertEqual(list(decoder.messages()), [msg1])
+        self.assertEqual(decoder.pending, 0)
+
+    def test_many_messages_in_one_read(self):
+        decoder = ChunkedDecoder()
+        # enough messages to have overflowed the recursion limit of the
+        # old recursive parser
+        decoder.feed(chunked(msg1, 7) * 2000)
+        messages = list(decoder.messages())
+        self.assertEqual(len(messages), 2000)
+        self.assertTrue(all(m == msg1 for m in messages))
+
+    def test_split_everywhere(self):
+        data = chunked(msg1, 10) + chunked(msg2, 1024)
+        for split in range(1, 40):
+            decoder = ChunkedDecoder()
+            messages = []
+            for i in range(0, len(data), split):
+                decoder.feed(data[i:i + split])
+                messages.extend(decoder.messages())
+            self.assertEqual(messages, [msg1, msg2])
+
+    def test_chunks_copied_once(self):
+        written = []
+
+        class Recorder(MessageBuilder):
+            def write(self, data):
+                written.append(type(data))
+                MessageBuilder.write(self, data)
+
+        decoder = ChunkedDecoder(Recorder())
+        decoder.feed(chunked(msg2, 1000))
+        message, = decoder.messages()
+        # views of the input, appended to the message as it is returned
+        self.assertEqual(set(written), set([memoryview]))
+        self.assertTrue(isinstance(message, bytearray))
+        self.assertEqual(message, msg2)
+
+    def test_partial_chunk_is_consumed(self):
+        decoder = ChunkedDecoder()
+        data = chunked(msg2, 10000)
+        decoder.feed(data[:3000])
+        self.assertEqual(list(decoder.messages()), [])
+        # the body received so far has been taken out of the input buffer
+        self.assertEqual(len(decoder._buf), 0)
+        self.assertEqual(decoder.pending, 3000 - len(b'\n#%d\n' % len(msg2)))
+        decoder.feed(data[3000:])
+        self.assertEqual(list(decoder.messages()), [msg2])
+
+    def test_bad_delimiter(self):
+        decoder = ChunkedDecoder()
+        decoder.feed(b'<rpc-reply><ok/></rpc-reply>')
+        self.assertRaises(NetconfFramingError, list, decoder.messages())
+
+    def test_zero_chunk_size(self):
+        decoder = ChunkedDecoder()
+        decoder.feed(b'\n#0\n\n##\n')
+        self.assertRaises(NetconfFramingError, list, decoder.messages())
+
+    def test_reset(self):
+        decoder = ChunkedDecoder()
+        decoder.feed(chunked(msg2, 10000)[:100])
+        list(decoder.messages())
+        decoder.reset()
+        self.assertEqual(decoder.pending, 0)
+        decoder.feed(chunked(msg1, 100))
+        self.assertEqual(list(decoder.messages()), [msg1])
+
+
+class TestParsingMessageBuilder(unittest.TestCase):
+
+    def test_parsed_while_received(self):
+        for decoder in (EOMDecoder(ParsingMessageBuilder()),
+                        ChunkedDecoder(ParsingMessageBuilder())):
+            if isinstance(decoder, EOMDecoder):
+                data = msg1 + b']]>]]>' + msg2 + b']]>]]>'
+            else:
+                data = chunked(msg1, 10) + chunked(msg2, 1024)
+            elements = []
+            for i in range(0, len(data), 100):
+                decoder.feed(data[i:i + 100])
+                for message in decoder.messages():
+                    elements.append((message, decoder.builder.element))
+            self.assertEqual([m for m, e in elements], [msg1, msg2])
+            self.assertEqual(elements[0][1].get('message-id'), '101')
+            self.assertEqual(len(elements[1][1].find('data').text), 5000)
+
+    def test_not_well_formed(self):
+        decoder = EOMDecoder(ParsingMessageBuilder())
+        decoder.feed(b'<rpc-reply><ok></rpc-reply>]]>]]>' + msg1 + b']]>]]>')
+        messages = decoder.messages()
+        self.assertEqual(next(messages), b'<rpc-reply><ok></rpc-reply>')
+        self.assertEqual(decoder.builder.element, None)
+        self.assertEqual(next(messages), msg1)
+        self.assertEqual(decoder.builder.element.tag, 'rpc-reply')
+
+
+class TestMessageBuilder(unittest.TestCase):
+
+    def test_spill(self):
+        decoder = ChunkedDecoder(MessageBuilder(spill_threshold=1000))
+        decoder.feed(chunked(msg1, 10) + chunked(msg2, 100) + chunked(msg1, 10))
+        messages = list(decoder.messages())
+        self.assertEqual(messages[0], msg1)
+        self.assertTrue(isinstance(messages[1], mmap.mmap))
+        self.assertEqual(messages[1][:], msg2)
+        self.assertEqual(messages[2], msg1)
+
+    def test_spill_parsed(self):
+        decoder = EOMDecoder(ParsingMessageBuilder(spill_threshold=1000))
+        decoder.feed(msg2 + b']]>]]>')
+        message = list(decoder.messages())[0]
+        self.assertTrue(isinstance(message, mmap.mmap))
+        self.assertEqual(decoder.builder.element.get('message-id'), '102')
+
+    def test_max_size(self):
+        decoder = ChunkedDecoder(ParsingMessageBuilder(max_size=1000))
+        decoder.feed(chunked(msg2, 100) + chunked(msg1, 10))
+        messages = list(decoder.messages())
+        too_big = etree.fromstring(messages[0])
+        self.assertEqual(too_big.get('message-id'), '102')
+        self.assertEqual(
+            too_big.findtext('{urn:ietf:params:xml:ns:netconf:base:1.0}rpc-error/'
+                             '{urn:ietf:params:xml:ns:netconf:base:1.0}error-tag'),
+            'too-big')
+        self.assertEqual(messages[1], msg1)
+
+
+reply_errors = (b'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+                b'message-id="103"><data>' + b'y' * 5000 + b'</data>'
+                b'<results><rpc-error><error-message>bad</error-message>'
+                b'</rpc-error></results></rpc-reply>')
+
+
+class TestRoutingMessageBuilder(unittest.TestCase):
+
+    def test_routed_by_message_id(self):
+        routes = {}
+        decoder = ChunkedDecoder(RoutingMessageBuilder(MessageBuilder(), routes))
+        other = MessageBuilder()
+        routes['102'] = other
+        other.finish = lambda: b'routed'
+        data = chunked(msg1, 7) + chunked(msg2, 5) + chunked(msg1, 100)
+        for i in range(0, len(data), 3):
+            decoder.feed(data[i:i + 3])
+            for message in decoder.messages():
+                self.assertNotEqual(message, msg2)
+        self.assertEqual(routes, {})
+        self.assertEqual(other.size, len(msg2))
+
+    def test_not_held_back_without_routes(self):
+        builder = RoutingMessageBuilder(MessageBuilder(), {})
+        builder.write(b'<rpc-re')
+        self.assertEqual(builder.default.size, 7)
+
+
+class TestSinkMessageBuilder(unittest.TestCase):
+
+    def _write(self, builder, data):
+        for i in range(0, len(data), 1000):
+            builder.write(data[i:i + 1000])
+        return etree.fromstring(builder.finish())
+
+    def test_file_object(self):
+        out = io.BytesIO()
+        builder = SinkMessageBuilder(out)
+        summary = self._write(builder, reply_errors)
+        self.assertEqual(out.getvalue(), reply_errors)
+        self.assertEqual(builder.written, len(reply_errors))
+        self.assertEqual(summary.get('message-id'), '103')
+        # only the error is kept
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0].tag,
+                         '{urn:ietf:params:xml:ns:netconf:base:1.0}rpc-error')
+        self.assertEqual(summary[0][0].text, 'bad')
+        self.assertEqual(builder.error, None)
+
+    def test_callable_compressed(self):
+        parts = []
+        builder = SinkMessageBuilder(parts.append, compress=True)
+        self._write(builder, msg2)
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(b''.join(parts))).read(), msg2)
+
+    def test_path_compressed(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'reply.xml.gz')
+            self._write(SinkMessageBuilder(path, compress=True), msg2)
+            with gzip.open(path, 'rb') as f:
+                self.assertEqual(f.read(), msg2)
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_not_well_formed(self):
+        out = io.BytesIO()
+        builder = SinkMessageBuilder(out, message_id='104')
+        summary = self._write(builder, b'<rpc-reply message-id="104"><data></rpc-reply>')
+        self.assertTrue(isinstance(builder.error, etree.XMLSyntaxError))
+        self.assertEqual(summary.get('message-id'), '104')
+        # nothing to take the root from
+        builder = SinkMessageBuilder(out, message_id='105')
+        summary = self._write(builder, b'junk')
+        self.assertTrue(isinstance(builder.error, etree.XMLSyntaxError))
+        self.assertEqual(summary.get('message-id'), '105')
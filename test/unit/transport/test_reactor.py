@@ -0,0 +1,116 @@
+import socket
+import threading
+import time
+import unittest
+from mock import MagicMock, patch
+from ncclient.devices.default import DefaultDeviceHandler
+from ncclient.transport import SessionCloseError, SessionListener
+from ncclient.transport.reactor import Reactor, ReactorThread
+from ncclient.transport.ssh import SSHSession
+from ncclient.transport.errors import SSHError, TransportError
+from ..fake_channel import FakeChannel
+
+
+class Recorder(SessionListener):
+
+    def __init__(self):
+        self.messages = []
+        self.errors = []
+        self.event = threading.Event()
+
+    def callback(self, root, raw):
+        self.messages.append(raw)
+        self.event.set()
+
+    def errback(self, err):
+        self.errors.append(err)
+        self.event.set()
+
+
+class TestReactor(unittest.TestCase):
+
+    def setUp(self):
+        self.reactor = Reactor(threads=2)
+        self.servers = []
+
+    def tearDown(self):
+        self.reactor.close()
+        for sock in self.servers:
+            sock.close()
+
+    def _session(self):
+        client, server = socket.socketpair()
+        server.settimeout(5)
+        self.servers.append(server)
+        session = SSHSession(DefaultDeviceHandler())
+        session.reactor = self.reactor
+        session._channel = FakeChannel(client)
+        session._transport = MagicMock()
+        session._connected = True
+        listener = Recorder()
+        session.add_listener(listener)
+        session._start_io()
+        return session, server, listener
+
+    def test_send_and_receive(self):
+        session, server, listener = self._session()
+        self.assertFalse(session.is_alive())
+        session.send('<rpc message-id="1"/>')
+        self.assertEqual(server.recv(4096), b'<rpc message-id="1"/>]]>]]>')
+        server.sendall(b'<rpc-reply message-id="1"/>]]>]]>')
+        self.assertTrue(listener.event.wait(5))
+        self.assertEqual(listener.messages, [b'<rpc-reply message-id="1"/>'])
+        session.close()
+        self.assertEqual(self.reactor.sessions, 0)
+
+    def test_threads_shared(self):
+        sessions = [self._session() for i in range(4)]
+        self.assertEqual(self.reactor.sessions, 4)
+        threads = set(session._io for session, _, _ in sessions)
+        self.assertEqual(len(threads), 2)
+        for i, (session, server, listener) in enumerate(sessions):
+            server.sendall(b'<rpc-reply message-id="%d"/>]]>]]>' % i)
+        for i, (session, server, listener) in enumerate(sessions):
+            self.assertTrue(listener.event.wait(5))
+            self.assertEqual(listener.messages, [b'<rpc-reply message-id="%d"/>' % i])
+            session.close()
+
+    def test_closed_by_peer(self):
+        session, server, listener = self._session()
+        server.close()
+        self.assertTrue(listener.event.wait(5))
+        self.assertTrue(isinstance(listener.errors[0], SessionCloseError))
+        # closed right after the error is dispatched
+        for i in range(500):
+            if not session.connected:
+                break
+            time.sleep(0.01)
+        self.assertFalse(session.connected)
+        self.assertEqual(self.reactor.sessions, 0)
+
+    def test_call_failure(self):
+        self.reactor.close()
+        self.reactor = Reactor(threads=1)
+        other, server, _ = self._session()
+        other.send('<rpc message-id="1"/>')
+        self.assertEqual(server.recv(4096), b'<rpc message-id="1"/>]]>]]>')
+        with patch.object(ReactorThread, '_add', side_effect=ValueError('bad fd')):
+            session, _, listener = self._session()
+            self.assertTrue(listener.event.wait(5))
+        self.assertTrue(isinstance(listener.errors[0], ValueError))
+        # the thread still serves the other session
+        other.send('<rpc message-id="2"/>')
+        self.assertEqual(server.recv(4096), b'<rpc message-id="2"/>]]>]]>')
+
+    def test_register_closed(self):
+        session, _, _ = self._session()
+        self.reactor.close()
+        with self.assertRaises(TransportError) as cm:
+            self._session()
+        self.assertEqual(str(cm.exception), "reactor is closed")
+
+    def test_reactor_set_once_connected(self):
+        session = SSHSession(DefaultDeviceHandler())
+        session._connected = True
+        with self.assertRaises(SSHError):
+            session.reactor = self.reactor
@@ -7,6 +7,7 @@ try:
 except ImportError:
     from queue import Queue, Empty
 import logging
+import threading
 
 
 
@@ -85,6 +86,43 @@ class TestSession(unittest.TestCase):
         obj._dispatch_error("Error")
         mock_handler.assert_called_once_with("Error")
 
+    def test_dispatcher_thread(self):
+        obj = Session([':candidate'])
+        obj._device_handler = JunosDeviceHandler({'name': 'junos'})
+        self.assertEqual(obj.dispatch_queue_depth, None)
+        received = []
+        done = threading.Event()
+        release = threading.Event()
+
+        class Recorder(SessionListener):
+            def callback(self, root, raw):
+                release.wait(5)
+                received.append((threading.current_thread(), raw))
+
+            def errback(self, err):
+                received.append((threading.current_thread(), err))
+                done.set()
+
+        obj.add_listener(Recorder())
+        obj.start_dispatcher(queue_size=4)
+        obj._dispatch_message(rpc_reply)
+        obj._dispatch_message(hello_rpc_reply)
+        obj._dispatch_error("Error")
+        # the first message is being delivered, the others wait in the queue
+        self.assertTrue(obj.dispatch_queue_depth >= 2)
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual([r[1] for r in received],
+                         [rpc_reply, hello_rpc_reply, "Error"])
+        self.assertTrue(all(r[0] is not threading.current_thread()
+                            for r in received))
+        self.assertEqual(obj.dispatch_queue_depth, 0)
+        dispatcher = obj._dispatcher
+        obj._stop_dispatcher()
+        dispatcher.join(5)
+        self.assertFalse(dispatcher.is_alive())
+        self.assertEqual(obj.dispatch_queue_depth, None)
+
     @patch('ncclient.logging_.SessionLoggerAdapter.info')
     @patch('ncclient.transport.session.Thread.start')
     @patch('ncclient.transport.session.Event')
@@ -135,6 +173,25 @@ class TestSession(unittest.TestCase):
         ret = obj.get_listener_instance(HelloHandler)
         self.assertEqual(ret, listener)
 
+    def test_get_listener_instance_cached(self):
+        cap = [':candidate']
+        obj = Session(cap)
+        listener = HelloHandler(None, None)
+        obj.add_listener(listener)
+        self.assertEqual(obj.get_listener_instance(HelloHandler), listener)
+        with patch.object(obj, '_lock') as mock_lock:
+            self.assertEqual(obj.get_listener_instance(HelloHandler), listener)
+            self.assertFalse(mock_lock.__enter__.called)
+        obj.remove_listener(listener)
+        self.assertEqual(obj.get_listener_instance(HelloHandler), None)
+
+    def test_next_message_id(self):
+        cap = [':candidate']
+        obj = Session(cap)
+        self.assertEqual([obj.next_message_id() for i in range(3)],
+                         ['1', '2', '3'])
+        self.assertEqual(Session(cap).next_message_id(), '1')
+
     def test_send_connected(self):
         cap = [':candidate']
         obj = Session(cap)
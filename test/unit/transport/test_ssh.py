@@ -1,10 +1,19 @@
+import io
+import os
+import tempfile
 import unittest
 from mock import MagicMock, patch
-from ncclient.transport.ssh import SSHSession
+from ncclient.transport.ssh import SSHSession, _private_key
+from ncclient.transport.framing import SinkMessageBuilder
+from ncclient.transport.session import NetconfBase, SessionListener
 from ncclient.transport import AuthenticationError, SessionCloseError
 import paramiko
 from ncclient.devices.junos import JunosDeviceHandler
+import socket
 import sys
+import threading
+import time
+from ..fake_channel import FakeChannel
 
 try:
     import selectors
@@ -34,6 +43,10 @@ reply_ok = """<rpc-reply>
 # A buffer of data with two complete messages and an incomplete message
 rpc_reply = reply_data + "\n]]>]]>\n" + reply_ok + "\n]]>]]>\n" + reply_ok
 
+# messages are dispatched as received, in bytes
+reply_data_b = reply_data.encode("utf-8")
+reply_ok_b = reply_ok.encode("utf-8")
+
 reply_ok_chunk = "\n#%d\n%s\n##\n" % (len(reply_ok), reply_ok)
 
 # einarnn: this test message had to be reduced in size as the improved
@@ -71,33 +84,85 @@ rpc_reply_part_2 = """>
 
 class TestSSH(unittest.TestCase):
 
-    def _test_parsemethod(self, mock_dispatch, parsemethod, reply, ok_chunk,
-                          expected_messages):
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse(self, mock_dispatch):
         device_handler = JunosDeviceHandler({'name': 'junos'})
         obj = SSHSession(device_handler)
-        if sys.version >= "3.0":
-            obj._buffer.write(bytes(reply, "utf-8"))
-            remainder = bytes(ok_chunk, "utf-8")
-        else:
-            obj._buffer.write(reply)
-            remainder = ok_chunk
-        parsemethod(obj)
-
-        for i in range(0, len(expected_messages)):
-            call = mock_dispatch.call_args_list[i][0][0]
-            self.assertEqual(call, expected_messages[i])
+        obj._buffer.write(rpc_reply.encode("utf-8"))
+        obj._parse()
+        self.assertEqual(
+            [c[0][0] for c in mock_dispatch.call_args_list],
+            [reply_data_b, reply_ok_b])
+        # the incomplete message is held by the decoder until the rest arrives
+        self.assertEqual(obj._buffer.getvalue(), b"")
+        self.assertEqual(obj._decoder10.pending, len(reply_ok))
+        obj._buffer.write(b"\n]]>]]>")
+        obj._parse()
+        self.assertEqual(mock_dispatch.call_args_list[2][0][0], reply_ok_b)
 
-        self.assertEqual(obj._buffer.getvalue(), remainder)
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse11_incremental(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj.incremental_parse = True
+        self.assertTrue(obj.incremental_parse)
+        data = rpc_reply11.encode("utf-8") + b">\n##\n"
+        for i in range(0, len(data), 10):
+            obj._buffer.write(data[i:i + 10])
+            obj._parse11()
+        calls = mock_dispatch.call_args_list
+        self.assertEqual([c[0][0] for c in calls],
+                         [reply_data_b, reply_ok_b, reply_ok_b])
+        self.assertEqual(
+            calls[0][0][1].find("software-information/host-name").text, "R1")
+        # reply_ok is not well-formed and is left to the usual parsing path
+        self.assertEqual([c[0][1] for c in calls[1:]], [None, None])
 
     @patch('ncclient.transport.ssh.Session._dispatch_message')
-    def test_parse(self, mock_dispatch):
-        self._test_parsemethod(mock_dispatch, SSHSession._parse, rpc_reply,
-                               "\n" + reply_ok, [reply_data])
+    def test_parse11_redirected(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        out = io.BytesIO()
+        obj.redirect_message("urn:x", SinkMessageBuilder(out))
+        reply = reply_data.replace('attrib1 = "test"', 'message-id="urn:x"')
+        data = ("\n#%d\n%s\n##\n" % (len(reply), reply)).encode("utf-8")
+        data += rpc_reply11.encode("utf-8")
+        for i in range(0, len(data), 10):
+            obj._buffer.write(data[i:i + 10])
+            obj._parse11()
+        self.assertEqual(out.getvalue(), reply.encode("utf-8"))
+        calls = mock_dispatch.call_args_list
+        self.assertEqual([c[0][0] for c in calls[1:]], [reply_data_b, reply_ok_b])
+        self.assertEqual(
+            calls[0][0][0],
+            b'<rpc-reply xmlns:junos="http://xml.juniper.net/junos/12.1X46/junos"'
+            b' message-id="urn:x"/>')
 
     @patch('ncclient.transport.ssh.Session._dispatch_message')
     def test_parse11(self, mock_dispatch):
-        self._test_parsemethod(mock_dispatch, SSHSession._parse11, rpc_reply11,
-                               reply_ok_partial_chunk, [reply_data, reply_ok])
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj._buffer.write(rpc_reply11.encode("utf-8"))
+        obj._parse11()
+        self.assertEqual(
+            [c[0][0] for c in mock_dispatch.call_args_list],
+            [reply_data_b, reply_ok_b])
+        # the partial chunk is held by the decoder until the rest arrives
+        self.assertEqual(obj._buffer.getvalue(), b"")
+        obj._buffer.write(b">\n##\n")
+        obj._parse11()
+        self.assertEqual(mock_dispatch.call_args_list[2][0][0], reply_ok_b)
+
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_parse11_byte_by_byte(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        for i in range(len(rpc_reply11)):
+            obj._buffer.write(rpc_reply11[i].encode("utf-8"))
+            obj._parse11()
+        self.assertEqual(
+            [c[0][0] for c in mock_dispatch.call_args_list],
+            [reply_data_b, reply_ok_b])
 
     @patch('ncclient.transport.ssh.Session._dispatch_message')
     def test_parse_incomplete_delimiter(self, mock_dispatch):
@@ -237,6 +302,105 @@ class TestSSH(unittest.TestCase):
         mock_close.assert_called_once_with()
         self.assertFalse(obj._connected)
 
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_read_batch_drains_channel(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        data = rpc_reply.encode("utf-8")
+        reads = [data[i:i + 100] for i in range(0, len(data), 100)]
+        chan = MagicMock()
+        chan.recv.side_effect = reads
+        chan.recv_ready.side_effect = [True] * (len(reads) - 1) + [False]
+        self.assertTrue(obj._read_batch(chan))
+        self.assertEqual(chan.recv.call_count, len(reads))
+        self.assertEqual(mock_dispatch.call_count, 2)
+        stats = obj.receive_stats
+        self.assertEqual(stats['reads'], len(reads))
+        self.assertEqual(stats['parse_passes'], 1)
+        self.assertEqual(stats['messages'], 2)
+        self.assertEqual(stats['bytes'], len(data))
+        # the reads that brought any of the second message
+        start = data.index(b"]]>]]>") + 6
+        end = data.index(b"]]>]]>", start) + 6
+        self.assertEqual(stats['last_message'],
+                         {'reads': (end - 1) // 100 - start // 100 + 1, 'parse_passes': 1})
+        # and those of the third, which is still incomplete
+        self.assertEqual(obj._msg_reads, len(reads) - end // 100)
+        self.assertEqual(obj._msg_parses, 1)
+
+    def test_read_batch_budget(self):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj.read_size = 10
+        obj.read_budget = 25
+        chan = MagicMock()
+        chan.recv.return_value = b"x" * 10
+        chan.recv_ready.return_value = True
+        obj._read_batch(chan)
+        self.assertEqual(chan.recv.call_count, 3)
+        self.assertEqual(obj.receive_stats['parse_passes'], 1)
+
+    def test_read_batch_eof(self):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        chan = MagicMock()
+        chan.recv.return_value = b""
+        self.assertFalse(obj._read_batch(chan))
+
+    @patch('ncclient.transport.ssh.Session._dispatch_message')
+    def test_read_batch_adaptive(self, mock_dispatch):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj.read_size = 16
+        obj.adaptive_read = True
+        chan = MagicMock()
+        chan.recv.side_effect = lambda n: b"x" * n
+        chan.recv_ready.side_effect = [True, True, False]
+        obj._buffer.write(b"<rpc-reply>")
+        obj._read_batch(chan)
+        self.assertEqual([c[0][0] for c in chan.recv.call_args_list],
+                         [16, 32, 64])
+        self.assertEqual(obj._cur_read_size, 128)
+        # back to the configured size once the message is complete
+        chan.recv.side_effect = [b"</rpc-reply>]]>]]>"]
+        chan.recv_ready.side_effect = [False]
+        obj._read_batch(chan)
+        self.assertEqual(obj._cur_read_size, 16)
+        self.assertEqual(obj.receive_stats['last_message'],
+                         {'reads': 4, 'parse_passes': 2})
+        self.assertRaises(ValueError, setattr, obj, 'read_size', 0)
+
+    def test_take_outbound_coalesces(self):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        obj._q.put("<rpc/>")
+        obj._q.put(u"<rpc>\u00e9</rpc>")
+        self.assertEqual(obj._take_outbound(),
+                         b"<rpc/>]]>]]><rpc>\xc3\xa9</rpc>]]>]]>")
+        obj._base = NetconfBase.BASE_11
+        obj._q.put("<rpc/>")
+        obj._q.put(u"<rpc>\u00e9</rpc>")
+        # chunk sizes count bytes, not characters
+        self.assertEqual(obj._take_outbound(),
+                         b"\n#6\n<rpc/>\n##\n\n#13\n<rpc>\xc3\xa9</rpc>\n##\n")
+        self.assertTrue(obj._q.empty())
+
+    def test_write_partial_sends(self):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        chan = MagicMock()
+        sent = []
+        def send(data):
+            sent.append(bytes(data[:3]))
+            return min(3, len(data))
+        chan.send.side_effect = send
+        obj._write(chan, b"<rpc/>]]>]]>")
+        self.assertEqual(b"".join(sent), b"<rpc/>]]>]]>")
+        self.assertEqual(chan.send.call_count, 4)
+        # the remainder is passed on without being copied
+        self.assertTrue(all(isinstance(c[0][0], memoryview)
+                            for c in chan.send.call_args_list))
+
     @patch('paramiko.hostkeys.HostKeys.load')
     def test_load_host_key(self, mock_load):
         device_handler = JunosDeviceHandler({'name': 'junos'})
@@ -253,13 +417,55 @@ class TestSSH(unittest.TestCase):
         obj.load_known_hosts()
         mock_load.assert_called_once_with("file_name")
 
+    def test_load_host_key_shared(self):
+        known_hosts = tempfile.NamedTemporaryFile('w', suffix='known_hosts', delete=False)
+        self.addCleanup(os.remove, known_hosts.name)
+        key = paramiko.RSAKey.generate(1024)
+        known_hosts.write('h1 %s %s\n' % (key.get_name(), key.get_base64()))
+        known_hosts.close()
+        first = SSHSession(JunosDeviceHandler({'name': 'junos'}))
+        second = SSHSession(JunosDeviceHandler({'name': 'junos'}))
+        with patch('paramiko.hostkeys.HostKeyEntry.from_line',
+                   side_effect=paramiko.hostkeys.HostKeyEntry.from_line) as mock_parse:
+            first.load_known_hosts(known_hosts.name)
+            second.load_known_hosts(known_hosts.name)
+        # parsed once, into host keys of each session's own
+        self.assertEqual(mock_parse.call_count, 1)
+        self.assertFalse(first._host_keys is second._host_keys)
+        for obj in (first, second):
+            self.assertTrue(obj._host_keys.check('h1', key))
+        first._host_keys.add('h2', key.get_name(), key)
+        self.assertEqual(second._host_keys.lookup('h2'), None)
+        # loading the file again replaces the keys rather than adding them
+        second.load_known_hosts(known_hosts.name)
+        self.assertEqual(len(second._host_keys), 1)
+
+    @patch('paramiko.RSAKey.from_private_key_file')
+    def test_private_key_cached(self, mock_from_file):
+        key_file = tempfile.NamedTemporaryFile(delete=False)
+        key_file.close()
+        self.addCleanup(os.remove, key_file.name)
+        _private_key(paramiko.RSAKey, key_file.name, None)
+        _private_key(paramiko.RSAKey, key_file.name, None)
+        self.assertEqual(mock_from_file.call_count, 1)
+        # not with another passphrase
+        _private_key(paramiko.RSAKey, key_file.name, 'secret')
+        self.assertEqual(mock_from_file.call_count, 2)
+        # failures are remembered as well
+        mock_from_file.side_effect = paramiko.SSHException
+        self.assertRaises(paramiko.SSHException,
+                          _private_key, paramiko.RSAKey, key_file.name, 'other')
+        self.assertRaises(paramiko.SSHException,
+                          _private_key, paramiko.RSAKey, key_file.name, 'other')
+        self.assertEqual(mock_from_file.call_count, 3)
+
     @unittest.skipIf(sys.version_info.major == 2, "test not supported < Python3")
     @patch('ncclient.transport.ssh.SSHSession.close')
     @patch('paramiko.channel.Channel.recv')
     @patch('selectors.DefaultSelector.select')
     @patch('ncclient.transport.ssh.Session._dispatch_error')
     def test_run_receive_py3(self, mock_error, mock_selector, mock_recv, mock_close):
-        mock_selector.return_value = True
+        mock_selector.return_value = [(MagicMock(), selectors.EVENT_READ)]
         mock_recv.return_value = 0
         device_handler = JunosDeviceHandler({'name': 'junos'})
         obj = SSHSession(device_handler)
@@ -285,19 +491,79 @@ class TestSSH(unittest.TestCase):
         obj._channel = paramiko.Channel("c100")
         obj._q.put("rpc")
         obj.run()
-        self.assertEqual(mock_send.call_args_list[0][0][0], "rpc]]>]]>")
+        self.assertEqual(mock_send.call_args_list[0][0][0], b"rpc]]>]]>")
         self.assertTrue(
             isinstance(
                 mock_error.call_args_list[0][0][0],
                 SessionCloseError))
 
+    def test_send_wakes_up_main_loop(self):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        chan, peer = socket.socketpair()
+        obj._channel = FakeChannel(chan)
+        obj._connected = True
+        obj._open_wakeup()
+        with patch('selectors.DefaultSelector.select',
+                   side_effect=selectors.DefaultSelector.select,
+                   autospec=True) as mock_select:
+            t = threading.Thread(target=obj.run)
+            t.daemon = True
+            t.start()
+            start = time.time()
+            obj.send("rpc")
+            peer.settimeout(5)
+            self.assertEqual(peer.recv(100), b"rpc]]>]]>")
+            self.assertTrue(time.time() - start < 5)
+            obj._closing.set()
+            obj._wakeup()
+            t.join(5)
+        self.assertFalse(t.is_alive())
+        # an idle session blocks in select() instead of polling
+        self.assertIn(None, [c[1].get('timeout') for c in mock_select.call_args_list])
+        obj._close_wakeup()
+        chan.close()
+        peer.close()
+
+    def test_close_from_dispatcher(self):
+        device_handler = JunosDeviceHandler({'name': 'junos'})
+        obj = SSHSession(device_handler)
+        chan, peer = socket.socketpair()
+        obj._channel = FakeChannel(chan)
+        obj._transport = MagicMock()
+        obj._transport.is_active.return_value = False
+        obj._connected = True
+        obj._open_wakeup()
+        closed = threading.Event()
+
+        class Closer(SessionListener):
+            def callback(self, root, raw):
+                if not closed.is_set():
+                    # the session thread fills the queue meanwhile
+                    time.sleep(0.2)
+                    obj.close()
+                    closed.set()
+
+            def errback(self, err):
+                pass
+
+        obj.add_listener(Closer())
+        obj.start_dispatcher(queue_size=1)
+        obj.start()
+        peer.sendall(b"<ok/>]]>]]>" * 10)
+        self.assertTrue(closed.wait(5))
+        obj.join(5)
+        self.assertFalse(obj.is_alive())
+        chan.close()
+        peer.close()
+
     @unittest.skipIf(sys.version_info.major >= 3, "test not supported >= Python3")
     @patch('ncclient.transport.ssh.SSHSession.close')
     @patch('paramiko.channel.Channel.recv')
     @patch('selectors2.DefaultSelector')
     @patch('ncclient.transport.ssh.Session._dispatch_error')
     def test_run_receive_py2(self, mock_error, mock_selector, mock_recv, mock_close):
-        mock_selector.select.return_value = True
+        mock_selector.select.return_value = [(MagicMock(), selectors.EVENT_READ)]
         mock_recv.return_value = 0
         device_handler = JunosDeviceHandler({'name': 'junos'})
         obj = SSHSession(device_handler)